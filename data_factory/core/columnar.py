@@ -0,0 +1,125 @@
+"""
+列式批量生成 - 基于 NumPy 一次生成 N 行的某一列
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Any
+
+import numpy as np
+
+from .rng import derive_seed
+
+
+# 每个随机数块的行数。每列按块使用独立的 Philox 计数器流，
+# 任意行区间 [start, start + count) 的结果只取决于种子和行号，与分块方式无关
+BLOCK_SIZE = 4096
+
+# 中国大陆手机号段
+PHONE_PREFIXES = (
+    "130", "131", "132", "133", "134", "135", "136", "137", "138", "139",
+    "150", "151", "152", "153", "155", "156", "157", "158", "159",
+    "180", "181", "182", "183", "184", "185", "186", "187", "188", "189"
+)
+
+
+def _population(values: Sequence[Any]) -> np.ndarray:
+    """把候选值转换为 object 数组，取值后 tolist() 得到原始的 Python 对象"""
+    population = np.empty(len(values), dtype=object)
+    population[:] = list(values)
+    return population
+
+
+class Columns:
+    """列式生成器
+
+    生成第 start 行开始的 count 行数据，每个方法一次返回一整列。
+    不同列使用不同的 name 作为随机数流的键，互不影响；同一个 name 在同一行上总是得到相同的值，
+    因此把 N 行拆成多个分片（例如多个工作进程各生成一段）与一次生成 N 行的结果完全一致。
+
+    数值列返回 NumPy 数组，字符串和列表列返回 Python 列表。
+    """
+
+    def __init__(self, seed: int, start: int, count: int, block_size: int = BLOCK_SIZE):
+        if start < 0 or count < 0:
+            raise ValueError("行号和行数不能为负数")
+        self.seed = seed
+        self.start = start
+        self.count = count
+        self.block_size = block_size
+
+    def _generator(self, name: str, block: int) -> np.random.Generator:
+        return np.random.Generator(np.random.Philox(key=derive_seed(self.seed, name, block)))
+
+    def _draw(self, name: str, draw: Callable[[np.random.Generator, int], np.ndarray]) -> np.ndarray:
+        """按块生成并截取 [start, start + count) 行，draw(rng, n) 返回第一维为 n 的数组"""
+        if self.count == 0:
+            return draw(self._generator(name, 0), 0)
+        first = self.start // self.block_size
+        last = (self.start + self.count - 1) // self.block_size
+        parts = [draw(self._generator(name, block), self.block_size)
+                 for block in range(first, last + 1)]
+        values = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        offset = self.start - first * self.block_size
+        return values[offset:offset + self.count]
+
+    def sequence(self, prefix: str = "", width: int = 0) -> List[str]:
+        """行号序列ID，例如 sequence("user_", 6) -> user_000000, user_000001..."""
+        return [f"{prefix}{index:0{width}d}" for index in range(self.start, self.start + self.count)]
+
+    def integers(self, name: str, low: int, high: int, width: Optional[int] = None) -> np.ndarray:
+        """[low, high] 区间内的均匀整数（包含 high）；指定 width 时每行 width 个"""
+        shape = () if width is None else (width,)
+        return self._draw(name, lambda rng, n: rng.integers(low, high, size=(n,) + shape,
+                                                            endpoint=True))
+
+    def uniform(self, name: str, low: float, high: float,
+                decimals: Optional[int] = None) -> np.ndarray:
+        """[low, high) 区间内的均匀浮点数，可按 decimals 位小数取整"""
+        values = self._draw(name, lambda rng, n: rng.uniform(low, high, size=n))
+        return np.round(values, decimals) if decimals is not None else values
+
+    def normal(self, name: str, mean: float, std: float,
+               low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        """正态分布，超出 [low, high] 的值截断到边界"""
+        values = self._draw(name, lambda rng, n: rng.normal(mean, std, size=n))
+        if low is not None or high is not None:
+            values = np.clip(values, low, high)
+        return values
+
+    def choice(self, name: str, values: Sequence[Any],
+               weights: Optional[Sequence[float]] = None) -> List[Any]:
+        """从候选值中有放回地选择，可指定权重"""
+        population = _population(values)
+        p = None
+        if weights is not None:
+            p = np.asarray(weights, dtype=float)
+            p = p / p.sum()
+        picks = self._draw(name, lambda rng, n: rng.choice(len(population), size=n, p=p))
+        return population[picks].tolist()
+
+    def weighted(self, name: str, table: Dict[Any, float]) -> List[Any]:
+        """按权重表选择，例如 {"北京市": 3, "上海市": 2}"""
+        return self.choice(name, list(table.keys()), list(table.values()))
+
+    def phones(self, name: str, prefixes: Sequence[str] = PHONE_PREFIXES) -> List[str]:
+        """11位手机号：号段 + 8位随机数字"""
+        heads = self.choice(f"{name}.prefix", prefixes)
+        tails = self.integers(f"{name}.suffix", 0, 99999999).tolist()
+        return [f"{head}{tail:08d}" for head, tail in zip(heads, tails)]
+
+    def sample_indices(self, name: str, size: int, k: int) -> np.ndarray:
+        """每行从 range(size) 中无放回地抽取 k 个下标，返回 (count, k) 数组"""
+        if k > size:
+            raise ValueError(f"抽样数量 {k} 超过总体大小 {size}")
+        return self._draw(name, lambda rng, n: np.argsort(rng.random((n, size)), axis=1)[:, :k])
+
+    def sample(self, name: str, population: Sequence[Any], k: int) -> List[List[Any]]:
+        """每行从候选值中无放回地抽取 k 个"""
+        return _population(population)[self.sample_indices(name, len(population), k)].tolist()
+
+    def tag_sets(self, name: str, population: Sequence[Any],
+                 min_count: int, max_count: int) -> List[List[Any]]:
+        """每行从候选值中无放回地抽取 min_count 到 max_count 个（标签集合）"""
+        values = _population(population)
+        order = self.sample_indices(f"{name}.order", len(values), max_count)
+        counts = self.integers(f"{name}.count", min_count, max_count).tolist()
+        picked = values[order].tolist()
+        return [row[:count] for row, count in zip(picked, counts)]
@@ -0,0 +1,221 @@
+"""
+执行调度器 - 把阻塞的处理器调用从事件循环转移到有界线程池
+"""
+import asyncio
+import collections
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Any, Callable, Tuple
+
+from .interfaces import ResourceLimits
+from . import tracing
+
+
+class DispatchRejected(Exception):
+    """调度队列已满，请求被拒绝"""
+
+    def __init__(self, message: str, error_code: str):
+        super().__init__(message)
+        self.message = message
+        self.error_code = error_code  # MODULE_BUSY / SERVER_BUSY
+
+
+@dataclass
+class _ModuleSlots:
+    """单个模块的并发槽位"""
+    module_id: str
+    semaphore: asyncio.Semaphore
+    limit: int
+    pending: int = 0  # 执行中 + 排队中的请求数
+    memory: int = 0   # 每次执行从内存预算中预留的字节数，0 表示不参与内存准入
+
+
+class ExecutionDispatcher:
+    """执行调度器
+
+    每个模块最多同时执行 module_concurrency 个请求，超出的请求排队等待；
+    单个模块排队超过 module_queue_depth 时返回 MODULE_BUSY，
+    全局排队超过 max_queue_depth 时返回 SERVER_BUSY。
+    指定 metrics（ExecutionMetrics）时记录排队耗时和被拒绝的请求。
+
+    resolve_limits 返回模块声明的资源预算（ResourceLimits）：max_concurrency 覆盖模块的并发上限；
+    memory_budget 大于0时，声明了 max_memory_bytes 的模块每次执行先从总预算中预留这么多内存，
+    预算不足时排队，放得下的请求先执行，占用大量内存的模块不会挤占其他模块的执行机会。
+    """
+
+    def __init__(self, max_workers: int = 8, module_concurrency: int = 4,
+                 module_queue_depth: int = 16, max_queue_depth: int = 64,
+                 module_limits: Optional[Dict[str, int]] = None, metrics: Any = None,
+                 memory_budget: int = 0,
+                 resolve_limits: Optional[Callable[[str], Optional[ResourceLimits]]] = None):
+        self.max_workers = max_workers
+        self.module_concurrency = module_concurrency
+        self.module_queue_depth = module_queue_depth
+        self.max_queue_depth = max_queue_depth
+        self.module_limits = dict(module_limits or {})  # module_id -> 并发上限
+        self.metrics = metrics
+        self.memory_budget = memory_budget  # 同时执行的请求预留内存的总预算（字节），0 表示不限制
+        self.resolve_limits = resolve_limits
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="data-factory-handler"
+        )
+        self._modules: Dict[str, _ModuleSlots] = {}
+        self._pending = 0
+        self._memory_reserved = 0
+        self._memory_waiters: "collections.deque[Tuple[int, asyncio.Future]]" = collections.deque()
+
+    def _budget(self, module_id: str) -> Tuple[int, int]:
+        """模块的 (并发上限, 每次执行预留的内存)"""
+        limit = self.module_limits.get(module_id, self.module_concurrency)
+        memory = 0
+        limits = self.resolve_limits(module_id) if self.resolve_limits is not None else None
+        if limits is not None:
+            if limits.max_concurrency is not None:
+                limit = max(1, limits.max_concurrency)
+            if limits.max_memory_bytes is not None and self.memory_budget > 0:
+                # 超过总预算的模块按总预算计算，只能单独执行
+                memory = min(limits.max_memory_bytes, self.memory_budget)
+        return limit, memory
+
+    def _slots(self, module_id: str) -> _ModuleSlots:
+        limit, memory = self._budget(module_id)
+        slots = self._modules.get(module_id)
+        # 插件重新加载后资源预算可能变化，没有执行中和排队中的请求时按新的预算重建
+        if slots is None or ((slots.limit, slots.memory) != (limit, memory) and slots.pending == 0):
+            slots = _ModuleSlots(module_id=module_id, semaphore=asyncio.Semaphore(limit),
+                                 limit=limit, memory=memory)
+            self._modules[module_id] = slots
+        return slots
+
+    def reserve(self, module_id: str) -> "Reservation":
+        """预留一个执行名额，队列已满时立即抛出 DispatchRejected"""
+        if self._pending >= self.max_workers + self.max_queue_depth:
+            self._reject(module_id, "SERVER_BUSY")
+            raise DispatchRejected("服务器繁忙，请稍后重试", "SERVER_BUSY")
+
+        slots = self._slots(module_id)
+        if slots.pending >= slots.limit + self.module_queue_depth:
+            self._reject(module_id, "MODULE_BUSY")
+            raise DispatchRejected(f"模块繁忙，请稍后重试: {module_id}", "MODULE_BUSY")
+
+        self._pending += 1
+        slots.pending += 1
+        return Reservation(self, slots)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """在线程池中执行 func(*args)（调用方需已持有名额）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def submit(self, module_id: str, func: Callable[..., Any], *args: Any) -> Any:
+        """在线程池中执行 func(*args)，受模块并发和排队深度限制"""
+        async with self.reserve(module_id):
+            return await self.run(func, *args)
+
+    def _reject(self, module_id: str, error_code: str) -> None:
+        if self.metrics is not None:
+            self.metrics.reject(module_id, error_code)
+
+    def _acquired(self, slots: _ModuleSlots, waited: float) -> None:
+        if self.metrics is not None:
+            self.metrics.observe_phase(slots.module_id, "queue", waited)
+
+    def _release(self, slots: _ModuleSlots) -> None:
+        slots.pending -= 1
+        self._pending -= 1
+
+    async def _reserve_memory(self, size: int) -> None:
+        """从内存预算中预留 size 字节，预算不足时等待其他请求归还"""
+        if self._memory_reserved + size <= self.memory_budget:
+            self._memory_reserved += size
+            return
+        future = asyncio.get_running_loop().create_future()
+        waiter = (size, future)
+        self._memory_waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已经分配到内存后才被取消，归还给其他请求
+                self._release_memory(size)
+            else:
+                self._memory_waiters.remove(waiter)
+            raise
+
+    def _release_memory(self, size: int) -> None:
+        """归还内存预算，按排队顺序唤醒放得下的请求（放不下的请求不阻塞后面较小的请求）"""
+        self._memory_reserved -= size
+        for waiter in list(self._memory_waiters):
+            need, future = waiter
+            if future.done():
+                continue
+            if self._memory_reserved + need <= self.memory_budget:
+                self._memory_waiters.remove(waiter)
+                self._memory_reserved += need
+                future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        """调度器状态"""
+        return {
+            "max_workers": self.max_workers,
+            "pending": self._pending,
+            "memory_budget": self.memory_budget,
+            "memory_reserved": self._memory_reserved,
+            "memory_waiting": len(self._memory_waiters),
+            "modules": {
+                module_id: {"limit": slots.limit, "pending": slots.pending, "memory": slots.memory}
+                for module_id, slots in self._modules.items()
+            }
+        }
+
+    def shutdown(self) -> None:
+        """关闭线程池"""
+        self._executor.shutdown(wait=False)
+
+
+class Reservation:
+    """执行名额
+
+    reserve() 时计入排队，acquire() 等待模块并发槽位和内存预算，release() 归还。
+    流式响应需要在响应体生成期间一直持有名额，因此也支持手动 acquire/release。
+    """
+
+    def __init__(self, dispatcher: ExecutionDispatcher, slots: _ModuleSlots):
+        self._dispatcher = dispatcher
+        self._slots = slots
+        self._acquired = False
+        self._memory = 0
+        self._released = False
+        self._reserved_at = time.perf_counter()
+
+    async def acquire(self) -> None:
+        with tracing.span("queue", attributes={"module": self._slots.module_id}):
+            await self._slots.semaphore.acquire()
+            self._acquired = True
+            if self._slots.memory:
+                await self._dispatcher._reserve_memory(self._slots.memory)
+                self._memory = self._slots.memory
+        self._dispatcher._acquired(self._slots, time.perf_counter() - self._reserved_at)
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        if self._memory:
+            self._dispatcher._release_memory(self._memory)
+        if self._acquired:
+            self._slots.semaphore.release()
+        self._dispatcher._release(self._slots)
+
+    async def __aenter__(self) -> "Reservation":
+        try:
+            await self.acquire()
+        except BaseException:
+            self.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.release()
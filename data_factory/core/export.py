@@ -0,0 +1,211 @@
+"""
+表格导出 - 把记录流编码为 CSV / Parquet / Arrow IPC
+"""
+import csv
+import io
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Any, BinaryIO, Union
+
+from .streaming import RecordStream
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet / Arrow 导出需要安装 pyarrow: pip install "python-data-factory[export]"
+    pa = None
+    pq = None
+
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# 需要 pyarrow 的格式
+ARROW_FORMATS = ("parquet", "arrow")
+
+
+def check_format(fmt: str) -> None:
+    """检查导出格式是否可用，不可用时抛出 ValueError"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    if fmt in ARROW_FORMATS and pa is None:
+        raise ValueError(f"导出 {fmt} 需要安装 pyarrow")
+
+
+class _ChunkSink(io.RawIOBase):
+    """只追加的内存输出，每编码一块后取出已写入的字节（供 pyarrow 写入器使用）"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class _CsvWriter:
+    """CSV 写入器：列取自第一块记录的键，嵌套的字典和列表编码为 JSON 字符串"""
+
+    def __init__(self, sink: BinaryIO):
+        self._sink = sink
+        self._text = io.StringIO()
+        self._writer = csv.writer(self._text)
+        self._columns: Optional[List[str]] = None
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        if self._columns is None:
+            self._columns = list(dict.fromkeys(key for record in records for key in record))
+            self._writer.writerow(self._columns)
+        columns = self._columns
+        self._writer.writerows(
+            [_csv_value(record.get(column)) for column in columns] for record in records
+        )
+        self._sink.write(self._text.getvalue().encode("utf-8"))
+        self._text.seek(0)
+        self._text.truncate()
+
+    def close(self, summary: Any) -> None:
+        pass
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+class _ArrowWriter:
+    """Parquet / Arrow IPC 写入器
+
+    列类型由第一块记录推断（嵌套的字典和列表映射为 struct 和 list），之后的记录按同一结构转换，
+    类型不一致时抛出 ValueError。Parquet 的汇总信息写入文件元数据 data_factory.summary。
+    """
+
+    def __init__(self, sink: BinaryIO, fmt: str):
+        self._sink = sink
+        self._fmt = fmt
+        self._schema = None
+        self._writer = None
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        if self._schema is None:
+            batch = pa.RecordBatch.from_pylist(records)
+            self._schema = batch.schema
+            if self._fmt == "parquet":
+                self._writer = pq.ParquetWriter(self._sink, self._schema)
+            else:
+                self._writer = pa.ipc.new_stream(self._sink, self._schema)
+        else:
+            try:
+                batch = pa.RecordBatch.from_pylist(records, schema=self._schema)
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise ValueError(f"记录结构与前面的记录不一致: {e}") from e
+        self._writer.write_batch(batch)
+
+    def close(self, summary: Any) -> None:
+        if self._writer is None:
+            # 没有任何记录：输出一个没有列的空表
+            self._schema = pa.schema([])
+            if self._fmt == "parquet":
+                self._writer = pq.ParquetWriter(self._sink, self._schema)
+            else:
+                self._writer = pa.ipc.new_stream(self._sink, self._schema)
+        if self._fmt == "parquet" and summary is not None:
+            self._writer.add_key_value_metadata(
+                {"data_factory.summary": json.dumps(summary, ensure_ascii=False)}
+            )
+        self._writer.close()
+
+
+def _create_writer(sink: BinaryIO, fmt: str) -> Union[_CsvWriter, _ArrowWriter]:
+    check_format(fmt)
+    if fmt == "csv":
+        return _CsvWriter(sink)
+    return _ArrowWriter(sink, fmt)
+
+
+class TableEncoder:
+    """把记录流编码为 CSV / Parquet / Arrow IPC 字节块（接口与 StreamEncoder 相同）
+
+    每次 next_chunk() 编码 chunk_size 条记录，内存占用与总条数无关。
+    这些格式没有结尾的 _trailer：生成中途出错时直接抛出异常，不写入文件尾，
+    客户端会得到不完整的文件而不是看似成功的截断数据。
+    """
+
+    def __init__(self, stream: RecordStream, fmt: str = "csv", chunk_size: int = 10000):
+        self._sink = _ChunkSink()
+        self._writer = _create_writer(self._sink, fmt)
+        self.stream = stream
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.media_type = EXPORT_FORMATS[fmt]
+        self.done = False
+
+    def next_chunk(self) -> bytes:
+        """编码下一块数据，流结束后返回空字节串"""
+        if self.done:
+            return b""
+        records = self.stream.take(self.chunk_size)
+        if records:
+            self._writer.write(records)
+        if self.stream.finished:
+            self._writer.close(self.stream.summary)
+            self.done = True
+        return self._sink.take()
+
+
+def export_stream(stream: RecordStream, fmt: str, path: Union[str, Path],
+                  chunk_size: int = 10000) -> Dict[str, Any]:
+    """把记录流写入文件，返回导出信息
+
+    先写入同目录下的临时文件，完成后再改名，失败时不会留下不完整的文件。
+    """
+    path = Path(path)
+    check_format(fmt)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.partial")
+    try:
+        with open(partial, "wb") as f:
+            writer = _create_writer(f, fmt)
+            while not stream.finished:
+                records = stream.take(chunk_size)
+                if records:
+                    writer.write(records)
+            writer.close(stream.summary)
+        partial.replace(path)
+    except BaseException:
+        stream.close()
+        partial.unlink(missing_ok=True)
+        raise
+
+    return {
+        "path": str(path),
+        "format": fmt,
+        "total_count": stream.count,
+        "size": path.stat().st_size,
+        "summary": stream.summary,
+        "execution_time": time.time() - stream.started_at
+    }
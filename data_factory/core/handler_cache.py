@@ -0,0 +1,114 @@
+"""
+处理器实例缓存 - 按 Handler.thread_safety 复用处理器实例
+"""
+import threading
+from typing import Dict, Hashable, List
+
+from .interfaces import Handler, ThreadSafety
+
+
+def create_handler(handler_class: type) -> Handler:
+    """创建处理器实例并调用 setup()"""
+    handler = handler_class()
+    handler.setup()
+    return handler
+
+
+def dispose_handler(handler: Handler) -> None:
+    """调用 teardown()，异常只记录不抛出"""
+    try:
+        handler.teardown()
+    except Exception as e:
+        print(f"处理器清理失败 {type(handler).__name__}: {e}")
+
+
+class HandlerCache:
+    """处理器实例缓存
+
+    缓存键通常是 (module_id, 插件加载代次)。SHARED 每个键一个实例，
+    PER_THREAD 每个(键, 线程)一个实例，PER_REQUEST 每次 acquire() 新建、release() 时清理。
+    PER_THREAD 实例按线程对象保存（线程ID在线程结束后会被复用），线程结束后实例在下次
+    新建 PER_THREAD 实例或调用 prune() 时清理。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shared: Dict[Hashable, Handler] = {}
+        self._per_thread: Dict[threading.Thread, Dict[Hashable, Handler]] = {}
+
+    def acquire(self, key: Hashable, handler_class: type) -> Handler:
+        """获取处理器实例"""
+        mode = getattr(handler_class, "thread_safety", ThreadSafety.PER_REQUEST)
+        if mode == ThreadSafety.PER_REQUEST:
+            return create_handler(handler_class)
+
+        if mode == ThreadSafety.SHARED:
+            cache: Dict[Hashable, Handler] = self._shared
+        else:
+            thread = threading.current_thread()
+            cache = self._per_thread.get(thread)
+            if cache is None:
+                self.prune()
+                with self._lock:
+                    cache = self._per_thread.setdefault(thread, {})
+
+        handler = cache.get(key)
+        if handler is not None and type(handler) is handler_class:
+            return handler
+
+        with self._lock:
+            handler = cache.get(key)
+            if handler is None or type(handler) is not handler_class:
+                stale = handler
+                handler = create_handler(handler_class)
+                cache[key] = handler
+                if stale is not None:
+                    dispose_handler(stale)
+        return handler
+
+    def release(self, key: Hashable, handler: Handler) -> None:
+        """归还处理器实例（只有 PER_REQUEST 实例会被清理）"""
+        if handler.thread_safety == ThreadSafety.PER_REQUEST:
+            dispose_handler(handler)
+
+    def prune(self) -> None:
+        """清理已结束线程的 PER_THREAD 实例"""
+        with self._lock:
+            finished = [thread for thread in self._per_thread if not thread.is_alive()]
+            handlers: List[Handler] = []
+            for thread in finished:
+                handlers.extend(self._per_thread.pop(thread).values())
+        for handler in handlers:
+            dispose_handler(handler)
+
+    def evict(self, key: Hashable) -> None:
+        """清理键对应的所有缓存实例（插件卸载或重新加载后调用）"""
+        with self._lock:
+            handlers: List[Handler] = []
+            if key in self._shared:
+                handlers.append(self._shared.pop(key))
+            for cache in self._per_thread.values():
+                if key in cache:
+                    handlers.append(cache.pop(key))
+        for handler in handlers:
+            dispose_handler(handler)
+
+    def clear(self) -> None:
+        """清理所有缓存实例"""
+        with self._lock:
+            handlers = list(self._shared.values())
+            for cache in self._per_thread.values():
+                handlers.extend(cache.values())
+            self._shared.clear()
+            self._per_thread.clear()
+        for handler in handlers:
+            dispose_handler(handler)
+
+    def stats(self) -> Dict[str, int]:
+        """缓存的实例数"""
+        with self._lock:
+            return {
+                "shared": len(self._shared),
+                "per_thread": sum(len(cache) for cache in self._per_thread.values()),
+                "threads": len(self._per_thread)
+            }
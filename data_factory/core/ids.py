@@ -0,0 +1,320 @@
+"""
+ID生成 - 雪花ID、分段预分配的序列号和业务编号模板
+"""
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+from .interfaces import ExecutionContext
+from .rng import SEEDED_EPOCH, derive_seed
+
+try:
+    import fcntl
+except ImportError:  # Windows: 序列号只在进程内唯一
+    fcntl = None
+
+
+# 雪花ID: 41位毫秒时间戳 | 5位节点号 | 5位进程号 | 12位毫秒内序号
+ID_EPOCH_MS = 1704067200000   # 2024-01-01 00:00:00 UTC
+NODE_BITS = 5
+PROCESS_BITS = 5
+SEQUENCE_BITS = 12
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_PROCESS_ID = (1 << PROCESS_BITS) - 1
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+WORKER_SHIFT = SEQUENCE_BITS
+TIMESTAMP_SHIFT = SEQUENCE_BITS + NODE_BITS + PROCESS_BITS
+
+
+def compose_id(timestamp_ms: int, worker_id: int, sequence: int) -> int:
+    """组装雪花ID（worker_id 为节点号和进程号组成的10位工作ID）"""
+    return ((timestamp_ms - ID_EPOCH_MS) << TIMESTAMP_SHIFT) | (worker_id << WORKER_SHIFT) | sequence
+
+
+def decode_id(snowflake_id: int) -> Dict[str, int]:
+    """拆解雪花ID"""
+    worker_id = (snowflake_id >> WORKER_SHIFT) & ((1 << (NODE_BITS + PROCESS_BITS)) - 1)
+    return {
+        "timestamp_ms": (snowflake_id >> TIMESTAMP_SHIFT) + ID_EPOCH_MS,
+        "node_id": worker_id >> PROCESS_BITS,
+        "process_id": worker_id & MAX_PROCESS_ID,
+        "sequence": snowflake_id & SEQUENCE_MASK
+    }
+
+
+def _ticks_to_ids(start: int, count: int, worker_id: int) -> List[int]:
+    """把连续的逻辑时钟刻度 (毫秒 << 12 | 序号) 转换为雪花ID"""
+    worker_bits = worker_id << WORKER_SHIFT
+    epoch_ticks = ID_EPOCH_MS << SEQUENCE_BITS
+    return [
+        (((tick - epoch_ticks) >> SEQUENCE_BITS) << TIMESTAMP_SHIFT) | worker_bits | (tick & SEQUENCE_MASK)
+        for tick in range(start, start + count)
+    ]
+
+
+class Snowflake:
+    """雪花ID生成器
+
+    内部维护一个逻辑时钟（毫秒 << 12 | 毫秒内序号），next_ids(n) 一次加锁预留 n 个连续刻度，
+    批量生成时锁的开销与数量无关。逻辑时钟不会回退（系统时钟回拨时继续递增）；
+    预留的刻度超过当前时间时等待时钟追上再返回，保证进程重启后同一工作ID不会产生重复。
+    """
+
+    def __init__(self, node_id: int = 0, process_id: int = 0):
+        if not 0 <= node_id <= MAX_NODE_ID:
+            raise ValueError(f"节点号必须在0-{MAX_NODE_ID}之间: {node_id}")
+        if not 0 <= process_id <= MAX_PROCESS_ID:
+            raise ValueError(f"进程号必须在0-{MAX_PROCESS_ID}之间: {process_id}")
+        self.node_id = node_id
+        self.process_id = process_id
+        self.worker_id = (self.node_id << PROCESS_BITS) | self.process_id
+        self._lock = threading.Lock()
+        self._next_tick = 0
+
+    def next_id(self) -> int:
+        return self.next_ids(1)[0]
+
+    def next_ids(self, count: int) -> List[int]:
+        """预留并返回 count 个递增的ID"""
+        if count <= 0:
+            return []
+        with self._lock:
+            start = max(self._next_tick, int(time.time() * 1000) << SEQUENCE_BITS)
+            self._next_tick = start + count
+        last_ms = (start + count - 1) >> SEQUENCE_BITS
+        delay = (last_ms + 1) / 1000 - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        return _ticks_to_ids(start, count, self.worker_id)
+
+
+class SequenceStore:
+    """序列号存储（进程内）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, int] = {}
+
+    def allocate(self, name: str, size: int) -> int:
+        """分配 size 个序列号，返回第一个"""
+        with self._lock:
+            start = self._values.get(name, 0) + 1
+            self._values[name] = start + size - 1
+        return start
+
+
+class FileSequenceStore(SequenceStore):
+    """序列号存储（文件 + flock，同一台机器上的多个进程共享，重启后继续递增）"""
+
+    def __init__(self, directory: Path):
+        super().__init__()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def allocate(self, name: str, size: int) -> int:
+        path = self.directory / f"{name}.seq"
+        with self._lock, open(path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                text = f.read().strip()
+                start = (int(text) if text else 0) + 1
+                f.seek(0)
+                f.truncate()
+                f.write(str(start + size - 1))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return start
+
+
+class Sequence:
+    """单调递增的序列号
+
+    每次从存储中预分配 block_size 个号码，之后在进程内分发，只在号段用完时访问存储。
+    take(n) 超过当前号段剩余数量时直接向存储申请 n 个连续号码。
+    多个进程各自持有不同的号段，号码不重复但不保证跨进程严格递增。
+    """
+
+    def __init__(self, name: str, store: SequenceStore, block_size: int = 1000):
+        self.name = name
+        self.store = store
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0  # 当前号段的结束位置（不包含）
+
+    def next(self) -> int:
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self.store.allocate(self.name, self.block_size)
+                self._end = self._next + self.block_size
+            value = self._next
+            self._next += 1
+        return value
+
+    def take(self, count: int) -> range:
+        """取 count 个连续的序列号"""
+        with self._lock:
+            if self._end - self._next >= count:
+                start = self._next
+                self._next += count
+                return range(start, start + count)
+        start = self.store.allocate(self.name, count)
+        return range(start, start + count)
+
+
+class BusinessNumber:
+    """业务编号模板
+
+    模板使用 str.format 语法，可用字段: seq（序列号）、time（UTC 的 datetime）、worker（工作ID），
+    例如 "ORD{time:%Y%m%d}{seq:010d}"。时间按 UTC 格式化，同一参考时间在任何时区的机器上得到相同的编号。
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+
+    def format(self, seqs: Any, timestamp: Optional[float] = None, worker: int = 0) -> List[str]:
+        """按模板格式化一组序列号"""
+        moment = datetime.fromtimestamp(timestamp if timestamp is not None else time.time(), tz=timezone.utc)
+        template = self.template
+        return [template.format(seq=seq, time=moment, worker=worker) for seq in seqs]
+
+
+# ---- 进程级默认生成器 ----
+
+_lock = threading.Lock()
+_process_id: Optional[int] = None  # configure_process() 指定或从进程号锁文件分配
+_process_owner = 0                  # 分配进程号的进程（fork 出的子进程需要重新分配）
+_process_lock: Any = None           # 持有的进程号锁文件，进程退出时由操作系统释放
+_snowflake: Optional[Snowflake] = None
+_sequences: Dict[str, Sequence] = {}
+_store: Optional[SequenceStore] = None
+
+
+def _state_dir() -> Path:
+    directory = os.environ.get("DATA_FACTORY_STATE_DIR") or \
+        os.path.join(tempfile.gettempdir(), "data_factory")
+    return Path(directory)
+
+
+def acquire_process_id(directory: Path) -> Tuple[int, Any]:
+    """在 directory 下按编号尝试锁定 0.lock ~ 31.lock，返回 (进程号, 锁文件)
+
+    同一台机器上的每个进程（Web 进程、工作进程池的进程、子进程隔离的进程）持有一个不同的锁文件，
+    进程退出后锁自动释放、号码可以被新进程复用。所有号码都被占用时抛出 RuntimeError。
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for process_id in range(MAX_PROCESS_ID + 1):
+        f = open(directory / f"{process_id}.lock", "a+")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            continue
+        return process_id, f
+    raise RuntimeError(
+        f"同一节点上使用雪花ID的进程超过{MAX_PROCESS_ID + 1}个，无法分配进程号"
+        f"（多台机器或更多进程请用 DATA_FACTORY_NODE_ID 区分节点）"
+    )
+
+
+def configure_process(process_id: int) -> None:
+    """指定当前进程的进程号（不使用锁文件分配，由调用方保证同一节点上不重复）"""
+    global _process_id, _process_owner, _snowflake
+    if not 0 <= process_id <= MAX_PROCESS_ID:
+        raise ValueError(f"进程号必须在0-{MAX_PROCESS_ID}之间: {process_id}")
+    with _lock:
+        _process_id = process_id
+        _process_owner = os.getpid()
+        _snowflake = None
+
+
+def _current_process_id() -> int:
+    """当前进程的进程号，首次调用时分配（调用方持有 _lock）"""
+    global _process_id, _process_owner, _process_lock, _snowflake
+    if _process_id is not None and _process_owner == os.getpid():
+        return _process_id
+    # 首次使用，或者是继承了父进程进程号的 fork 子进程
+    _snowflake = None
+    if fcntl is None:
+        # Windows 没有 flock，只能取 pid 的低位，不保证与其他进程不重复
+        _process_id = os.getpid() % (MAX_PROCESS_ID + 1)
+    else:
+        _process_id, _process_lock = acquire_process_id(_state_dir() / "process_ids")
+    _process_owner = os.getpid()
+    return _process_id
+
+
+def get_snowflake() -> Snowflake:
+    """当前进程的雪花ID生成器（节点号来自 DATA_FACTORY_NODE_ID 环境变量，进程号在本机内唯一）"""
+    global _snowflake
+    with _lock:
+        process_id = _current_process_id()
+        if _snowflake is None:
+            node_id = int(os.environ.get("DATA_FACTORY_NODE_ID", "0"))
+            _snowflake = Snowflake(node_id, process_id)
+        return _snowflake
+
+
+def _default_store() -> SequenceStore:
+    if fcntl is None:
+        return SequenceStore()
+    return FileSequenceStore(_state_dir() / "sequences")
+
+
+def get_sequence(name: str, block_size: int = 1000) -> Sequence:
+    """命名序列号（同一台机器上的进程共享，存储在 DATA_FACTORY_STATE_DIR 下）"""
+    global _store
+    with _lock:
+        sequence = _sequences.get(name)
+        if sequence is None:
+            if _store is None:
+                _store = _default_store()
+            sequence = _sequences[name] = Sequence(name, _store, block_size)
+        return sequence
+
+
+# ---- 按执行上下文生成 ----
+
+# 指定种子时由种子派生的逻辑时钟偏移量的位数（2^40 个刻度，约 3 天）
+SEEDED_OFFSET_BITS = 40
+
+
+def seeded_ids(seed: int, reference_time: float, start: int, count: int) -> List[int]:
+    """由种子决定的第 start 行开始的 count 个雪花ID
+
+    derive_seed(seed, "ids") 的低10位作为工作ID（节点号和进程号），其余位作为参考时间之后的逻辑时钟偏移，
+    再加上行号。不同种子（包括批量中每组参数的派生种子）得到的ID区间以极高概率互不重叠，
+    同一种子的结果只取决于参考时间和行号，与分片方式无关。
+    """
+    derived = derive_seed(seed, "ids")
+    worker_id = derived & ((1 << (NODE_BITS + PROCESS_BITS)) - 1)
+    offset = (derived >> (NODE_BITS + PROCESS_BITS)) & ((1 << SEEDED_OFFSET_BITS) - 1)
+    tick = (int(reference_time * 1000) << SEQUENCE_BITS) + offset + start
+    return _ticks_to_ids(tick, count, worker_id)
+
+
+def context_ids(context: Optional[ExecutionContext], start: int, count: int) -> List[int]:
+    """第 start 行开始的 count 个雪花ID
+
+    指定种子时ID由种子、参考时间和行号决定（可复现，与分片方式无关，见 seeded_ids），
+    否则从当前进程的生成器分配。
+    """
+    if context is not None and context.seed is not None:
+        reference = context.reference_time if context.reference_time is not None else SEEDED_EPOCH
+        return seeded_ids(context.seed, reference, start, count)
+    return get_snowflake().next_ids(count)
+
+
+def context_sequence(context: Optional[ExecutionContext], name: str,
+                     start: int, count: int) -> range:
+    """第 start 行开始的 count 个序列号（指定种子时为行号 + 1，否则从命名序列分配）"""
+    if context is not None and context.seed is not None:
+        return range(start + 1, start + count + 1)
+    return get_sequence(name).take(count)
@@ -1,9 +1,10 @@
 """
 核心接口定义
 """
+import threading
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any
+from dataclasses import dataclass, field, fields
+from typing import List, Optional, Dict, Any, Callable, Generator
 from enum import Enum
 
 
@@ -18,6 +19,13 @@ class WidgetType(Enum):
     PARAGRAPH = "paragraph"
 
 
+class ThreadSafety(Enum):
+    """处理器实例的复用方式"""
+    SHARED = "shared"              # 进程内共享一个实例（处理器必须线程安全）
+    PER_THREAD = "per_thread"      # 每个执行线程一个实例
+    PER_REQUEST = "per_request"    # 每次请求新建实例
+
+
 class ResultStatus(Enum):
     """结果状态"""
     SUCCESS = "success"
@@ -57,6 +65,25 @@ class Widget:
     validation: ValidationRule = field(default_factory=ValidationRule)  # 验证规则
 
 
+@dataclass
+class ResourceLimits:
+    """模块的资源预算（None 表示不限制）
+
+    CPU时间和内存只在隔离执行（工作进程或子进程）时通过 rlimit 强制限制；
+    输出大小和记录数在所有执行方式下都会检查；并发数和内存预算同时用于调度准入。
+    """
+    max_cpu_seconds: Optional[float] = None      # 单次执行的CPU时间（秒）
+    max_memory_bytes: Optional[int] = None       # 单次执行可以新分配的内存（字节）
+    max_output_bytes: Optional[int] = None       # 结果数据编码后的大小（字节）
+    max_concurrency: Optional[int] = None        # 同时执行的请求数，覆盖全局的模块并发上限
+    max_rows: Optional[int] = None               # 生成的记录数
+
+    @property
+    def unlimited(self) -> bool:
+        """没有声明任何限制"""
+        return all(getattr(self, f.name) is None for f in fields(self))
+
+
 @dataclass
 class Module:
     """模块定义"""
@@ -70,6 +97,66 @@ class Module:
     help_msg: str = ""                           # 帮助信息
     author: str = ""                             # 作者
     version: str = "1.0.0"                       # 版本号
+    cacheable: bool = False                      # 相同参数和种子总是生成相同结果，可以缓存
+    cache_ttl: Optional[float] = None            # 缓存有效期（秒），未设置时使用全局默认值
+    limits: ResourceLimits = field(default_factory=ResourceLimits)  # 资源预算
+
+
+class ExecutionCancelled(BaseException):
+    """执行已被取消（客户端断开或任务被取消）
+
+    继承 BaseException，处理器中的 except Exception 不会把取消当作普通错误吞掉。
+    """
+
+
+class CancellationToken:
+    """协作式取消令牌
+
+    Web 层在客户端断开或任务被取消时调用 cancel()，处理器在循环中通过
+    ExecutionContext.check_cancelled() 检查；隔离执行时执行器注册回调，把取消传递给工作进程。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self._cancelled = False
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self, reason: str = "已取消") -> None:
+        """取消执行，依次调用已注册的回调（只有第一次调用生效）"""
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """注册取消时的回调，已经取消时立即调用"""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise ExecutionCancelled(self.reason or "已取消")
+
+
+# 只在当前进程内有效、不传给隔离执行工作进程的上下文字段
+_LOCAL_CONTEXT_FIELDS = ("progress_callback", "cancel_token", "profile_callback")
 
 
 @dataclass
@@ -79,6 +166,43 @@ class ExecutionContext:
     session_id: Optional[str] = None
     request_id: Optional[str] = None
     client_ip: Optional[str] = None
+    seed: Optional[int] = None                   # 随机数种子，相同种子和参数生成相同数据
+    reference_time: Optional[float] = None       # 参考时间（时间戳），未设置时使用当前时间
+    profile: Optional[str] = None                # 性能剖析方式 cprofile / sample，未设置时不剖析
+    trace_parent: Optional[str] = None           # 父 span（W3C traceparent），执行器和工作进程的 span 挂在它下面
+    progress_callback: Optional[Callable[[int, Optional[int]], None]] = field(
+        default=None, repr=False, compare=False
+    )                                            # 进度回调 (已完成数量, 总数量)
+    cancel_token: Optional[CancellationToken] = field(default=None, repr=False, compare=False)
+    profile_callback: Optional[Callable[[Dict[str, Any]], None]] = field(
+        default=None, repr=False, compare=False
+    )                                            # 接收剖析结果的回调
+    
+    def report_progress(self, done: int, total: Optional[int] = None) -> None:
+        """报告进度，未设置回调时忽略（处理器每生成一段数据调用一次，不要逐条调用）"""
+        if self.progress_callback is not None:
+            self.progress_callback(done, total)
+    
+    def report_profile(self, capture: Dict[str, Any]) -> None:
+        """提交剖析结果（由执行器调用，处理器不需要调用）"""
+        if self.profile_callback is not None:
+            self.profile_callback(capture)
+    
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_token is not None and self.cancel_token.cancelled
+    
+    def check_cancelled(self) -> None:
+        """执行已被取消时抛出 ExecutionCancelled，长时间运行的处理器应在循环中定期调用"""
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """可序列化的字段（传给隔离执行的工作进程）"""
+        return {
+            f.name: getattr(self, f.name) for f in fields(self)
+            if f.name not in _LOCAL_CONTEXT_FIELDS
+        }
 
 
 @dataclass
@@ -89,6 +213,8 @@ class Result:
     message: str = ""
     error_code: Optional[str] = None
     execution_time: Optional[float] = None
+    rows: Optional[int] = None                   # 生成的记录数（运行指标使用，未设置时按结果数据推算）
+    cpu_time: Optional[float] = None             # 处理器消耗的CPU时间（秒）
 
 
 class Register(ABC):
@@ -103,7 +229,32 @@ class Register(ABC):
 class Handler(ABC):
     """业务处理器接口"""
     
+    # 实例复用方式，处理器可覆盖；默认每次请求新建实例
+    thread_safety: ThreadSafety = ThreadSafety.PER_REQUEST
+    
+    def setup(self) -> None:
+        """实例创建后调用一次，用于打开连接、加载字典等昂贵的初始化"""
+        pass
+    
+    def teardown(self) -> None:
+        """实例废弃前调用一次，用于释放资源"""
+        pass
+    
     @abstractmethod
     def handle(self, data: Dict[str, Any], context: ExecutionContext = None) -> Result:
         """处理业务逻辑"""
         pass
+    
+    def stream(self, data: Dict[str, Any],
+               context: ExecutionContext = None) -> Generator[Dict[str, Any], None, Any]:
+        """流式生成记录（可选实现）
+        
+        逐条 yield 记录，生成器的返回值作为汇总信息在所有记录之后发送。
+        参数校验失败时直接抛出 ValueError。
+        """
+        raise NotImplementedError
+    
+    @classmethod
+    def supports_streaming(cls) -> bool:
+        """是否实现了流式生成"""
+        return cls.stream is not Handler.stream
@@ -0,0 +1,561 @@
+"""
+后台任务 - 持久化的任务队列，长时间的生成在后台执行，结果写入磁盘文件
+"""
+import asyncio
+import concurrent.futures
+import json
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Dict, List, Optional, Any, TYPE_CHECKING
+
+from .export import EXPORT_FORMATS, TableEncoder, check_format
+from .interfaces import CancellationToken, ExecutionCancelled, ExecutionContext, ResultStatus
+from .limits import LimitExceeded
+from .rng import SEEDED_EPOCH
+from .serialization import encode_envelope
+from .streaming import StreamEncoder, STREAM_FORMATS
+from .transport import MappedJSON, iter_envelope
+
+from .dispatcher import DispatchRejected
+
+if TYPE_CHECKING:
+    from .dispatcher import ExecutionDispatcher, Reservation
+    from .plugin_manager import PluginManager
+
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# 结果文件格式：流式格式和导出格式逐块写入，json 为 execute 接口的完整结果信封
+JOB_FORMATS = {**STREAM_FORMATS, **EXPORT_FORMATS, "json": "application/json"}
+
+_EXTENSIONS = {"ndjson": "ndjson", "json-stream": "json", "json": "json"}
+
+ADMISSION_POLL = 0.1   # 等待调度名额时检查取消的间隔（秒）
+ADMISSION_RETRY = 0.5  # 调度队列已满时重新申请名额的间隔（秒）
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    module_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    format TEXT NOT NULL,
+    seed INTEGER,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    message TEXT NOT NULL DEFAULT '',
+    error_code TEXT,
+    result_path TEXT,
+    result_size INTEGER
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+
+class JobRejected(Exception):
+    """任务提交被拒绝（模块不存在、格式不支持等）"""
+
+    def __init__(self, message: str, error_code: str):
+        super().__init__(message)
+        self.message = message
+        self.error_code = error_code  # MODULE_NOT_FOUND / UNSUPPORTED_FORMAT / STREAM_NOT_SUPPORTED
+
+
+@dataclass
+class Job:
+    """后台任务"""
+    id: str
+    module_id: str
+    data: Dict[str, Any]
+    format: str
+    seed: Optional[int]
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: int = 0                  # 已完成数量（流式任务为已写入结果文件的记录数）
+    total: Optional[int] = None        # 总数量（处理器报告进度时提供）
+    message: str = ""
+    error_code: Optional[str] = None
+    result_path: Optional[str] = None
+    result_size: Optional[int] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def media_type(self) -> str:
+        return JOB_FORMATS[self.format]
+
+    @property
+    def filename(self) -> str:
+        return f"{self.module_id}-{self.id}.{_EXTENSIONS.get(self.format, self.format)}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """接口返回的任务信息（不包含参数和服务器上的文件路径）"""
+        return {
+            "id": self.id,
+            "module_id": self.module_id,
+            "status": self.status,
+            "format": self.format,
+            "seed": self.seed,
+            "progress": self.progress,
+            "total": self.total,
+            "message": self.message,
+            "error_code": self.error_code,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result_size": self.result_size
+        }
+
+
+_COLUMNS = [f.name for f in fields(Job)]
+
+
+class JobStore:
+    """任务记录（SQLite，单个连接由锁串行访问）"""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "total" not in columns:
+                # 早期版本的任务数据库没有 total 列
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN total INTEGER")
+
+    def insert(self, job: Job) -> None:
+        values = [getattr(job, name) for name in _COLUMNS]
+        values[_COLUMNS.index("data")] = json.dumps(job.data, ensure_ascii=False, default=str)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                values
+            )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        rows = self._select("WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Job]:
+        if status:
+            return self._select("WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit))
+        return self._select("ORDER BY created_at DESC LIMIT ?", (limit,))
+
+    def queued_ids(self) -> List[str]:
+        return [job.id for job in self._select("WHERE status = ? ORDER BY created_at", (QUEUED,))]
+
+    def update(self, job_id: str, expected: Optional[str] = None, **values: Any) -> bool:
+        """更新任务字段；指定 expected 时只在当前状态等于 expected 时更新，返回是否更新"""
+        assignments = ", ".join(f"{name} = ?" for name in values)
+        sql = f"UPDATE jobs SET {assignments} WHERE id = ?"
+        params = [*values.values(), job_id]
+        if expected is not None:
+            sql += " AND status = ?"
+            params.append(expected)
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount > 0
+
+    def requeue_running(self) -> int:
+        """把上次退出时仍在执行的任务放回队列（从头重新执行）"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, progress = 0, total = NULL "
+                "WHERE status = ?",
+                (QUEUED, RUNNING)
+            ).rowcount
+
+    def expired(self, before: float) -> List[Job]:
+        return self._select(
+            f"WHERE status IN ({', '.join('?' * len(FINISHED_STATES))}) AND finished_at < ?",
+            (*FINISHED_STATES, before)
+        )
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def _select(self, clause: str, params: tuple) -> List[Job]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs {clause}", params).fetchall()
+        jobs = []
+        for row in rows:
+            job = Job(*row)
+            job.data = json.loads(job.data)
+            jobs.append(job)
+        return jobs
+
+
+class JobManager:
+    """后台任务管理器
+
+    任务记录保存在 <directory>/jobs.db，结果文件写入 <directory>/results/。
+    workers 个后台线程按提交顺序执行任务；指定 dispatcher 时每个任务执行前先在 start() 传入的事件循环中
+    申请调度名额，与 Web 请求共用模块并发上限和内存预算（队列已满时任务继续等待，不会失败）。
+    支持流式生成的模块通过 stream() 逐块写入结果文件；其他模块（json 格式）通过 execute_module() 执行。
+    每个任务有自己的取消令牌，取消任务时触发，处理器通过 context.check_cancelled() 尽快停止；
+    处理器通过 context.report_progress() 报告的总数量作为任务的 total。
+    服务关闭时正在执行的任务放回队列，下次启动后从头重新执行；结束超过 ttl 秒的任务及其结果文件被删除。
+    """
+
+    def __init__(self, manager: "PluginManager", directory: str, workers: int = 2,
+                 ttl: Optional[float] = 7 * 24 * 3600, progress_interval: float = 1.0,
+                 dispatcher: Optional["ExecutionDispatcher"] = None):
+        self.manager = manager
+        self.dispatcher = dispatcher
+        self.directory = Path(directory)
+        self.results_dir = self.directory / "results"
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self.progress_interval = progress_interval
+        self.store = JobStore(self.directory / "jobs.db")
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._progress: Dict[str, List[Optional[int]]] = {}  # 执行中任务的实时进度 [已完成, 总数]
+        self._tokens: Dict[str, CancellationToken] = {}     # 执行中任务的取消令牌
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # 调度器所在的事件循环
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """恢复未完成的任务并启动后台线程（loop 为调度器所在的事件循环，未指定时任务不经过调度器）"""
+        if self._threads:
+            return
+        self._loop = loop
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        requeued = self.store.requeue_running()
+        if requeued:
+            print(f"♻️ 重新执行上次中断的 {requeued} 个任务")
+        self._purge_expired()
+        self._queue = queue.Queue()
+        for job_id in self.store.queued_ids():
+            self._queue.put(job_id)
+
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"data-factory-job-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """停止后台线程（正在执行的任务被中断并放回队列）"""
+        self._stopping.set()
+        with self._lock:
+            tokens = list(self._tokens.values())
+        for token in tokens:
+            token.cancel("服务关闭")
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, module_id: str, data: Dict[str, Any], fmt: Optional[str] = None,
+               seed: Optional[int] = None) -> Job:
+        """提交任务（参数应已校验），未指定格式时流式模块默认 ndjson，其他模块默认 json"""
+        if not self.manager.get_module(module_id):
+            raise JobRejected(f"模块不存在: {module_id}", "MODULE_NOT_FOUND")
+        streaming = self.manager.supports_streaming(module_id)
+        fmt = fmt or ("ndjson" if streaming else "json")
+        if fmt not in JOB_FORMATS:
+            raise JobRejected(f"不支持的结果格式: {fmt}", "UNSUPPORTED_FORMAT")
+        if fmt in EXPORT_FORMATS:
+            try:
+                check_format(fmt)
+            except ValueError as e:
+                raise JobRejected(str(e), "UNSUPPORTED_FORMAT")
+        if fmt != "json" and not streaming:
+            raise JobRejected(f"模块不支持流式输出: {module_id}", "STREAM_NOT_SUPPORTED")
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            module_id=module_id,
+            data=data,
+            format=fmt,
+            seed=seed,
+            status=QUEUED,
+            created_at=time.time(),
+            message="排队中"
+        )
+        self.store.insert(job)
+        self._queue.put(job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """任务信息（执行中的任务带有实时进度）"""
+        job = self.store.get(job_id)
+        if job is not None:
+            self._apply_progress(job)
+        return job
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Job]:
+        jobs = self.store.list(status, limit)
+        for job in jobs:
+            self._apply_progress(job)
+        return jobs
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """取消任务：排队中的任务立即取消，执行中的任务触发取消令牌"""
+        job = self.store.get(job_id)
+        if job is None or job.finished:
+            return job
+        if self.store.update(job_id, expected=QUEUED, status=CANCELLED,
+                             finished_at=time.time(), message="任务已取消"):
+            return self.store.get(job_id)
+        with self._lock:
+            token = self._tokens.get(job_id)
+        if token is not None:
+            token.cancel("任务已取消")
+        return self.get(job_id)
+
+    def delete(self, job_id: str) -> bool:
+        """删除已结束的任务及其结果文件，任务不存在或未结束时返回 False"""
+        job = self.store.get(job_id)
+        if job is None or not job.finished:
+            return False
+        self._remove(job)
+        return True
+
+    def _apply_progress(self, job: Job) -> None:
+        if job.status == RUNNING:
+            with self._lock:
+                progress = self._progress.get(job.id)
+            if progress is not None:
+                job.progress, job.total = progress
+
+    # ---- 后台执行 ----
+
+    def _run(self) -> None:
+        while True:
+            try:
+                job_id = self._queue.get(timeout=60)
+            except queue.Empty:
+                self._purge_expired()
+                continue
+            if job_id is None or self._stopping.is_set():
+                return
+            # 先登记取消令牌再开始执行，取消请求不会落在两者之间
+            token = CancellationToken()
+            with self._lock:
+                self._tokens[job_id] = token
+                self._progress[job_id] = [0, None]
+            try:
+                if self.store.update(job_id, expected=QUEUED, status=RUNNING,
+                                     started_at=time.time(), message="执行中"):
+                    self._execute(self.store.get(job_id), token)
+            except Exception as e:
+                traceback.print_exc()
+                self._finish(job_id, FAILED, f"执行失败: {str(e)}", "EXECUTION_ERROR")
+            finally:
+                with self._lock:
+                    self._tokens.pop(job_id, None)
+                    self._progress.pop(job_id, None)
+
+    def _execute(self, job: Job, token: CancellationToken) -> None:
+        progress = self._progress[job.id]
+        saved_at = time.time()
+
+        def on_progress(done: int, total: Optional[int] = None) -> None:
+            nonlocal saved_at
+            progress[0] = done
+            if total is not None:
+                progress[1] = total
+            if time.time() - saved_at >= self.progress_interval:
+                saved_at = time.time()
+                self.store.update(job.id, progress=progress[0], total=progress[1])
+
+        context = ExecutionContext(
+            request_id=job.id,
+            seed=job.seed,
+            reference_time=SEEDED_EPOCH if job.seed is not None else None,
+            progress_callback=on_progress,
+            cancel_token=token
+        )
+        path = self.results_dir / f"{job.id}.{_EXTENSIONS.get(job.format, job.format)}"
+        partial = path.with_name(f".{path.name}.partial")
+        try:
+            reservation = self._admit(job.module_id, token)
+            try:
+                if job.format == "json":
+                    status, message, error_code = self._write_result(job, context, partial)
+                else:
+                    status, message, error_code = self._write_stream(job, context, partial)
+            finally:
+                self._release(reservation)
+        except ExecutionCancelled:
+            partial.unlink(missing_ok=True)
+            if self._stopping.is_set():
+                self.store.update(job.id, status=QUEUED, started_at=None, progress=0,
+                                  total=None, message="排队中")
+            else:
+                self._finish(job.id, CANCELLED, "任务已取消", progress=progress[0], total=progress[1])
+            return
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+
+        if status == SUCCEEDED:
+            partial.replace(path)
+            self._finish(job.id, status, message, progress=progress[0], total=progress[1],
+                         result_path=str(path), result_size=path.stat().st_size)
+        else:
+            partial.unlink(missing_ok=True)
+            self._finish(job.id, status, message, error_code, progress=progress[0], total=progress[1])
+
+    def _admit(self, module_id: str, token: CancellationToken) -> Optional["Reservation"]:
+        """等待调度名额（未指定调度器时返回 None），等待期间任务被取消时抛出 ExecutionCancelled"""
+        if self.dispatcher is None or self._loop is None:
+            return None
+        while True:
+            future = asyncio.run_coroutine_threadsafe(self._acquire(module_id, token), self._loop)
+            try:
+                # 服务关闭时事件循环可能正阻塞在 stop() 中，不能无限期等待
+                while True:
+                    try:
+                        return future.result(timeout=ADMISSION_POLL)
+                    except concurrent.futures.TimeoutError:
+                        if token.cancelled:
+                            self._abandon(future)
+                            token.raise_if_cancelled()
+            except concurrent.futures.CancelledError:
+                token.raise_if_cancelled()
+                raise
+            except DispatchRejected:
+                # 后台任务不返回繁忙，稍后重新申请
+                self._stopping.wait(ADMISSION_RETRY)
+                token.raise_if_cancelled()
+
+    async def _acquire(self, module_id: str, token: CancellationToken) -> "Reservation":
+        """在事件循环中预留并等待名额，任务被取消时放弃等待并归还名额"""
+        reservation = self.dispatcher.reserve(module_id)
+        acquiring = asyncio.ensure_future(reservation.acquire())
+        try:
+            while not acquiring.done():
+                if token.cancelled:
+                    acquiring.cancel()
+                    break
+                await asyncio.wait([acquiring], timeout=ADMISSION_POLL)
+            await acquiring
+        except BaseException:
+            reservation.release()
+            raise
+        return reservation
+
+    def _abandon(self, future: "concurrent.futures.Future") -> None:
+        """放弃申请中的名额：已经申请到的名额在事件循环中归还"""
+        def release(done: "concurrent.futures.Future") -> None:
+            if not done.cancelled() and done.exception() is None:
+                self._release(done.result())
+        future.add_done_callback(release)
+        future.cancel()
+
+    def _release(self, reservation: Optional["Reservation"]) -> None:
+        """在事件循环中归还名额（asyncio 对象不是线程安全的）"""
+        if reservation is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(reservation.release)
+        except RuntimeError:  # 事件循环已经关闭
+            pass
+
+    def _write_stream(self, job: Job, context: ExecutionContext, partial: Path):
+        """通过 stream() 逐块写入结果文件，进度为已写入的记录数"""
+        try:
+            stream = self.manager.open_stream(job.module_id, job.data, context)
+        except ValueError as e:
+            return FAILED, str(e), None
+        if job.format in STREAM_FORMATS:
+            encoder = StreamEncoder(stream, job.format)
+        else:
+            encoder = TableEncoder(stream, job.format)
+        total = None
+
+        def on_progress(done: int, reported_total: Optional[int] = None) -> None:
+            # 处理器报告的完成数量可能领先于已写入的记录，只采用其中的总数
+            nonlocal total
+            if reported_total is not None:
+                total = reported_total
+
+        report_progress, context.progress_callback = context.progress_callback, on_progress
+        try:
+            with open(partial, "wb") as f:
+                while not encoder.done:
+                    context.check_cancelled()
+                    f.write(encoder.next_chunk())
+                    report_progress(stream.count, total)
+        except LimitExceeded as e:
+            return FAILED, e.message, e.error_code
+        except ValueError as e:
+            return FAILED, str(e), None
+        finally:
+            stream.close()
+
+        if getattr(encoder, "error", None) is not None:
+            error_code = getattr(encoder.error, "error_code", "EXECUTION_ERROR")
+            return FAILED, f"生成中断: {encoder.error}", error_code
+        return SUCCEEDED, f"成功生成 {stream.count} 条数据", None
+
+    def _write_result(self, job: Job, context: ExecutionContext, partial: Path):
+        """通过 execute_module() 执行，结果信封写入文件"""
+        result = self.manager.execute_module(job.module_id, job.data, context,
+                                             validate=False, encoded=True)
+        try:
+            context.check_cancelled()
+            if result.status == ResultStatus.ERROR:
+                return FAILED, result.message, result.error_code
+            envelope = {
+                "status": result.status.value,
+                "data": result.data,
+                "message": result.message,
+                "error_code": result.error_code,
+                "execution_time": result.execution_time
+            }
+            with open(partial, "wb") as f:
+                if isinstance(result.data, MappedJSON):
+                    for chunk in iter_envelope(envelope, result.data):
+                        f.write(chunk)
+                else:
+                    f.write(encode_envelope(envelope))
+        finally:
+            if isinstance(result.data, MappedJSON):
+                result.data.close()
+        return SUCCEEDED, result.message, None
+
+    def _finish(self, job_id: str, status: str, message: str, error_code: Optional[str] = None,
+                **values: Any) -> None:
+        self.store.update(job_id, status=status, finished_at=time.time(), message=message,
+                          error_code=error_code, **values)
+
+    def _remove(self, job: Job) -> None:
+        if job.result_path:
+            Path(job.result_path).unlink(missing_ok=True)
+        self.store.delete(job.id)
+
+    def _purge_expired(self) -> None:
+        """删除结束超过 ttl 秒的任务和结果文件"""
+        if not self.ttl:
+            return
+        for job in self.store.expired(time.time() - self.ttl):
+            self._remove(job)
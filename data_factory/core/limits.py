@@ -0,0 +1,144 @@
+"""
+资源限制 - 检查和强制执行模块声明的资源预算（ResourceLimits），超出时以独立的错误码失败
+"""
+import math
+import os
+import signal
+import threading
+import time
+from dataclasses import asdict
+from typing import Dict, Any, Optional
+
+try:
+    import resource
+except ImportError:  # Windows 没有 rlimit，只能在执行结束后检查
+    resource = None
+
+from .interfaces import ResourceLimits
+
+
+CPU_LIMIT_EXCEEDED = "CPU_LIMIT_EXCEEDED"
+MEMORY_LIMIT_EXCEEDED = "MEMORY_LIMIT_EXCEEDED"
+OUTPUT_LIMIT_EXCEEDED = "OUTPUT_LIMIT_EXCEEDED"
+ROWS_LIMIT_EXCEEDED = "ROWS_LIMIT_EXCEEDED"
+
+
+class LimitExceeded(Exception):
+    """执行超出了模块的资源预算"""
+
+    def __init__(self, message: str, error_code: str):
+        super().__init__(message)
+        self.message = message
+        self.error_code = error_code
+
+
+def requires_process(limits: Optional[ResourceLimits]) -> bool:
+    """是否声明了只能在独立进程中强制的限制（CPU时间、内存，rlimit 作用于整个进程）"""
+    return limits is not None and (limits.max_cpu_seconds is not None or limits.max_memory_bytes is not None)
+
+
+def limits_to_dict(limits: Optional[ResourceLimits]) -> Optional[Dict[str, Any]]:
+    """传给隔离执行工作进程的形式（没有声明限制时为 None）"""
+    if limits is None or limits.unlimited:
+        return None
+    return asdict(limits)
+
+
+def limits_from_dict(data: Optional[Dict[str, Any]]) -> Optional[ResourceLimits]:
+    return ResourceLimits(**data) if data else None
+
+
+def check(limits: Optional[ResourceLimits], cpu_time: Optional[float] = None,
+          rows: Optional[int] = None, output_bytes: Optional[int] = None) -> None:
+    """检查执行的用量，超出预算时抛出 LimitExceeded"""
+    if limits is None:
+        return
+    if limits.max_cpu_seconds is not None and cpu_time is not None and cpu_time > limits.max_cpu_seconds:
+        raise LimitExceeded(
+            f"CPU时间超出限制 ({cpu_time:.2f}秒 > {limits.max_cpu_seconds}秒)", CPU_LIMIT_EXCEEDED
+        )
+    if limits.max_rows is not None and rows is not None and rows > limits.max_rows:
+        raise LimitExceeded(f"生成条数超出限制 ({rows} > {limits.max_rows})", ROWS_LIMIT_EXCEEDED)
+    if limits.max_output_bytes is not None and output_bytes is not None and output_bytes > limits.max_output_bytes:
+        raise LimitExceeded(
+            f"结果大小超出限制 ({output_bytes} 字节 > {limits.max_output_bytes} 字节)",
+            OUTPUT_LIMIT_EXCEEDED
+        )
+
+
+def _address_space() -> Optional[int]:
+    """当前进程的虚拟地址空间大小（字节），无法读取时为 None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _on_cpu_limit(signum: int, frame: Any) -> None:
+    raise LimitExceeded("CPU时间超出限制", CPU_LIMIT_EXCEEDED)
+
+
+class ProcessLimits:
+    """在工作进程中用 rlimit 限制 with 语句内执行的CPU时间和内存，并统计消耗的CPU时间
+
+    RLIMIT_CPU 是进程累计的CPU时间：软限制设为当前用量加上预算（按秒取整），超出时内核发送 SIGXCPU，
+    信号处理函数抛出 LimitExceeded；之后仍按实际用量检查，不足1秒的超出也会被发现。
+    Linux 不支持 RLIMIT_RSS，内存预算通过 RLIMIT_AS 限制在当前地址空间之上可以新分配的大小，
+    超出时分配内存抛出 MemoryError，转换为 MEMORY_LIMIT_EXCEEDED。
+    结束后恢复原来的软限制；硬限制不变（降低后无法再提高）。只能在主线程中限制CPU时间（信号只在主线程处理），
+    工作进程在主线程中执行请求；PluginManager 不会在服务进程内执行声明了CPU时间或内存限制的模块（见 requires_process）。
+    """
+
+    def __init__(self, limits: Optional[ResourceLimits]):
+        self.limits = limits
+        self.cpu_time = 0.0
+        self._started = 0.0
+        self._cpu_limit = None
+        self._memory_limit = None
+        self._handler = None
+
+    def __enter__(self) -> "ProcessLimits":
+        self._started = time.process_time()
+        limits = self.limits
+        if limits is None or resource is None:
+            return self
+
+        if limits.max_memory_bytes is not None:
+            size = _address_space()
+            if size is not None:
+                self._memory_limit = resource.getrlimit(resource.RLIMIT_AS)
+                self._set_soft(resource.RLIMIT_AS, size + limits.max_memory_bytes, self._memory_limit)
+
+        if (limits.max_cpu_seconds is not None and hasattr(signal, "SIGXCPU")
+                and threading.current_thread() is threading.main_thread()):
+            self._handler = signal.signal(signal.SIGXCPU, _on_cpu_limit)
+            self._cpu_limit = resource.getrlimit(resource.RLIMIT_CPU)
+            self._set_soft(resource.RLIMIT_CPU, math.ceil(self._started + limits.max_cpu_seconds),
+                           self._cpu_limit)
+        return self
+
+    @staticmethod
+    def _set_soft(kind: int, soft: int, current: Any) -> None:
+        hard = current[1]
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(kind, (soft, hard))
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        # 先恢复内存限制，之后的处理可能需要分配内存
+        if self._memory_limit is not None:
+            resource.setrlimit(resource.RLIMIT_AS, self._memory_limit)
+            self._memory_limit = None
+        if self._cpu_limit is not None:
+            resource.setrlimit(resource.RLIMIT_CPU, self._cpu_limit)
+            signal.signal(signal.SIGXCPU, self._handler)
+            self._cpu_limit = None
+        self.cpu_time = time.process_time() - self._started
+
+        if exc_type is not None and issubclass(exc_type, MemoryError) and self.limits is not None \
+                and self.limits.max_memory_bytes is not None:
+            raise LimitExceeded(
+                f"内存超出限制 ({self.limits.max_memory_bytes} 字节)", MEMORY_LIMIT_EXCEEDED
+            ) from exc
+        return False
@@ -0,0 +1,253 @@
+"""
+运行指标 - 按模块统计请求数、错误码、各阶段耗时、生成条数和响应大小，以 Prometheus 文本格式输出
+"""
+import bisect
+import threading
+from typing import Dict, Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+from .serialization import EncodedJSON
+
+
+# Prometheus 文本格式的 Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 耗时直方图的分桶上限（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 请求处理的阶段：排队等待调度名额、参数校验、处理器执行、结果编码
+PHASES = ("queue", "validation", "execution", "serialization")
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def count_rows(data: Any) -> Optional[int]:
+    """推算结果数据中的记录数：列表为元素个数，带 total_count 的字典为 total_count，其他对象为1条
+
+    已经编码的结果数据无法推算，返回 None。
+    """
+    if data is None:
+        return 0
+    if isinstance(data, EncodedJSON):
+        return None
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict) and isinstance(data.get("total_count"), int):
+        return data["total_count"]
+    return 1
+
+
+def result_rows(result: Any) -> int:
+    """执行结果生成的记录数（结果没有 rows 时从结果数据推算，无法推算时为0）"""
+    rows = result.rows if result.rows is not None else count_rows(result.data)
+    return rows or 0
+
+
+class Metric:
+    """指标基类：名称、说明、标签名"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+
+    def samples(self) -> Iterable[Tuple[str, LabelValues, float]]:
+        """(名称后缀, 标签值, 数值)"""
+        return ()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, value in self.samples():
+            names = self.labels + (("le",) if suffix == "_bucket" else ())
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """只增不减的计数器"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def samples(self) -> Iterable[Tuple[str, LabelValues, float]]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            yield "", values, value
+
+
+class Histogram(Metric):
+    """分桶直方图（每个标签组合保存各桶计数、总和与次数，不保存原始数据）"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, List[float]] = {}  # 标签值 -> [各桶计数..., 总和, 次数]
+
+    def observe(self, value: float, *values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(values)
+            if data is None:
+                data = self._values[values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def samples(self) -> Iterable[Tuple[str, LabelValues, float]]:
+        with self._lock:
+            items = sorted((values, list(data)) for values, data in self._values.items())
+        for values, data in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), data):
+                cumulative += count
+                yield "_bucket", values + (_format_value(bound),), cumulative
+            yield "_sum", values, data[-2]
+            yield "_count", values, data[-1]
+
+
+class CallbackMetric(Metric):
+    """抓取时才读取的指标（调度器、工作进程池、缓存的当前状态）
+
+    func 返回数值，或者有标签时返回 {标签值元组: 数值}。
+    """
+
+    def __init__(self, name: str, help_text: str, func: Callable[[], Any],
+                 labels: Sequence[str] = (), kind: str = "gauge"):
+        super().__init__(name, help_text, labels)
+        self.kind = kind
+        self.func = func
+
+    def samples(self) -> Iterable[Tuple[str, LabelValues, float]]:
+        value = self.func()
+        if value is None:
+            return
+        if not self.labels:
+            yield "", (), value
+            return
+        for values, item in sorted(value.items()):
+            yield "", values, item
+
+
+class MetricsRegistry:
+    """指标注册表，render() 输出 Prometheus 文本格式"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"指标已存在: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def callback(self, name: str, help_text: str, func: Callable[[], Any],
+                 labels: Sequence[str] = (), kind: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, help_text, func, labels, kind))
+
+    def render(self) -> bytes:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # 某个状态读取失败时不影响其他指标
+                print(f"读取指标失败 {metric.name}: {e}")
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class ExecutionMetrics(MetricsRegistry):
+    """模块执行的指标
+
+    每次记录只是加锁更新字典中的几个数值，开销在微秒级，可以在生产环境中一直开启。
+    标签只使用模块ID、阶段、状态和错误码，不会随请求参数增长。
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__()
+        self.requests = self.counter(
+            "data_factory_requests_total", "执行请求数（按模块、结果状态和错误码）",
+            ("module", "status", "error_code")
+        )
+        self.phase_seconds = self.histogram(
+            "data_factory_request_phase_seconds",
+            "请求各阶段的耗时（queue 排队、validation 校验、execution 执行、serialization 编码）",
+            ("module", "phase"), buckets
+        )
+        self.rows = self.counter(
+            "data_factory_rows_generated_total", "生成的记录数（缓存命中不计入）", ("module",)
+        )
+        self.cpu_seconds = self.counter(
+            "data_factory_cpu_seconds_total", "处理器消耗的CPU时间（秒）", ("module",)
+        )
+        self.response_bytes = self.counter(
+            "data_factory_response_bytes_total", "响应体字节数", ("module",)
+        )
+        self.rejections = self.counter(
+            "data_factory_dispatch_rejections_total", "调度队列已满被拒绝的请求数",
+            ("module", "error_code")
+        )
+
+    def observe_phase(self, module_id: str, phase: str, seconds: float) -> None:
+        self.phase_seconds.observe(seconds, module_id, phase)
+
+    def observe_request(self, module_id: str, status: str, error_code: Optional[str] = None,
+                        execution_time: Optional[float] = None, rows: Optional[int] = None) -> None:
+        """记录一次执行：请求数、执行耗时和生成条数"""
+        self.requests.inc(module_id, status, error_code or "")
+        if execution_time is not None:
+            self.phase_seconds.observe(execution_time, module_id, "execution")
+        if rows:
+            self.rows.inc(module_id, amount=rows)
+
+    def observe_result(self, module_id: str, result: Any) -> None:
+        """按执行结果记录"""
+        self.observe_request(module_id, result.status.value, result.error_code,
+                             result.execution_time, result_rows(result))
+        if result.cpu_time:
+            self.cpu_seconds.inc(module_id, amount=result.cpu_time)
+
+    def add_response_bytes(self, module_id: str, size: int) -> None:
+        self.response_bytes.inc(module_id, amount=size)
+
+    def reject(self, module_id: str, error_code: str) -> None:
+        self.rejections.inc(module_id, error_code)
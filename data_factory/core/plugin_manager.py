@@ -3,16 +3,38 @@
 """
 import os
 import sys
+import hashlib
 import importlib.util
-import json
 import subprocess
-import tempfile
+import threading
 import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+from dataclasses import dataclass, field, replace
 
-from .interfaces import Register, Handler, Module, Result, ResultStatus, ExecutionContext
+from .interfaces import (
+    Register, Handler, Module, Result, ResultStatus, ExecutionContext, ExecutionCancelled,
+    ThreadSafety, ResourceLimits
+)
+from .export import check_format, export_stream
+from .handler_cache import HandlerCache, create_handler
+from .limits import LimitExceeded, check, limits_to_dict, requires_process
+from .metrics import count_rows
+from .profiling import Profiler, ProfileSession, load_profile
+from . import tracing
+from .registry_cache import RegistrySnapshot, SNAPSHOT_FILE, module_from_dict
+from .result_cache import ResultCache, cache_key
+from .rng import derive_seed
+from .serialization import EncodedJSON, dumps, loads
+from .transport import DEFAULT_INLINE_LIMIT, discard_result_file, receive_payload, result_path
+from .streaming import RecordStream
+from .validation import ModuleValidator, ValidationError, compile_validator
+from .worker import plugin_import_path
+from .worker_pool import WorkerPool
 
 
 @dataclass
@@ -24,188 +46,295 @@ class PluginInfo:
     module: Any
     modules: List[Module]
     loaded_at: float
+    module_ids: List[str] = field(default_factory=list)
+    handler_names: Dict[str, str] = field(default_factory=dict)  # module_id -> 处理器类名
+    imported: bool = True  # 从注册快照加载的插件在首次执行前未导入
+    generation: int = 0    # 加载代次，每次加载/重新加载递增
+    inflight: int = 0      # 正在执行的请求数
+    validators: Dict[str, ModuleValidator] = field(default_factory=dict)  # module_id -> 参数校验器
+    code_hash: str = ""    # main.py 的内容哈希，作为结果缓存键的一部分
+    
+    def get_module(self, module_id: str) -> Optional[Module]:
+        """获取本插件中的模块"""
+        for mid, module in zip(self.module_ids, self.modules):
+            if mid == module_id:
+                return module
+        return None
+
+
+def cancelled_result(reason: Optional[str], start_time: Optional[float] = None) -> Result:
+    """执行被取消时的结果"""
+    return Result(
+        status=ResultStatus.ERROR,
+        message=f"执行已取消: {reason or '已取消'}",
+        error_code="CANCELLED",
+        execution_time=time.time() - start_time if start_time is not None else None
+    )
+
+
+def declared_limits(module: Module) -> Optional[ResourceLimits]:
+    """模块声明的资源预算，没有声明任何限制时为 None"""
+    limits = module.limits
+    return None if limits is None or limits.unlimited else limits
+
+
+def batch_record(index: int, result: Result) -> Dict[str, Any]:
+    """批量执行中单组参数的结果"""
+    return {
+        "index": index,
+        "status": result.status.value,
+        "data": result.data,
+        "message": result.message,
+        "error_code": result.error_code,
+        "execution_time": result.execution_time
+    }
 
 
 class SimpleIsolator:
-    """简单隔离器 - 使用子进程执行"""
+    """简单隔离器 - 使用子进程执行
+
+    每次调用启动一个新的解释器运行固定的入口 python -m data_factory.core.worker，
+    请求通过标准输入传入，结果通过标准输出返回（头部一行 + 结果数据），
+    不生成脚本、不写临时文件，每次调用的开销与参数大小无关。
+    超过 inline_limit 的结果写入内存映射文件，不经过标准输出。
+    上下文的取消令牌被触发时立即结束子进程（子进程模式不回传进度）。
+    """
     
-    def __init__(self, timeout: int = 30):
+    # 项目根目录，子进程通过 PYTHONPATH 导入 data_factory
+    project_root = Path(__file__).resolve().parent.parent.parent
+    
+    def __init__(self, timeout: int = 30, inline_limit: Optional[int] = DEFAULT_INLINE_LIMIT):
         self.timeout = timeout
-        self.temp_dir = Path(tempfile.mkdtemp())
+        self.inline_limit = inline_limit  # 超过该大小的结果通过内存映射文件返回
+        self._env = dict(os.environ)
+        pythonpath = self._env.get("PYTHONPATH")
+        self._env["PYTHONPATH"] = os.pathsep.join(
+            [str(self.project_root)] + ([pythonpath] if pythonpath else [])
+        )
     
     def execute(self, plugin_info: PluginInfo, handler_class_name: str, 
-                data: Dict[str, Any], context: ExecutionContext = None) -> Result:
-        """在隔离环境中执行处理器"""
-        
-        # 创建执行脚本
-        script_content = self._generate_script(plugin_info, handler_class_name, data)
-        script_file = self.temp_dir / f"exec_{plugin_info.id}_{int(time.time())}.py"
+                data: Dict[str, Any], context: ExecutionContext = None,
+                encoded: bool = False, limits: Optional[ResourceLimits] = None) -> Result:
+        """在隔离环境中执行处理器（limits 为模块的资源预算，由子进程在执行时强制限制）"""
+        request = {
+            # 子进程的工作目录是插件目录，相对路径需要先转换为绝对路径
+            "plugin_path": str(Path(plugin_info.path).resolve()),
+            "generation": plugin_info.generation,
+            "handler_class": handler_class_name,
+            "data": data,
+            "context": context.to_dict() if context else {},
+            "inline_limit": self.inline_limit,
+            "result_path": result_path(),
+            "limits": limits_to_dict(limits)
+        }
+        try:
+            return self._run(plugin_info, request, context, encoded)
+        finally:
+            # 子进程已经结束；超时或取消时子进程可能已经写入了结果文件
+            discard_result_file(request["result_path"])
+    
+    def _run(self, plugin_info: PluginInfo, request: Dict[str, Any],
+             context: Optional[ExecutionContext], encoded: bool) -> Result:
+        """启动子进程执行请求并解析结果"""
+        token = context.cancel_token if context else None
         
         try:
-            script_file.write_text(script_content, encoding='utf-8')
-            
-            # 执行脚本
-            result = subprocess.run(
-                [sys.executable, str(script_file)],
-                capture_output=True,
-                text=True,
-                timeout=self.timeout,
-                cwd=plugin_info.path
-            )
-            
-            if result.returncode == 0:
-                try:
-                    output_data = json.loads(result.stdout.strip())
-                    return Result(
-                        status=ResultStatus.SUCCESS if output_data['success'] else ResultStatus.ERROR,
-                        data=output_data.get('data'),
-                        message=output_data.get('message', ''),
-                        execution_time=output_data.get('execution_time')
-                    )
-                except json.JSONDecodeError:
-                    return Result(
-                        status=ResultStatus.ERROR,
-                        message=f"输出解析失败: {result.stdout}",
-                        error_code='OUTPUT_PARSE_ERROR'
-                    )
-            else:
-                return Result(
-                    status=ResultStatus.ERROR,
-                    message=result.stderr if result.stderr else "执行失败",
-                    error_code='EXECUTION_ERROR'
+            with tracing.span("isolator.spawn"):
+                process = subprocess.Popen(
+                    [sys.executable, "-m", "data_factory.core.worker"],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    cwd=plugin_info.path,
+                    env=self._env
                 )
-                
+        except Exception as e:
+            return Result(
+                status=ResultStatus.ERROR,
+                message=str(e),
+                error_code='UNKNOWN_ERROR'
+            )
+        
+        if token is not None:
+            token.add_callback(process.kill)
+        try:
+            with tracing.span("isolator.communicate", attributes={"process.pid": process.pid}):
+                # 子进程中的 span 挂在 isolator.communicate 下面
+                request["context"]["trace_parent"] = tracing.current_traceparent()
+                stdout, stderr = process.communicate(dumps(request), timeout=self.timeout)
         except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
             return Result(
                 status=ResultStatus.ERROR,
                 message=f"执行超时 ({self.timeout}秒)",
                 error_code='TIMEOUT_ERROR'
             )
-        except Exception as e:
+        finally:
+            if token is not None:
+                token.remove_callback(process.kill)
+        
+        if token is not None and token.cancelled:
+            return cancelled_result(token.reason)
+        
+        if process.returncode != 0:
+            stderr = stderr.decode("utf-8", errors="replace")
             return Result(
                 status=ResultStatus.ERROR,
-                message=str(e),
-                error_code='UNKNOWN_ERROR'
+                message=stderr if stderr else "执行失败",
+                error_code='EXECUTION_ERROR'
             )
-        finally:
-            # 清理临时文件
-            if script_file.exists():
-                script_file.unlink()
-    
-    def _generate_script(self, plugin_info: PluginInfo, handler_class_name: str, 
-                        data: Dict[str, Any]) -> str:
-        """生成执行脚本"""
-        data_json = json.dumps(data, ensure_ascii=False)
         
-        return f'''
-import sys
-import json
-import time
-import traceback
-import os
-from pathlib import Path
-
-# 添加项目根目录到路径
-project_root = Path(__file__).parent.parent
-if str(project_root) not in sys.path:
-    sys.path.insert(0, str(project_root))
-
-# 添加插件路径
-plugin_path = Path(r"{plugin_info.path}")
-if str(plugin_path) not in sys.path:
-    sys.path.insert(0, str(plugin_path))
-
-try:
-    start_time = time.time()
-    
-    # 导入插件模块
-    from main import {handler_class_name}
-    
-    # 创建处理器实例
-    handler = {handler_class_name}()
-    
-    # 解析输入数据
-    input_data = {data_json}
-    
-    # 执行处理
-    result = handler.handle(input_data)
-    
-    execution_time = time.time() - start_time
-    
-    # 输出结果
-    output = {{
-        'success': result.status.value == 'success',
-        'data': result.data,
-        'message': result.message,
-        'execution_time': execution_time
-    }}
-    
-    print(json.dumps(output, ensure_ascii=False))
-    
-except Exception as e:
-    error_output = {{
-        'success': False,
-        'data': None,
-        'message': str(e),
-        'traceback': traceback.format_exc()
-    }}
-    print(json.dumps(error_output, ensure_ascii=False))
-    sys.exit(1)
-'''
+        header, _, payload = stdout.partition(b"\n")
+        try:
+            output = loads(header)
+            data = receive_payload(output, payload, encoded, request["result_path"])
+        except (ValueError, OSError):
+            return Result(
+                status=ResultStatus.ERROR,
+                message=f"输出解析失败: {stdout[:1000].decode('utf-8', errors='replace')}",
+                error_code='OUTPUT_PARSE_ERROR'
+            )
+        
+        tracing.emit(output.get("spans"))
+        if output.get("profile") and context is not None:
+            context.report_profile(load_profile(output["profile"]))
+        return Result(
+            status=ResultStatus(output.get("status", "error")),
+            data=data,
+            message=output.get("message", ""),
+            error_code=output.get("error_code"),
+            execution_time=output.get("execution_time"),
+            rows=output.get("rows"),
+            cpu_time=output.get("cpu_time")
+        )
 
 
 class PluginManager:
     """插件管理器"""
-    
-    def __init__(self, plugins_dir: str = "examples/plugins"):
+
+    def __init__(self, plugins_dir: str = "examples/plugins", isolation: str = "subprocess",
+                 pool_size: int = 4, max_requests_per_worker: int = 1000, timeout: int = 30,
+                 lazy_discovery: bool = False, discovery_workers: int = 8,
+                 drain_timeout: float = 30.0,
+                 result_inline_limit: Optional[int] = DEFAULT_INLINE_LIMIT,
+                 result_cache: Optional[ResultCache] = None,
+                 profiler: Optional[Profiler] = None):
         self.plugins_dir = Path(plugins_dir)
         self.loaded_plugins: Dict[str, PluginInfo] = {}
         self.modules: Dict[str, Module] = {}  # module_id -> Module
-        self.isolator = SimpleIsolator()
-        
+        self._module_plugins: Dict[str, PluginInfo] = {}  # module_id -> PluginInfo
+        self._routes: Dict[Tuple[str, str], str] = {}  # (action_space, action_name) -> module_id
+        self._lock = threading.RLock()
+        self._version = 0  # 插件集合版本号，每次加载/卸载插件时递增
+        self._catalog: Optional[Tuple[int, bytes, str]] = None  # (版本号, JSON字节, ETag)
+        self.handlers = HandlerCache()  # 进程内执行时复用的处理器实例
+        self._import_lock = threading.Lock()
+        self._inflight_changed = threading.Condition(self._lock)
+        self._generation = 0
+        self.discovery_workers = discovery_workers
+        self.drain_timeout = drain_timeout
+        self.result_cache = result_cache  # 可缓存模块（Module.cacheable）的结果缓存
+        self.profiler = profiler  # 按请求或采样率剖析处理器的执行，为 None 时不剖析
+        self.timeout = timeout
+        self.result_inline_limit = result_inline_limit
+        self._limit_isolator: Optional[SimpleIsolator] = None  # 进程内执行模式下执行有CPU/内存限制的模块
+
+        # 隔离模式: none 在当前进程内直接执行, subprocess 每次调用启动新进程,
+        # pool 使用常驻工作进程池
+        if isolation == "none":
+            self.isolator = None
+        elif isolation == "subprocess":
+            self.isolator = SimpleIsolator(timeout=timeout, inline_limit=result_inline_limit)
+        elif isolation == "pool":
+            self.isolator = WorkerPool(
+                size=pool_size,
+                max_requests=max_requests_per_worker,
+                timeout=timeout,
+                inline_limit=result_inline_limit
+            )
+        else:
+            raise ValueError(f"未知的隔离模式: {isolation}")
+        self.isolation = isolation
+
         # 确保插件目录存在
         self.plugins_dir.mkdir(exist_ok=True)
+        
+        # 延迟发现模式下使用注册快照，未变化的插件启动时不导入
+        self._snapshot = RegistrySnapshot(self.plugins_dir / SNAPSHOT_FILE) if lazy_discovery else None
     
     def scan_plugins(self) -> List[Module]:
-        """扫描并加载所有插件"""
+        """扫描并加载所有插件
+        
+        需要导入的插件并发导入；lazy_discovery 模式下注册快照仍然有效的插件不会被导入，
+        直到首次在当前进程内执行时才导入。
+        """
         modules = []
         
         if not self.plugins_dir.exists():
             return modules
         
-        for plugin_path in self.plugins_dir.iterdir():
-            if plugin_path.is_dir() and not plugin_path.name.startswith('.'):
+        plugin_paths = sorted(
+            p for p in self.plugins_dir.iterdir()
+            if p.is_dir() and not p.name.startswith('.') and (p / "main.py").exists()
+        )
+        
+        to_import = []
+        for plugin_path in plugin_paths:
+            if self._snapshot:
                 try:
-                    plugin_modules = self._load_plugin(plugin_path)
-                    if plugin_modules:
-                        modules.extend(plugin_modules)
+                    plugin_modules = self._load_from_snapshot(plugin_path)
                 except Exception as e:
-                    print(f"加载插件失败 {plugin_path.name}: {e}")
+                    print(f"读取插件注册快照失败 {plugin_path.name}: {e}")
+                    plugin_modules = None
+                if plugin_modules:
+                    modules.extend(plugin_modules)
+                    continue
+            to_import.append(plugin_path)
+        
+        if to_import:
+            workers = max(1, min(self.discovery_workers, len(to_import)))
+            with ThreadPoolExecutor(max_workers=workers,
+                                    thread_name_prefix="data-factory-discovery") as executor:
+                futures = [(p, executor.submit(self._import_plugin, p)) for p in to_import]
+                for plugin_path, future in futures:
+                    try:
+                        plugin_modules = self._install_imported(plugin_path, *future.result())
+                        if plugin_modules:
+                            modules.extend(plugin_modules)
+                    except Exception as e:
+                        print(f"加载插件失败 {plugin_path.name}: {e}")
+        
+        if self._snapshot:
+            self._snapshot.save()
         
         return modules
     
     def _load_plugin(self, plugin_path: Path) -> Optional[List[Module]]:
         """加载单个插件"""
+        return self._install_imported(plugin_path, *self._import_plugin(plugin_path))
+    
+    def _import_plugin(self, plugin_path: Path) -> Tuple[Any, Dict[str, Module]]:
+        """导入插件模块并调用其中所有Register的register()，返回 (插件模块, {module_id: Module})"""
         main_file = plugin_path / "main.py"
         if not main_file.exists():
-            return None
+            return None, {}
         
         # 动态导入插件模块
         spec = importlib.util.spec_from_file_location(
             f"plugin_{plugin_path.name}", main_file
         )
         if not spec or not spec.loader:
-            return None
+            return None, {}
         
         plugin_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(plugin_module)
+        with plugin_import_path(str(plugin_path)):
+            spec.loader.exec_module(plugin_module)
         
-        # 查找实现Register接口的类
-        modules = []
-        plugin_info = None
+        # 查找实现Register接口的类（直接遍历模块字典，避免逐个getattr）
+        registered: Dict[str, Module] = {}
         
-        for attr_name in dir(plugin_module):
-            attr = getattr(plugin_module, attr_name)
+        for attr_name, attr in sorted(vars(plugin_module).items()):
             if (isinstance(attr, type) and 
                 issubclass(attr, Register) and 
                 attr != Register):
@@ -216,48 +345,272 @@ class PluginManager:
                     
                     # 生成模块ID
                     module_id = f"{plugin_path.name}_{attr_name}"
-                    
-                    # 保存模块信息
-                    self.modules[module_id] = module
-                    modules.append(module)
-                    
-                    # 创建插件信息（第一次创建）
-                    if not plugin_info:
-                        plugin_info = PluginInfo(
-                            id=plugin_path.name,
-                            name=plugin_path.name,
-                            path=str(plugin_path),
-                            module=plugin_module,
-                            modules=[],
-                            loaded_at=time.time()
-                        )
-                        self.loaded_plugins[plugin_path.name] = plugin_info
-                    
-                    plugin_info.modules.append(module)
+                    registered[module_id] = module
                     
                 except Exception as e:
                     print(f"注册模块失败 {attr_name}: {e}")
         
-        return modules if modules else None
+        return plugin_module, registered
+    
+    def _install_imported(self, plugin_path: Path, plugin_module: Any,
+                          registered: Dict[str, Module]) -> Optional[List[Module]]:
+        """安装已导入的插件"""
+        if not registered:
+            return None
+        
+        plugin_info = PluginInfo(
+            id=plugin_path.name,
+            name=plugin_path.name,
+            path=str(plugin_path),
+            module=plugin_module,
+            modules=list(registered.values()),
+            loaded_at=time.time(),
+            module_ids=list(registered.keys()),
+            handler_names={
+                module_id: module.handler_class.__name__
+                for module_id, module in registered.items()
+            }
+        )
+        self._install_plugin(plugin_info)
+        
+        if self._snapshot:
+            self._snapshot.store(plugin_path.name, plugin_path / "main.py", registered)
+        
+        return plugin_info.modules
+    
+    def _load_from_snapshot(self, plugin_path: Path) -> Optional[List[Module]]:
+        """从注册快照安装插件（不导入插件代码）"""
+        entries = self._snapshot.lookup(plugin_path.name, plugin_path / "main.py")
+        if not entries:
+            return None
+        
+        plugin_info = PluginInfo(
+            id=plugin_path.name,
+            name=plugin_path.name,
+            path=str(plugin_path),
+            module=None,
+            modules=[module_from_dict(entry) for entry in entries.values()],
+            loaded_at=time.time(),
+            module_ids=list(entries.keys()),
+            handler_names={
+                module_id: entry["handler_class"] for module_id, entry in entries.items()
+            },
+            imported=False
+        )
+        self._install_plugin(plugin_info)
+        return plugin_info.modules
+    
+    def _ensure_imported(self, plugin_info: PluginInfo):
+        """延迟导入的插件在首次进程内执行时导入，并补全模块的处理器类"""
+        if plugin_info.imported:
+            return
+        
+        with self._import_lock, tracing.span("plugin.import", attributes={"plugin": plugin_info.id}):
+            if plugin_info.imported:
+                return
+            plugin_module, registered = self._import_plugin(Path(plugin_info.path))
+            for module_id, module in zip(plugin_info.module_ids, plugin_info.modules):
+                fresh = registered.get(module_id)
+                if fresh is None:
+                    raise ImportError(f"插件已不再注册模块: {module_id}")
+                module.handler_class = fresh.handler_class
+            plugin_info.module = plugin_module
+            plugin_info.imported = True
+    
+    def _install_plugin(self, plugin_info: PluginInfo):
+        """安装插件并原子地更新模块、路由和插件索引"""
+        try:
+            plugin_info.code_hash = hashlib.sha256(
+                (Path(plugin_info.path) / "main.py").read_bytes()
+            ).hexdigest()
+        except OSError:
+            pass
+        
+        # 参数校验器在注册时编译一次
+        for module_id, module in zip(plugin_info.module_ids, plugin_info.modules):
+            validator = compile_validator(module)
+            if validator:
+                plugin_info.validators[module_id] = validator
+        
+        with self._lock:
+            plugins = dict(self.loaded_plugins)
+            modules = dict(self.modules)
+            module_plugins = dict(self._module_plugins)
+            
+            # 同名插件先移除旧版本的模块
+            old_plugin = plugins.get(plugin_info.id)
+            if old_plugin:
+                for module_id in old_plugin.module_ids:
+                    modules.pop(module_id, None)
+                    module_plugins.pop(module_id, None)
+            
+            self._generation += 1
+            plugin_info.generation = self._generation
+            plugins[plugin_info.id] = plugin_info
+            for module_id, module in zip(plugin_info.module_ids, plugin_info.modules):
+                modules[module_id] = module
+                module_plugins[module_id] = plugin_info
+            
+            self._swap(plugins, modules, module_plugins)
+        
+        if old_plugin:
+            self._retire(old_plugin)
+    
+    def unload_plugin(self, plugin_id: str) -> bool:
+        """卸载插件"""
+        with self._lock:
+            plugins = dict(self.loaded_plugins)
+            plugin_info = plugins.pop(plugin_id, None)
+            if not plugin_info:
+                return False
+            
+            modules = dict(self.modules)
+            module_plugins = dict(self._module_plugins)
+            for module_id in plugin_info.module_ids:
+                modules.pop(module_id, None)
+                module_plugins.pop(module_id, None)
+            
+            self._swap(plugins, modules, module_plugins)
+        
+        if self._snapshot:
+            self._snapshot.discard(plugin_id)
+            self._snapshot.save()
+        self._retire(plugin_info)
+        return True
+    
+    def reload_plugin(self, plugin_id: str) -> Optional[List[Module]]:
+        """重新加载单个插件目录（目录不存在时卸载）
+        
+        新版本导入成功后原子地替换模块、路由和处理器；旧版本上正在执行的请求继续完成，
+        排空后再清理旧版本的处理器实例。导入失败时保留旧版本并抛出异常。
+        """
+        plugin_path = self.plugins_dir / plugin_id
+        if not (plugin_path / "main.py").exists():
+            self.unload_plugin(plugin_id)
+            return None
+        
+        modules = self._load_plugin(plugin_path)
+        if modules is None:
+            # 插件不再注册任何模块
+            self.unload_plugin(plugin_id)
+        elif self._snapshot:
+            self._snapshot.save()
+        return modules
+    
+    def _retire(self, plugin_info: PluginInfo):
+        """在后台等待旧版本插件的请求排空，然后清理其处理器实例（结果缓存立即失效）"""
+        if self.result_cache is not None:
+            for module_id in plugin_info.module_ids:
+                self.result_cache.invalidate(module_id)
+        
+        def drain():
+            with self._inflight_changed:
+                drained = self._inflight_changed.wait_for(
+                    lambda: plugin_info.inflight == 0, timeout=self.drain_timeout
+                )
+            if not drained:
+                print(f"插件 {plugin_info.id} 旧版本排空超时，仍有 {plugin_info.inflight} 个请求")
+            for module_id in plugin_info.module_ids:
+                self.handlers.evict((module_id, plugin_info.generation))
+        
+        if plugin_info.inflight == 0:
+            drain()
+        else:
+            threading.Thread(
+                target=drain, name=f"data-factory-drain-{plugin_info.id}", daemon=True
+            ).start()
+    
+    @contextmanager
+    def _track(self, plugin_info: PluginInfo):
+        """统计插件上正在执行的请求数"""
+        self._begin(plugin_info)
+        try:
+            yield
+        finally:
+            self._end(plugin_info)
+    
+    def _begin(self, plugin_info: PluginInfo):
+        with self._lock:
+            plugin_info.inflight += 1
+    
+    def _end(self, plugin_info: PluginInfo):
+        with self._inflight_changed:
+            plugin_info.inflight -= 1
+            if plugin_info.inflight == 0:
+                self._inflight_changed.notify_all()
+    
+    def _swap(self, plugins: Dict[str, PluginInfo], modules: Dict[str, Module],
+              module_plugins: Dict[str, PluginInfo]):
+        """重建路由表并一次性替换所有索引（调用方需持有锁）"""
+        routes: Dict[Tuple[str, str], str] = {}
+        for module_id, module in modules.items():
+            if not (module.action_space and module.action_name):
+                continue
+            route = (module.action_space, module.action_name)
+            if route in routes:
+                print(f"路由冲突 /dmm/{route[0]}/{route[1]}: "
+                      f"已由 {routes[route]} 注册，忽略 {module_id}")
+                continue
+            routes[route] = module_id
+        
+        # 读取方总是拿到一组完整的字典，不会看到更新到一半的状态
+        self.loaded_plugins = plugins
+        self.modules = modules
+        self._module_plugins = module_plugins
+        self._routes = routes
+        self._version += 1
     
     def get_module(self, module_id: str) -> Optional[Module]:
         """获取模块信息"""
         return self.modules.get(module_id)
     
+    def get_plugin(self, module_id: str) -> Optional[PluginInfo]:
+        """获取模块所属的插件"""
+        return self._module_plugins.get(module_id)
+    
+    def find_route(self, action_space: str, action_name: str) -> Optional[str]:
+        """根据HTTP服务命名空间和动作名查找模块ID"""
+        return self._routes.get((action_space, action_name))
+    
     def list_modules(self) -> List[Dict[str, Any]]:
         """列出所有模块"""
-        result = []
-        for module_id, module in self.modules.items():
-            result.append({
-                "id": module_id,
-                "group_name": module.group_name,
-                "module_name": module.module_name,
-                "description": module.description,
-                "author": module.author,
-                "version": module.version,
-                "widgets": [self._widget_to_dict(w) for w in module.widgets]
-            })
-        return result
+        return [
+            self._module_to_dict(module_id, module)
+            for module_id, module in self.modules.items()
+        ]
+    
+    def get_catalog(self) -> Tuple[bytes, str]:
+        """获取预序列化的模块目录及其ETag，插件集合不变时直接复用"""
+        catalog = self._catalog
+        if catalog and catalog[0] == self._version:
+            return catalog[1], catalog[2]
+        
+        with self._lock:
+            version = self._version
+            body = dumps(self.list_modules())
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            self._catalog = (version, body, etag)
+        return body, etag
+    
+    def describe_module(self, module_id: str) -> Optional[Dict[str, Any]]:
+        """获取单个模块的字典描述"""
+        module = self.modules.get(module_id)
+        if not module:
+            return None
+        return self._module_to_dict(module_id, module)
+    
+    def _module_to_dict(self, module_id: str, module: Module) -> Dict[str, Any]:
+        """将Module对象转换为字典"""
+        return {
+            "id": module_id,
+            "group_name": module.group_name,
+            "module_name": module.module_name,
+            "description": module.description,
+            "author": module.author,
+            "version": module.version,
+            "limits": limits_to_dict(module.limits),
+            "widgets": [self._widget_to_dict(w) for w in module.widgets]
+        }
     
     def _widget_to_dict(self, widget) -> Dict[str, Any]:
         """将Widget对象转换为字典"""
@@ -285,10 +638,30 @@ class PluginManager:
             }
         }
     
-    def execute_module(self, module_id: str, data: Dict[str, Any], 
-                      context: ExecutionContext = None) -> Result:
-        """执行模块"""
+    def get_limits(self, module_id: str) -> Optional[ResourceLimits]:
+        """模块声明的资源预算（模块不存在或没有声明任何限制时为 None）"""
         module = self.modules.get(module_id)
+        return declared_limits(module) if module is not None else None
+    
+    def validate(self, module_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """按模块控件的校验规则校验并转换参数，失败时抛出 ValidationError"""
+        plugin_info = self._module_plugins.get(module_id)
+        validator = plugin_info.validators.get(module_id) if plugin_info else None
+        return validator.validate(data) if validator else data
+    
+    def execute_module(self, module_id: str, data: Dict[str, Any], 
+                      context: ExecutionContext = None, validate: bool = True,
+                      output_format: Optional[str] = None,
+                      output_path: Optional[str] = None, encoded: bool = False) -> Result:
+        """执行模块（validate=False 表示调用方已经校验过参数）
+        
+        指定 output_format（csv / parquet / arrow）和 output_path 时，通过 stream() 逐块写入文件，
+        不在内存中保留记录，结果数据为导出信息（路径、条数、文件大小、汇总）。
+        encoded=True 时隔离执行的结果数据以 EncodedJSON 返回，调用方直接写入响应而不解码。
+        """
+        # 找到对应的插件（插件和模块从同一个快照中读取，重新加载期间也保持一致）
+        plugin_info = self._module_plugins.get(module_id)
+        module = plugin_info.get_module(module_id) if plugin_info else None
         if not module:
             return Result(
                 status=ResultStatus.ERROR,
@@ -296,20 +669,429 @@ class PluginManager:
                 error_code="MODULE_NOT_FOUND"
             )
         
-        # 找到对应的插件
-        plugin_info = None
-        for plugin in self.loaded_plugins.values():
-            if module in plugin.modules:
-                plugin_info = plugin
-                break
+        if validate and module_id in plugin_info.validators:
+            try:
+                data = plugin_info.validators[module_id].validate(data)
+            except ValidationError as e:
+                return Result(
+                    status=ResultStatus.ERROR,
+                    data={"errors": e.errors},
+                    message=str(e),
+                    error_code="VALIDATION_ERROR"
+                )
+        
+        if output_format is not None:
+            return self._export(module_id, data, context, output_format, output_path)
+        
+        trace_parent = context.trace_parent if context is not None else None
+        key = self._result_cache_key(plugin_info, module_id, module, data, context)
+        if key is not None:
+            start_time = time.time()
+            with tracing.span("cache.lookup", parent=trace_parent) as lookup_span:
+                entry = self.result_cache.get(key)
+                if lookup_span is not None:
+                    lookup_span.set_attribute("cache.hit", entry is not None)
+            if entry is not None:
+                return Result(
+                    status=ResultStatus.SUCCESS,
+                    data=EncodedJSON(entry.payload) if encoded else loads(entry.payload),
+                    message=entry.message,
+                    execution_time=time.time() - start_time,
+                    rows=0
+                )
+        
+        if context is not None and context.cancelled:
+            # 排队期间客户端已断开
+            return cancelled_result(context.cancel_token.reason)
+        
+        if context is not None:
+            # 缓存命中的结果不剖析；未启用剖析时忽略请求中的 profile
+            if self.profiler is not None:
+                self.profiler.attach(module_id, context)
+            else:
+                context.profile = None
+        
+        limits = declared_limits(module)
+        isolator = self._isolator_for(limits)
+        with self._track(plugin_info), tracing.span("execute", parent=trace_parent, attributes={
+            "module": module_id,
+            "isolation": self.isolation if isolator is self.isolator else "subprocess"
+        }):
+            # 执行处理器（隔离执行只需要处理器类名，不需要在当前进程导入插件）
+            if isolator is None:
+                result = self._execute_direct(plugin_info, module_id, data, context, limits, encoded)
+            else:
+                handler_class_name = plugin_info.handler_names[module_id]
+                result = isolator.execute(
+                    plugin_info, handler_class_name, data, context, encoded, limits
+                )
+        
+        if key is not None and result.status == ResultStatus.SUCCESS:
+            self._store_result(key, module_id, module, result, encoded)
+        return result
+    
+    def _result_cache_key(self, plugin_info: PluginInfo, module_id: str, module: Module,
+                          data: Dict[str, Any], context: Optional[ExecutionContext]) -> Optional[str]:
+        """可缓存时返回缓存键：模块声明了 cacheable，且请求指定了种子（未指定种子的结果是随机的）"""
+        if self.result_cache is None or not module.cacheable:
+            return None
+        if context is None or context.seed is None:
+            return None
+        return cache_key(module_id, module.version, plugin_info.code_hash, data,
+                         context.seed, context.reference_time)
+    
+    def _store_result(self, key: str, module_id: str, module: Module, result: Result,
+                      encoded: bool):
+        """保存成功的结果（以编码后的字节保存，命中时不会与调用方共享可变对象）"""
+        if isinstance(result.data, EncodedJSON):
+            if len(result.data) > self.result_cache.max_entry_bytes:
+                return
+            payload = result.data.payload
+        else:
+            try:
+                payload = dumps(result.data)
+            except (TypeError, ValueError):
+                return
+            if encoded:
+                # 已经编码过，调用方直接使用编码结果，不必再编码一次
+                result.data = EncodedJSON(payload)
+        self.result_cache.put(key, module_id, payload, result.message, module.cache_ttl)
+    
+    def _export(self, module_id: str, data: Dict[str, Any], context: Optional[ExecutionContext],
+                output_format: str, output_path: Optional[str]) -> Result:
+        """把模块的记录流导出为文件"""
+        start_time = time.time()
+        if not output_path:
+            return Result(
+                status=ResultStatus.ERROR,
+                message="导出文件需要指定 output_path",
+                error_code="INVALID_OUTPUT"
+            )
+        try:
+            check_format(output_format)
+        except ValueError as e:
+            return Result(status=ResultStatus.ERROR, message=str(e), error_code="UNSUPPORTED_FORMAT")
+        if not self.supports_streaming(module_id):
+            return Result(
+                status=ResultStatus.ERROR,
+                message=f"模块不支持流式输出: {module_id}",
+                error_code="STREAM_NOT_SUPPORTED"
+            )
+        
+        try:
+            info = export_stream(self.open_stream(module_id, data, context), output_format, output_path)
+        except ExecutionCancelled as e:
+            return cancelled_result(str(e), start_time)
+        except LimitExceeded as e:
+            return Result(
+                status=ResultStatus.ERROR,
+                message=e.message,
+                error_code=e.error_code,
+                execution_time=time.time() - start_time
+            )
+        except ValueError as e:
+            return Result(
+                status=ResultStatus.ERROR,
+                message=str(e),
+                execution_time=time.time() - start_time
+            )
+        except Exception as e:
+            traceback.print_exc()
+            return Result(
+                status=ResultStatus.ERROR,
+                message=f"执行失败: {str(e)}",
+                error_code="EXECUTION_ERROR",
+                execution_time=time.time() - start_time
+            )
+        
+        return Result(
+            status=ResultStatus.SUCCESS,
+            data=info,
+            message=f"成功导出 {info['total_count']} 条数据到 {info['path']}",
+            execution_time=time.time() - start_time
+        )
+    
+    def resolve_handler_class(self, module_id: str) -> type:
+        """获取模块的处理器类，必要时导入延迟加载的插件"""
+        return self._resolve_handler_class(self._module_plugins[module_id], module_id)
+    
+    def _resolve_handler_class(self, plugin_info: PluginInfo, module_id: str) -> type:
+        self._ensure_imported(plugin_info)
+        return plugin_info.get_module(module_id).handler_class
+    
+    def supports_streaming(self, module_id: str) -> bool:
+        """模块是否可以流式生成：处理器实现了 stream()，并且没有声明CPU时间或内存限制
+        
+        记录流在当前进程内生成，无法强制CPU时间和内存限制，声明了这两项限制的模块只能通过
+        execute_module() 隔离执行（流式输出、导出文件和流式后台任务都会被拒绝）。
+        """
+        if module_id not in self.modules:
+            return False
+        if requires_process(self.get_limits(module_id)):
+            return False
+        return self.resolve_handler_class(module_id).supports_streaming()
+    
+    def open_stream(self, module_id: str, data: Dict[str, Any],
+                    context: ExecutionContext = None) -> RecordStream:
+        """以流式方式执行模块（始终在当前进程内执行），返回记录流
         
-        if not plugin_info:
+        模块声明了 max_rows 时，记录数超出后记录流抛出 LimitExceeded（ROWS_LIMIT_EXCEEDED）；
+        声明了CPU时间或内存限制的模块无法在进程内强制限制，抛出 ValueError。
+        """
+        plugin_info = self._module_plugins[module_id]
+        limits = declared_limits(plugin_info.get_module(module_id))
+        if requires_process(limits):
+            raise ValueError(f"模块声明了CPU时间或内存限制，只能隔离执行，不支持流式输出: {module_id}")
+        handler_key = (module_id, plugin_info.generation)
+        self._begin(plugin_info)
+        try:
+            handler_class = self._resolve_handler_class(plugin_info, module_id)
+            handler = self.handlers.acquire(handler_key, handler_class)
+        except BaseException:
+            self._end(plugin_info)
+            raise
+        
+        def on_close():
+            self.handlers.release(handler_key, handler)
+            self._end(plugin_info)
+        
+        try:
+            generator = handler.stream(data, context)
+        except BaseException:
+            on_close()
+            raise
+        return RecordStream(generator, on_close=on_close,
+                            max_rows=limits.max_rows if limits is not None else None)
+    
+    def _isolator_for(self, limits: Optional[ResourceLimits]) -> Any:
+        """执行使用的隔离器（None 表示在当前进程内执行）
+        
+        rlimit 作用于整个进程，进程内执行模式下声明了CPU时间或内存限制的模块改为在子进程中执行。
+        """
+        if self.isolator is not None or not requires_process(limits):
+            return self.isolator
+        with self._lock:
+            if self._limit_isolator is None:
+                self._limit_isolator = SimpleIsolator(timeout=self.timeout,
+                                                      inline_limit=self.result_inline_limit)
+            return self._limit_isolator
+    
+    def _execute_direct(self, plugin_info: PluginInfo, module_id: str, data: Dict[str, Any],
+                        context: ExecutionContext = None, limits: Optional[ResourceLimits] = None,
+                        encoded: bool = False) -> Result:
+        """在当前进程内直接执行处理器（不隔离），处理器实例从缓存中获取"""
+        start_time = time.time()
+        handler_key = (module_id, plugin_info.generation)
+        try:
+            handler_class = self._resolve_handler_class(plugin_info, module_id)
+            handler = self.handlers.acquire(handler_key, handler_class)
+        except Exception as e:
+            traceback.print_exc()
             return Result(
                 status=ResultStatus.ERROR,
-                message=f"找不到模块对应的插件: {module_id}",
-                error_code="PLUGIN_NOT_FOUND"
+                message=f"执行失败: {str(e)}",
+                error_code="EXECUTION_ERROR",
+                execution_time=time.time() - start_time
             )
         
-        # 执行处理器
-        handler_class_name = module.handler_class.__name__
-        return self.isolator.execute(plugin_info, handler_class_name, data, context)
+        try:
+            return self._invoke(handler, data, context, limits, encoded)
+        finally:
+            self.handlers.release(handler_key, handler)
+    
+    def _invoke(self, handler: Handler, data: Dict[str, Any],
+                context: ExecutionContext = None, limits: Optional[ResourceLimits] = None,
+                encoded: bool = False) -> Result:
+        """调用处理器的 handle()，异常转换为 EXECUTION_ERROR
+        
+        进程内执行无法强制限制CPU时间和内存，执行结束后检查 limits 中的CPU时间（执行线程的用量）、
+        记录数和输出大小，超出时返回对应的错误码。检查输出大小时需要编码结果，encoded=True 时直接返回编码结果。
+        """
+        start_time = time.time()
+        cpu_started = time.thread_time()
+        try:
+            with tracing.span("handle"), ProfileSession(context):
+                result = handler.handle(data, context)
+        except ExecutionCancelled as e:
+            return cancelled_result(str(e), start_time)
+        except Exception as e:
+            traceback.print_exc()
+            return Result(
+                status=ResultStatus.ERROR,
+                message=f"执行失败: {str(e)}",
+                error_code="EXECUTION_ERROR",
+                execution_time=time.time() - start_time
+            )
+        
+        if result.execution_time is None:
+            result.execution_time = time.time() - start_time
+        result.cpu_time = time.thread_time() - cpu_started
+        if result.rows is None:
+            # 结果可能在缓存时被编码，之后就无法推算条数
+            result.rows = count_rows(result.data)
+        if limits is not None:
+            try:
+                check(limits, cpu_time=result.cpu_time, rows=result.rows,
+                      output_bytes=self._output_size(result, limits, encoded))
+            except LimitExceeded as e:
+                return Result(
+                    status=ResultStatus.ERROR,
+                    message=e.message,
+                    error_code=e.error_code,
+                    execution_time=result.execution_time,
+                    cpu_time=result.cpu_time
+                )
+        return result
+    
+    @staticmethod
+    def _output_size(result: Result, limits: ResourceLimits, encoded: bool) -> Optional[int]:
+        """结果数据编码后的大小（没有限制输出大小或者无法编码时为 None）"""
+        if limits.max_output_bytes is None:
+            return None
+        if isinstance(result.data, EncodedJSON):
+            return len(result.data)
+        try:
+            payload = dumps(result.data)
+        except (TypeError, ValueError):
+            return None
+        if encoded:
+            result.data = EncodedJSON(payload)
+        return len(payload)
+    
+    def execute_batch(self, module_id: str, items: List[Dict[str, Any]],
+                      context: ExecutionContext = None, parallelism: int = 4,
+                      validate: bool = True) -> List[Result]:
+        """批量执行模块，按输入顺序返回每组参数的结果"""
+        return list(self.iter_batch(module_id, items, context, parallelism, validate))
+    
+    def iter_batch(self, module_id: str, items: List[Dict[str, Any]],
+                   context: ExecutionContext = None, parallelism: int = 4,
+                   validate: bool = True) -> Iterator[Result]:
+        """批量执行模块，按输入顺序逐个产出结果
+        
+        最多 parallelism 组参数同时执行，已提交未取走的结果不超过 2 * parallelism 个，
+        内存占用与批量大小无关。进程内执行时每个执行线程只创建一次处理器实例
+        （setup() 在整个批次中只调用一次），单组参数校验或执行失败不影响其他参数。
+        上下文指定了种子时，第 i 组参数使用 derive_seed(seed, "item", i) 作为种子，
+        结果与并行度无关。进度按已完成的参数组数报告；取消后未开始的参数组直接返回 CANCELLED。
+        """
+        plugin_info = self._module_plugins.get(module_id)
+        if not plugin_info or not plugin_info.get_module(module_id):
+            raise KeyError(f"模块不存在: {module_id}")
+        
+        validator = plugin_info.validators.get(module_id) if validate else None
+        limits = declared_limits(plugin_info.get_module(module_id))
+        if limits is not None and limits.max_concurrency is not None:
+            # 批次内的并行执行同样受模块并发上限约束
+            parallelism = min(parallelism, limits.max_concurrency)
+        parallelism = max(1, parallelism)
+        # 每组参数的处理器不单独报告进度，整个批次按完成的组数报告；批量执行不剖析
+        base_context = replace(
+            context, progress_callback=None, profile=None, profile_callback=None
+        ) if context is not None else None
+        
+        isolator = self._isolator_for(limits)
+        with self._track(plugin_info):
+            if isolator is None:
+                handler_key = (module_id, plugin_info.generation)
+                handler_class = self._resolve_handler_class(plugin_info, module_id)
+                local = threading.local()
+                acquired: List[Handler] = []
+                acquired_lock = threading.Lock()
+                
+                def run(data: Dict[str, Any], item_context: ExecutionContext) -> Result:
+                    handler = getattr(local, "handler", None)
+                    if handler is None:
+                        if handler_class.thread_safety == ThreadSafety.PER_REQUEST:
+                            # 批次内每个执行线程复用一个实例
+                            handler = create_handler(handler_class)
+                        else:
+                            handler = self.handlers.acquire(handler_key, handler_class)
+                        local.handler = handler
+                        with acquired_lock:
+                            acquired.append(handler)
+                    return self._invoke(handler, data, item_context, limits)
+            else:
+                handler_class_name = plugin_info.handler_names[module_id]
+                acquired = []
+                
+                def run(data: Dict[str, Any], item_context: ExecutionContext) -> Result:
+                    return isolator.execute(
+                        plugin_info, handler_class_name, data, item_context, limits=limits
+                    )
+            
+            def run_item(index: int, data: Dict[str, Any]) -> Result:
+                if validator is not None:
+                    try:
+                        data = validator.validate(data)
+                    except ValidationError as e:
+                        return Result(
+                            status=ResultStatus.ERROR,
+                            data={"errors": e.errors},
+                            message=str(e),
+                            error_code="VALIDATION_ERROR"
+                        )
+                item_context = base_context
+                if item_context is not None:
+                    if item_context.cancelled:
+                        return cancelled_result(item_context.cancel_token.reason)
+                    if item_context.seed is not None:
+                        item_context = replace(
+                            item_context, seed=derive_seed(item_context.seed, "item", index)
+                        )
+                return run(data, item_context)
+            
+            done = 0
+            
+            def completed(future) -> Result:
+                nonlocal done
+                result = future.result()
+                done += 1
+                if context is not None:
+                    context.report_progress(done, len(items))
+                return result
+            
+            executor = ThreadPoolExecutor(max_workers=parallelism,
+                                          thread_name_prefix="data-factory-batch")
+            pending = deque()
+            try:
+                for index, data in enumerate(items):
+                    if len(pending) >= parallelism * 2:
+                        yield completed(pending.popleft())
+                    pending.append(executor.submit(run_item, index, data))
+                while pending:
+                    yield completed(pending.popleft())
+            finally:
+                for future in pending:
+                    future.cancel()
+                executor.shutdown(wait=True)
+                for handler in acquired:
+                    self.handlers.release(handler_key, handler)
+                if isolator is None:
+                    # 批次的执行线程已经结束，清理它们的 PER_THREAD 实例
+                    self.handlers.prune()
+    
+    def open_batch_stream(self, module_id: str, items: List[Dict[str, Any]],
+                          context: ExecutionContext = None,
+                          parallelism: int = 4) -> RecordStream:
+        """以流式方式批量执行模块，每组参数的结果是一条记录，汇总为成功/失败数"""
+        results = self.iter_batch(module_id, items, context, parallelism)
+        
+        def records():
+            counts = {"success_count": 0, "error_count": 0}
+            try:
+                for index, result in enumerate(results):
+                    counts["error_count" if result.status == ResultStatus.ERROR
+                           else "success_count"] += 1
+                    yield batch_record(index, result)
+            finally:
+                results.close()
+            return counts
+        
+        return RecordStream(records())
+    
+    def shutdown(self):
+        """释放隔离执行资源和缓存的处理器实例"""
+        if isinstance(self.isolator, WorkerPool):
+            self.isolator.close()
+        self.handlers.clear()
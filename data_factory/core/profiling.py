@@ -0,0 +1,284 @@
+"""
+性能剖析 - 按需记录处理器执行的 cProfile 或栈采样结果，保存在有界的环形缓冲区中
+"""
+import base64
+import collections
+import cProfile
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+from .interfaces import ExecutionContext
+
+
+# 剖析方式：cprofile 记录每个函数的调用次数和耗时（开销较大），sample 定期采样调用栈（开销很小）
+PROFILE_MODES = ("cprofile", "sample")
+
+# 栈采样的间隔（秒）
+SAMPLE_INTERVAL = 0.005
+
+# 剖析摘要中保留的函数数
+TOP_FUNCTIONS = 10
+
+
+def parse_mode(value: str) -> str:
+    """解析 X-Profile 请求头：1 / true 使用 cprofile，也可以直接指定 cprofile / sample"""
+    value = value.strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return "cprofile"
+    if value not in PROFILE_MODES:
+        raise ValueError(f"不支持的剖析方式: {value}（可选 {' / '.join(PROFILE_MODES)}）")
+    return value
+
+
+def _frame_label(code: Any) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StackSampler(threading.Thread):
+    """定期读取目标线程的调用栈，按折叠栈（根在前，分号分隔）累计采样次数
+
+    只记录 root 帧以下的部分（即 with 语句内执行的代码），root 不在栈中时丢弃该次采样。
+    """
+
+    def __init__(self, thread_id: int, root: Any, interval: float):
+        super().__init__(name="data-factory-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks: "collections.Counter[str]" = collections.Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if frame is not None and stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def _cprofile_capture(profiler: cProfile.Profile) -> Dict[str, Any]:
+    stats = pstats.Stats(profiler).stats
+    top = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:TOP_FUNCTIONS]
+    return {
+        "pstats": marshal.dumps(stats),
+        "collapsed": None,
+        "top": [
+            {
+                "function": f"{name} ({os.path.basename(filename)}:{line})",
+                "calls": calls,
+                "tottime": tottime,
+                "cumtime": cumtime
+            }
+            for (filename, line, name), (_, calls, tottime, cumtime, _) in top
+        ]
+    }
+
+
+def _sample_capture(stacks: "collections.Counter[str]") -> Dict[str, Any]:
+    leaves: "collections.Counter[str]" = collections.Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return {
+        "pstats": None,
+        "collapsed": "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items())),
+        "top": [{"function": name, "samples": count} for name, count in leaves.most_common(TOP_FUNCTIONS)]
+    }
+
+
+class ProfileSession:
+    """剖析 with 语句中的代码，结束后把结果交给 context.report_profile()
+
+    context.profile 未设置或没有接收结果的回调时不做任何事，不剖析的执行没有额外开销。
+    """
+
+    def __init__(self, context: Optional[ExecutionContext]):
+        self.context = context
+        self.mode = None
+        if context is not None and context.profile_callback is not None:
+            self.mode = context.profile
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_StackSampler] = None
+        self._started = 0.0
+
+    def __enter__(self) -> "ProfileSession":
+        if self.mode is None:
+            return self
+        self._started = time.perf_counter()
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                self._profiler = profiler
+            except ValueError:
+                # 当前线程（Python 3.12 起为整个解释器）已有其他剖析器，改用栈采样
+                self.mode = "sample"
+        if self.mode == "sample":
+            self._sampler = _StackSampler(threading.get_ident(), sys._getframe(1), SAMPLE_INTERVAL)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        if self.mode is None:
+            return False
+        duration = time.perf_counter() - self._started
+        if self._profiler is not None:
+            self._profiler.disable()
+            capture = _cprofile_capture(self._profiler)
+        else:
+            self._sampler.stop()
+            capture = _sample_capture(self._sampler.stacks)
+        capture.update(mode=self.mode, duration=duration)
+        self.context.report_profile(capture)
+        return False
+
+
+def dump_profile(capture: Dict[str, Any]) -> Dict[str, Any]:
+    """转换为可以 JSON 编码的形式（工作进程通过结果头部传回）"""
+    pstats_data = capture.get("pstats")
+    return {**capture, "pstats": base64.b64encode(pstats_data).decode("ascii") if pstats_data else None}
+
+
+def load_profile(data: Dict[str, Any]) -> Dict[str, Any]:
+    pstats_data = data.get("pstats")
+    return {**data, "pstats": base64.b64decode(pstats_data) if pstats_data else None}
+
+
+@dataclass
+class ProfileRecord:
+    """一次执行的剖析结果"""
+    id: str
+    module_id: str
+    mode: str
+    trigger: str                                 # request: 请求头指定, sampling: 按采样率抽中
+    created_at: float
+    duration: float
+    request_id: Optional[str] = None
+    top: List[Dict[str, Any]] = field(default_factory=list)
+    pstats: Optional[bytes] = field(default=None, repr=False)
+    collapsed: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def formats(self) -> List[str]:
+        """可以下载的格式"""
+        formats = []
+        if self.pstats is not None:
+            formats.append("pstats")
+        if self.collapsed is not None:
+            formats.append("collapsed")
+        return formats
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "module_id": self.module_id,
+            "mode": self.mode,
+            "trigger": self.trigger,
+            "created_at": self.created_at,
+            "duration": self.duration,
+            "request_id": self.request_id,
+            "formats": self.formats,
+            "top": self.top
+        }
+
+
+class ProfileStore:
+    """剖析结果的环形缓冲区，超过 capacity 条时丢弃最早的结果"""
+
+    def __init__(self, capacity: int = 32):
+        self.capacity = capacity
+        self._records: "collections.deque[ProfileRecord]" = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def add(self, record: ProfileRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def get(self, profile_id: str) -> Optional[ProfileRecord]:
+        with self._lock:
+            return next((record for record in self._records if record.id == profile_id), None)
+
+    def find(self, request_id: str) -> Optional[ProfileRecord]:
+        """请求最近一次执行的剖析结果"""
+        with self._lock:
+            return next((record for record in reversed(self._records)
+                         if record.request_id == request_id), None)
+
+    def list(self, module_id: Optional[str] = None) -> List[ProfileRecord]:
+        """按时间倒序列出"""
+        with self._lock:
+            records = list(reversed(self._records))
+        return [record for record in records if module_id is None or record.module_id == module_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+
+class Profiler:
+    """决定哪些执行需要剖析，结果保存在 ProfileStore 中
+
+    请求通过 context.profile 指定剖析方式时总是剖析；否则按 set_rate() 设置的采样率随机抽取
+    （module_id 为 None 的设置对所有模块生效）。
+    """
+
+    def __init__(self, capacity: int = 32):
+        self.store = ProfileStore(capacity)
+        self._rates: Dict[Optional[str], Tuple[float, str]] = {}  # module_id -> (采样率, 剖析方式)
+
+    def set_rate(self, module_id: Optional[str], rate: float, mode: str = "sample") -> None:
+        """设置采样率（0 到 1，0 表示关闭）"""
+        if not 0 <= rate <= 1:
+            raise ValueError("采样率必须在 0 到 1 之间")
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"不支持的剖析方式: {mode}（可选 {' / '.join(PROFILE_MODES)}）")
+        if rate == 0:
+            self._rates.pop(module_id, None)
+        else:
+            self._rates[module_id] = (rate, mode)
+
+    def rates(self) -> List[Dict[str, Any]]:
+        return [
+            {"module_id": module_id, "rate": rate, "mode": mode}
+            for module_id, (rate, mode) in self._rates.items()
+        ]
+
+    def attach(self, module_id: str, context: ExecutionContext) -> None:
+        """决定这次执行是否剖析，需要剖析时设置 context.profile 和接收结果的回调"""
+        trigger = "request"
+        if context.profile is None:
+            setting = self._rates.get(module_id) or self._rates.get(None)
+            if setting is None or random.random() >= setting[0]:
+                return
+            context.profile = setting[1]
+            trigger = "sampling"
+
+        def collect(capture: Dict[str, Any]) -> None:
+            self.store.add(ProfileRecord(
+                id=uuid.uuid4().hex,
+                module_id=module_id,
+                mode=capture["mode"],
+                trigger=trigger,
+                created_at=time.time(),
+                duration=capture["duration"],
+                request_id=context.request_id,
+                top=capture.get("top") or [],
+                pstats=capture.get("pstats"),
+                collapsed=capture.get("collapsed")
+            ))
+
+        context.profile_callback = collect
@@ -0,0 +1,152 @@
+"""
+插件注册快照 - 不执行插件代码即可读取模块注册信息
+"""
+import hashlib
+import json
+import os
+import threading
+from dataclasses import fields
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+from .interfaces import Module, Widget, WidgetType, SelectOption, ValidationRule, ResourceLimits
+
+
+SNAPSHOT_FILE = ".registry_cache.json"
+SNAPSHOT_VERSION = 1
+
+
+def _plain(value: Any) -> Any:
+    """把枚举和dataclass转换为可JSON序列化的值"""
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "__dataclass_fields__"):
+        return {f.name: _plain(getattr(value, f.name)) for f in fields(value)}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    return value
+
+
+def module_to_dict(module: Module) -> Dict[str, Any]:
+    """序列化模块注册信息（处理器类只记录类名）"""
+    data = {}
+    for f in fields(Module):
+        if f.name == "handler_class":
+            data[f.name] = module.handler_class.__name__
+        else:
+            data[f.name] = _plain(getattr(module, f.name))
+    return data
+
+
+def _widget_from_dict(data: Dict[str, Any]) -> Widget:
+    return Widget(
+        name=data["name"],
+        label=data["label"],
+        widget_type=WidgetType(data["widget_type"]),
+        placeholder=data.get("placeholder", ""),
+        default_value=data.get("default_value", ""),
+        help_text=data.get("help_text", ""),
+        options=[SelectOption(**opt) for opt in data.get("options", [])],
+        validation=ValidationRule(**data.get("validation", {}))
+    )
+
+
+def module_from_dict(data: Dict[str, Any]) -> Module:
+    """从快照还原模块（handler_class 为空，首次执行时再导入插件）"""
+    kwargs = {}
+    for f in fields(Module):
+        if f.name == "handler_class" or f.name not in data:
+            continue
+        if f.name == "widgets":
+            kwargs["widgets"] = [_widget_from_dict(w) for w in data["widgets"]]
+        elif f.name == "limits":
+            kwargs["limits"] = ResourceLimits(**data["limits"])
+        else:
+            kwargs[f.name] = data[f.name]
+    return Module(handler_class=None, **kwargs)
+
+
+def file_fingerprint(path: Path) -> Dict[str, Any]:
+    """文件指纹: 修改时间、大小和内容哈希"""
+    stat = path.stat()
+    return {
+        "mtime": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": hashlib.sha256(path.read_bytes()).hexdigest()
+    }
+
+
+class RegistrySnapshot:
+    """插件注册快照
+
+    以插件 main.py 的修改时间和内容哈希为键缓存 register() 的结果。
+    修改时间和大小都未变化时直接命中；修改时间变化但内容哈希相同时同样命中。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") == SNAPSHOT_VERSION:
+            self._entries = data.get("plugins", {})
+
+    def lookup(self, plugin_id: str, main_file: Path) -> Optional[Dict[str, Any]]:
+        """查找仍然有效的快照，返回 {module_id: 模块字典}"""
+        entry = self._entries.get(plugin_id)
+        if not entry:
+            return None
+
+        stat = main_file.stat()
+        if entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry["modules"]
+
+        if hashlib.sha256(main_file.read_bytes()).hexdigest() == entry["sha256"]:
+            with self._lock:
+                entry["mtime"] = stat.st_mtime_ns
+                self._dirty = True
+            return entry["modules"]
+        return None
+
+    def store(self, plugin_id: str, main_file: Path, modules: Dict[str, Module]) -> None:
+        """记录插件的注册结果"""
+        entry = file_fingerprint(main_file)
+        entry["modules"] = {
+            module_id: module_to_dict(module) for module_id, module in modules.items()
+        }
+        with self._lock:
+            self._entries[plugin_id] = entry
+            self._dirty = True
+
+    def discard(self, plugin_id: str) -> None:
+        """删除插件的快照"""
+        with self._lock:
+            if self._entries.pop(plugin_id, None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        """有变化时写回快照文件（先写临时文件再替换）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(
+                {"version": SNAPSHOT_VERSION, "plugins": self._entries},
+                ensure_ascii=False
+            )
+            self._dirty = False
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            tmp_path.write_text(payload, encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"写入插件注册快照失败: {e}")
@@ -0,0 +1,240 @@
+"""
+结果缓存 - 缓存可复现的模块执行结果（内存 LRU + 可选的磁盘缓存）
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Any, Tuple
+
+
+@dataclass
+class CacheEntry:
+    """缓存条目：编码后的结果数据和结果消息"""
+    module_id: str
+    payload: bytes
+    message: str
+    expires_at: Optional[float]
+
+    @property
+    def size(self) -> int:
+        return len(self.payload)
+
+    def expired(self, now: float) -> bool:
+        return self.expires_at is not None and now >= self.expires_at
+
+
+def cache_key(module_id: str, version: str, code_hash: str, data: Dict[str, Any],
+              seed: Optional[int], reference_time: Optional[float]) -> str:
+    """缓存键：模块、版本、插件代码、规范化的参数（键排序）、种子和参考时间"""
+    material = json.dumps(
+        [module_id, version, code_hash, data, seed, reference_time],
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.blake2b(material.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class ResultCache:
+    """结果缓存
+
+    内存中按 LRU 保存，总大小超过 max_bytes 时淘汰最久未使用的条目；单个结果超过
+    max_entry_bytes 时不缓存。指定 directory 时同时写入磁盘，内存未命中时从磁盘读取，
+    磁盘总大小超过 max_disk_bytes 时删除最久未使用的文件。
+    磁盘文件按模块分目录存放：<directory>/<module_id>/<key>.bin，内容为头部一行 + 结果数据。
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, default_ttl: Optional[float] = 3600,
+                 max_entry_bytes: Optional[int] = None, directory: Optional[str] = None,
+                 max_disk_bytes: int = 4 * 1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 4
+        self.directory = Path(directory) if directory else None
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._disk: "OrderedDict[str, Tuple[Path, int]]" = OrderedDict()  # 键 -> (文件, 大小)，按最近使用排序
+        self._disk_bytes = 0
+        self._stats = {
+            "hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0,
+            "stores": 0, "evictions": 0, "expirations": 0, "invalidations": 0
+        }
+        if self.directory:
+            self._scan_disk()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """查找未过期的条目"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not entry.expired(now):
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return entry
+                self._remove(key)
+                self._stats["expirations"] += 1
+
+        entry = self._read_disk(key, now) if self.directory else None
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["disk_hits"] += 1
+            self._insert(key, entry)
+        return entry
+
+    def put(self, key: str, module_id: str, payload: bytes, message: str = "",
+            ttl: Optional[float] = None) -> bool:
+        """保存结果，结果过大时不缓存并返回 False"""
+        if len(payload) > self.max_entry_bytes:
+            return False
+        ttl = ttl if ttl is not None else self.default_ttl
+        entry = CacheEntry(module_id, payload, message, time.time() + ttl if ttl else None)
+        with self._lock:
+            self._insert(key, entry)
+            self._stats["stores"] += 1
+        if self.directory:
+            self._write_disk(key, entry)
+        return True
+
+    def invalidate(self, module_id: str) -> int:
+        """删除模块的所有缓存（插件重新加载或卸载时调用），返回删除的内存条目数"""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry.module_id == module_id]
+            for key in keys:
+                self._remove(key)
+            for key in [k for k, (path, _) in self._disk.items() if path.parent.name == module_id]:
+                self._disk_bytes -= self._disk.pop(key)[1]
+            self._stats["invalidations"] += 1
+        if self.directory:
+            shutil.rmtree(self.directory / module_id, ignore_errors=True)
+        return len(keys)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            modules = {path.parent for path, _ in self._disk.values()}
+            self._disk.clear()
+            self._disk_bytes = 0
+        for module_dir in modules:
+            shutil.rmtree(module_dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率、条目数和占用空间"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes
+            }
+
+    def _insert(self, key: str, entry: CacheEntry) -> None:
+        """写入内存并按大小淘汰（调用方需持有锁）"""
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    # ---- 磁盘缓存 ----
+
+    def _disk_path(self, key: str, module_id: str) -> Path:
+        return self.directory / module_id / f"{key}.bin"
+
+    def _scan_disk(self) -> None:
+        """启动时统计已有的磁盘缓存文件"""
+        files = []
+        for path in self.directory.glob("*/*.bin"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(files):
+            self._disk[path.stem] = (path, size)
+            self._disk_bytes += size
+
+    def _read_disk(self, key: str, now: float) -> Optional[CacheEntry]:
+        with self._lock:
+            path = self._disk[key][0] if key in self._disk else None
+        if path is None:
+            return None
+        try:
+            header, _, payload = path.read_bytes().partition(b"\n")
+            meta = json.loads(header)
+        except (OSError, ValueError):
+            self._drop_disk(key)
+            return None
+        entry = CacheEntry(path.parent.name, payload, meta.get("message", ""), meta.get("expires_at"))
+        if entry.expired(now):
+            with self._lock:
+                self._stats["expirations"] += 1
+            self._drop_disk(key)
+            return None
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def _write_disk(self, key: str, entry: CacheEntry) -> None:
+        path = self._disk_path(key, entry.module_id)
+        header = json.dumps({"message": entry.message, "expires_at": entry.expires_at},
+                            ensure_ascii=False).encode("utf-8")
+        tmp_path = path.with_name(path.name + ".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(header + b"\n")
+                f.write(entry.payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"写入结果缓存失败: {e}")
+            return
+
+        evicted = []
+        with self._lock:
+            if key in self._disk:
+                self._disk_bytes -= self._disk.pop(key)[1]
+            self._disk[key] = (path, entry.size)
+            self._disk_bytes += entry.size
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+                _, (oldest, size) = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                evicted.append(oldest)
+                self._stats["evictions"] += 1
+        for oldest in evicted:
+            oldest.unlink(missing_ok=True)
+
+    def _drop_disk(self, key: str) -> None:
+        with self._lock:
+            path, size = self._disk.pop(key, (None, 0))
+            self._disk_bytes -= size
+        if path is not None:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,142 @@
+"""
+JSON序列化 - 优先使用 orjson，未安装时使用标准库 json
+"""
+import dataclasses
+import json
+import os
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from enum import Enum
+from pathlib import PurePath
+from typing import Dict, Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class EncodedJSON:
+    """已经编码好的 JSON 字节
+
+    隔离执行的结果数据以这种形式从工作进程返回，主进程不解码，由 Web 层直接拼接到响应中。
+    """
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: bytes):
+        self.payload = payload
+
+    def decode(self) -> Any:
+        return loads(self.payload)
+
+    def __len__(self) -> int:
+        return len(self.payload)
+
+    def __repr__(self) -> str:
+        return f"EncodedJSON({len(self.payload)} bytes)"
+
+
+def _default(obj: Any) -> Any:
+    """标准库 json 和 orjson 都不能直接编码的类型"""
+    if isinstance(obj, EncodedJSON):
+        return obj.decode()
+    if isinstance(obj, (datetime, date, dt_time)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, PurePath):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "tolist"):  # NumPy 数组和标量
+        return obj.tolist()
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+class JsonSerializer:
+    """标准库 json"""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"),
+                          default=_default).encode("utf-8")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer(JsonSerializer):
+    """orjson（比标准库快数倍，直接输出UTF-8字节）"""
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ValueError("未安装 orjson")
+        self._options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, default=_default, option=self._options)
+        except TypeError:
+            # orjson 不支持的值（超过64位的整数等）退回标准库
+            return super().dumps(obj)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+
+SERIALIZERS = {
+    "json": JsonSerializer,
+    "orjson": OrjsonSerializer,
+}
+
+
+def _create_serializer(name: str) -> JsonSerializer:
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name not in SERIALIZERS:
+        raise ValueError(f"不支持的序列化器: {name}")
+    return SERIALIZERS[name]()
+
+
+# 当前使用的序列化器，DATA_FACTORY_SERIALIZER 环境变量可指定 json / orjson（默认 auto）
+_serializer = _create_serializer(os.environ.get("DATA_FACTORY_SERIALIZER", "auto"))
+
+
+def set_serializer(name: str) -> None:
+    """切换序列化器"""
+    global _serializer
+    _serializer = _create_serializer(name)
+
+
+def serializer_name() -> str:
+    return _serializer.name
+
+
+def dumps(obj: Any) -> bytes:
+    """编码为UTF-8 JSON字节"""
+    return _serializer.dumps(obj)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    return _serializer.loads(data)
+
+
+def encode_envelope(envelope: Dict[str, Any]) -> bytes:
+    """编码结果信封 {"status", "data", "message", ...}
+
+    data 为 EncodedJSON 时不解码，把编码好的字节直接拼接进去。
+    """
+    data = envelope.get("data")
+    if not isinstance(data, EncodedJSON):
+        return dumps(envelope)
+    head = dumps({key: value for key, value in envelope.items() if key != "data"})
+    separator = b',"data":' if len(head) > 2 else b'"data":'
+    return head[:-1] + separator + data.payload + b"}"
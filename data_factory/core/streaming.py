@@ -0,0 +1,157 @@
+"""
+流式输出 - 记录流及其 NDJSON / JSON 数组编码
+"""
+import itertools
+import time
+from typing import Dict, List, Optional, Any, Callable, Iterator, Tuple
+
+from .interfaces import ResourceLimits
+from .limits import LimitExceeded, check
+from .serialization import dumps
+
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "json-stream": "application/json",
+}
+
+
+class RecordStream:
+    """包装处理器 stream() 返回的生成器，记录条数并在结束时取得汇总信息
+
+    指定 max_rows 时，生成器产出的记录超过该数量后关闭生成器并抛出 LimitExceeded。
+    """
+
+    def __init__(self, generator: Iterator[Dict[str, Any]],
+                 on_close: Optional[Callable[[], None]] = None, max_rows: Optional[int] = None):
+        self._generator = generator
+        self._on_close = on_close
+        self._limits = ResourceLimits(max_rows=max_rows) if max_rows is not None else None
+        self.count = 0
+        self.summary: Any = None
+        self.finished = False
+        self.started_at = time.time()
+
+    def __iter__(self) -> "RecordStream":
+        return self
+
+    def __next__(self) -> Dict[str, Any]:
+        if self.finished:
+            raise StopIteration
+        try:
+            record = next(self._generator)
+        except StopIteration as e:
+            self.summary = e.value
+            self._finish()
+            raise
+        except BaseException:
+            self._finish()
+            raise
+        if self._limits is not None:
+            try:
+                check(self._limits, rows=self.count + 1)
+            except LimitExceeded:
+                self.close()
+                raise
+        self.count += 1
+        return record
+
+    def take(self, size: int) -> List[Dict[str, Any]]:
+        """取出最多 size 条记录"""
+        return list(itertools.islice(self, size))
+
+    def close(self) -> None:
+        """提前结束生成器"""
+        close = getattr(self._generator, "close", None)
+        if close:
+            close()
+        self._finish()
+
+    def _finish(self) -> None:
+        self.finished = True
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            on_close()
+
+
+def drain(generator: Iterator[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Any]:
+    """把流式生成器收集为 (记录列表, 汇总信息)，供 handle() 复用 stream() 的实现"""
+    summary = None
+    
+    def collect():
+        # yield from 在解释器内部逐条转发，比逐条调用 next() 快得多
+        nonlocal summary
+        summary = yield from generator
+    
+    records = list(collect())
+    return records, summary
+
+
+class StreamEncoder:
+    """把记录流编码为字节块
+
+    ndjson: 每行一条记录，最后一行是 {"_trailer": {...}}
+    json-stream: {"data": [记录...], "_trailer": {...}}
+    每次 next_chunk() 编码 chunk_size 条记录，内存占用与总条数无关。
+    """
+
+    def __init__(self, stream: RecordStream, fmt: str = "ndjson", chunk_size: int = 1000):
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"不支持的流式格式: {fmt}")
+        self.stream = stream
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.media_type = STREAM_FORMATS[fmt]
+        self.done = False
+        self.error: Optional[Exception] = None  # 生成中途的异常（已写入 _trailer）
+        self._started = False
+        self._wrote_record = False
+
+    def next_chunk(self) -> bytes:
+        """编码下一块数据，流结束后返回空字节串
+
+        第一块中还没有输出任何记录时出现的异常（通常是参数校验失败）会直接抛出，
+        调用方可以据此返回普通的错误响应；之后的异常写入结尾的 _trailer。
+        """
+        if self.done:
+            return b""
+
+        error: Optional[Exception] = None
+        records: List[Dict[str, Any]] = []
+        try:
+            for record in itertools.islice(self.stream, self.chunk_size):
+                records.append(record)
+        except Exception as e:
+            if not self._started and self.stream.count == 0:
+                raise
+            error = self.error = e
+
+        parts = []
+        if not self._started and self.fmt == "json-stream":
+            parts.append(b'{"data":[')
+        for record in records:
+            encoded = dumps(record)
+            if self.fmt == "ndjson":
+                parts.append(encoded + b"\n")
+            else:
+                parts.append(b"," + encoded if self._wrote_record else encoded)
+            self._wrote_record = True
+        self._started = True
+
+        if self.stream.finished or error is not None:
+            parts.append(self._encode_trailer(error))
+            self.done = True
+        return b"".join(parts)
+
+    def _encode_trailer(self, error: Optional[Exception]) -> bytes:
+        trailer = {
+            "status": "error" if error else "success",
+            "message": f"生成中断: {error}" if error else f"成功生成 {self.stream.count} 条数据",
+            "total_count": self.stream.count,
+            "summary": self.stream.summary,
+            "execution_time": time.time() - self.stream.started_at
+        }
+        encoded = dumps(trailer)
+        if self.fmt == "ndjson":
+            return b'{"_trailer":' + encoded + b"}\n"
+        return b'],"_trailer":' + encoded + b"}"
@@ -0,0 +1,323 @@
+"""
+链路追踪 - 轻量的 span 记录，跨线程和工作进程传递，以 OTLP JSON 格式导出到文件或收集器
+"""
+import contextlib
+import contextvars
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from typing import Dict, Any, Iterator, List, Optional, Union
+
+from .serialization import dumps
+
+
+# span 类型（OTLP 的 SpanKind）
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+
+# span 状态（OTLP 的 StatusCode）
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+SERVICE_NAME = "data-factory"
+
+
+class Span:
+    """一个计时区间（时间为 Unix 纳秒，不同进程的 span 可以直接比较）"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "status", "message")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.status = STATUS_UNSET
+        self.message = ""
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent 格式，传给其他线程或进程作为父 span"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.status = STATUS_ERROR
+        self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        """传回主进程的形式"""
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "kind": self.kind, "start_ns": self.start_ns, "end_ns": self.end_ns,
+            "attributes": self.attributes, "status": self.status, "message": self.message
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Span":
+        span = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(span, name, data.get(name))
+        return span
+
+
+class _RemoteParent:
+    """其他线程或进程中的父 span（只有 ID）"""
+
+    __slots__ = ("trace_id", "span_id")
+
+    def __init__(self, trace_id: str, span_id: str):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[_RemoteParent]:
+    """解析 W3C traceparent，格式错误或未采样（flags 为00）时返回 None"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[3] == "00":
+        return None
+    return _RemoteParent(parts[1], parts[2])
+
+
+# ---- 导出 ----
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    data = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+        "status": {"code": span.status, "message": span.message} if span.status else {}
+    }
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+    return data
+
+
+def otlp_request(spans: List[Span]) -> Dict[str, Any]:
+    """OTLP/JSON 的 ExportTraceServiceRequest"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                {"key": "process.pid", "value": {"intValue": str(os.getpid())}}
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "data_factory"},
+                "spans": [_otlp_span(span) for span in spans]
+            }]
+        }]
+    }
+
+
+class BatchExporter:
+    """在后台线程中批量导出 span，请求线程只把 span 放入有界队列（队列满时丢弃并计数）"""
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 512, flush_interval: float = 1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name="data-factory-trace-export", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self) -> None:
+        """导出剩余的 span 并停止后台线程"""
+        self._queue.put(None)
+        self._thread.join(5.0)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                try:
+                    self.write(batch)
+                except Exception as e:
+                    print(f"导出链路追踪数据失败: {e}")
+
+    def write(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+
+class FileExporter(BatchExporter):
+    """追加写入 OTLP JSON Lines 文件（每行一个 ExportTraceServiceRequest，OpenTelemetry Collector 的 otlpjsonfile 接收器可读取）"""
+
+    def __init__(self, path: str, **kwargs: Any):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(**kwargs)
+
+    def write(self, spans: List[Span]) -> None:
+        with open(self.path, "ab") as f:
+            f.write(dumps(otlp_request(spans)) + b"\n")
+
+
+class HttpExporter(BatchExporter):
+    """以 OTLP/HTTP JSON 发送到收集器（例如 http://localhost:4318/v1/traces）"""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0, **kwargs: Any):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def write(self, spans: List[Span]) -> None:
+        request = urllib.request.Request(
+            self.endpoint, data=dumps(otlp_request(spans)),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+# ---- 记录 ----
+
+_exporter: Optional[BatchExporter] = None
+_sample_rate = 1.0
+_current: "contextvars.ContextVar[Union[Span, _RemoteParent, None]]" = contextvars.ContextVar(
+    "data_factory_span", default=None
+)
+_collector: "contextvars.ContextVar[Optional[List[Span]]]" = contextvars.ContextVar(
+    "data_factory_span_collector", default=None
+)
+
+
+def configure(exporter: Optional[BatchExporter], sample_rate: float = 1.0) -> None:
+    """设置导出器和根 span 的采样率（exporter 为 None 时不创建新的链路）"""
+    global _exporter, _sample_rate
+    _exporter = exporter
+    _sample_rate = sample_rate
+
+
+def shutdown() -> None:
+    """导出剩余的 span"""
+    global _exporter
+    exporter, _exporter = _exporter, None
+    if exporter is not None:
+        exporter.shutdown()
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def current_traceparent() -> Optional[str]:
+    """当前 span 的 traceparent（没有正在记录的链路时为 None）"""
+    current = _current.get()
+    return current.traceparent if current is not None else None
+
+
+@contextlib.contextmanager
+def span(name: str, parent: Optional[str] = None, root: bool = False, kind: int = KIND_INTERNAL,
+         attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Span]]:
+    """记录一个 span，作为当前 span 的子 span（with 语句中创建的 span 以它为父 span）
+
+    parent 为其他线程或进程传来的 traceparent；没有父 span 时只有 root=True 且已配置导出器时
+    才按采样率开始新的链路，否则不记录（返回 None），未追踪的执行几乎没有开销。
+    """
+    parent_span = parse_traceparent(parent) if parent is not None else _current.get()
+    if parent_span is None:
+        if not root or _exporter is None or random.random() >= _sample_rate:
+            yield None
+            return
+        trace_id, parent_id = os.urandom(16).hex(), None
+    else:
+        trace_id, parent_id = parent_span.trace_id, parent_span.span_id
+
+    current = Span(name, trace_id, parent_id, kind, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_error(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current.reset(token)
+        _finish(current)
+
+
+@contextlib.contextmanager
+def attach(traceparent: Optional[str]) -> Iterator[None]:
+    """把其他线程或进程中的 span 设为当前 span（traceparent 为 None 时不做任何事）"""
+    parent = parse_traceparent(traceparent)
+    if parent is None:
+        yield
+        return
+    token = _current.set(parent)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[List[Span]]:
+    """收集结束的 span，不交给导出器（工作进程把它们放在结果头部传回主进程）"""
+    spans: List[Span] = []
+    token = _collector.set(spans)
+    try:
+        yield spans
+    finally:
+        _collector.reset(token)
+
+
+def emit(spans: Optional[List[Dict[str, Any]]]) -> None:
+    """导出工作进程传回的 span"""
+    for data in spans or ():
+        _finish(Span.from_dict(data))
+
+
+def _finish(finished: Span) -> None:
+    collector = _collector.get()
+    if collector is not None:
+        collector.append(finished)
+    elif _exporter is not None:
+        _exporter.export(finished)
@@ -0,0 +1,145 @@
+"""
+结果传输 - 隔离执行的大结果通过内存映射文件返回，不经过管道
+"""
+import mmap
+import os
+import tempfile
+import uuid
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+from .serialization import EncodedJSON, dumps, loads
+
+
+# 默认超过 1MB 的结果写入内存映射文件
+DEFAULT_INLINE_LIMIT = 1024 * 1024
+
+# 向响应写出映射文件时每块的大小
+CHUNK_SIZE = 1024 * 1024
+
+
+def result_dir() -> str:
+    """结果文件目录：优先使用 /dev/shm（内存文件系统），否则使用系统临时目录"""
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+def result_path() -> str:
+    """主进程为一次隔离执行分配的结果文件路径
+
+    工作进程的结果超过 inline_limit 时写入该路径；主进程在执行结束后（包括超时、取消和工作进程崩溃）
+    调用 discard_result_file() 删除，工作进程被强制结束时不会留下文件。
+    """
+    return os.path.join(result_dir(), f"data-factory-result-{uuid.uuid4().hex}.json")
+
+
+def write_result_file(payload: bytes, path: Optional[str] = None) -> str:
+    """把编码后的结果写入 path（未指定时新建临时文件），返回路径（由主进程映射后删除）"""
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="data-factory-result-", suffix=".json", dir=result_dir())
+    else:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(payload)
+    return path
+
+
+def discard_result_file(path: str) -> None:
+    """删除结果文件（结果已经被映射或者工作进程没有写入时文件不存在）"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class MappedJSON(EncodedJSON):
+    """映射到内存的 JSON 结果文件
+
+    打开后立即删除文件（映射在关闭前仍然有效），写出响应时按块读取映射区域，
+    主进程不需要一次性持有整个结果。
+    """
+
+    __slots__ = ("_mmap", "_size")
+
+    def __init__(self, path: str):
+        try:
+            with open(path, "rb") as f:
+                self._size = os.fstat(f.fileno()).st_size
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+        finally:
+            os.unlink(path)
+
+    @property
+    def payload(self) -> bytes:
+        return self._mmap[:] if self._mmap is not None else b"null"
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self) -> str:
+        return f"MappedJSON({self._size} bytes)"
+
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """按块读取结果"""
+        if self._mmap is None:
+            yield b"null"
+            return
+        for offset in range(0, self._size, chunk_size):
+            yield self._mmap[offset:offset + chunk_size]
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+
+
+def spill_payload(header: Dict[str, Any], payload: bytes, inline_limit: Optional[int],
+                  path: Optional[str] = None) -> Tuple[Dict[str, Any], bytes]:
+    """结果超过 inline_limit 时写入文件（path 为主进程分配的路径），头部记录文件路径，
+    返回 (头部, 管道中传输的数据)"""
+    if inline_limit is None or len(payload) <= inline_limit:
+        return header, payload
+    return {**header, "result_file": write_result_file(payload, path)}, b""
+
+
+def _check_result_file(path: str, expected: Optional[str]) -> None:
+    """只接受主进程分配的结果文件路径（未指定时只接受结果目录中的结果文件），
+    工作进程不能让主进程读取并删除其他文件"""
+    if expected is not None:
+        if path != expected:
+            raise ValueError(f"结果文件不是分配的路径: {path}")
+        return
+    real = os.path.realpath(path)
+    if (os.path.dirname(real) != os.path.realpath(result_dir())
+            or not os.path.basename(real).startswith("data-factory-result-")):
+        raise ValueError(f"结果文件不在结果目录中: {path}")
+
+
+def receive_payload(header: Dict[str, Any], payload: bytes, encoded: bool = False,
+                    result_path: Optional[str] = None) -> Any:
+    """还原结果数据：encoded=True 时返回 EncodedJSON / MappedJSON，否则解码为 Python 对象
+
+    result_path 为主进程分配给这次执行的结果文件路径，头部的 result_file 必须与它相同；
+    结果文件不合法时抛出 ValueError，文件不存在或无法映射时抛出 OSError。
+    """
+    result_file = header.get("result_file")
+    if result_file:
+        _check_result_file(result_file, result_path)
+        mapped = MappedJSON(result_file)
+        if encoded:
+            return mapped
+        try:
+            return loads(mapped.payload)
+        finally:
+            mapped.close()
+    return EncodedJSON(payload) if encoded else loads(payload)
+
+
+def iter_envelope(envelope: Dict[str, Any], data: MappedJSON) -> Iterator[bytes]:
+    """按块编码结果信封，data 部分直接读取映射文件，读完后关闭映射"""
+    try:
+        head = dumps({key: value for key, value in envelope.items() if key != "data"})
+        yield head[:-1] + (b',"data":' if len(head) > 2 else b'"data":')
+        yield from data.iter_chunks()
+        yield b"}"
+    finally:
+        data.close()
@@ -0,0 +1,210 @@
+"""
+参数校验 - 把模块的控件校验规则编译为校验器
+"""
+import math
+import re
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Any
+
+from .interfaces import Module, Widget, WidgetType
+
+
+_TRUE_VALUES = ("1", "true", "yes", "on")
+_FALSE_VALUES = ("0", "false", "no", "off")
+
+# 字符串类控件: 空字符串原样保留，由处理器决定默认值
+_TEXT_TYPES = (WidgetType.INPUT, WidgetType.TEXTAREA)
+
+
+class ValidationError(Exception):
+    """参数校验失败"""
+
+    def __init__(self, errors: List[Dict[str, str]]):
+        self.errors = errors
+        super().__init__("；".join(error["message"] for error in errors))
+
+
+class _Invalid(Exception):
+    """单个字段校验失败（内部使用）"""
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip()) or value == []
+
+
+def _to_number(value: Any) -> Any:
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, (int, float)):
+        number = value
+    elif isinstance(value, str):
+        text = value.strip()
+        try:
+            number = int(text)
+        except ValueError:
+            number = float(text)
+    else:
+        raise ValueError
+    if isinstance(number, float) and not math.isfinite(number):
+        raise ValueError
+    return number
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in _TRUE_VALUES:
+            return True
+        if text in _FALSE_VALUES:
+            return False
+    raise ValueError
+
+
+def _to_date(value: Any) -> str:
+    if not isinstance(value, str):
+        raise ValueError
+    text = value.strip()
+    datetime.fromisoformat(text)
+    return text
+
+
+class FieldValidator:
+    """单个控件的校验器（正则和选项集合在编译时准备好）"""
+
+    def __init__(self, widget: Widget):
+        rule = widget.validation
+        self.name = widget.name
+        self.label = widget.label or widget.name
+        self.widget_type = widget.widget_type
+        self.required = rule.required
+        self.default_value = widget.default_value
+        self.min_length = rule.min_length
+        self.max_length = rule.max_length
+        self.min_value = rule.min_value
+        self.max_value = rule.max_value
+        try:
+            self.pattern = re.compile(rule.pattern) if rule.pattern else None
+        except re.error as e:
+            raise ValueError(f"控件 {widget.name} 的校验正则无效: {e}")
+        self.choices = frozenset(
+            str(option.value) for option in widget.options if not option.disabled
+        )
+        self._coerce = self._build_coercer()
+
+    def _build_coercer(self) -> Callable[[Any], Any]:
+        if self.widget_type == WidgetType.NUMBER:
+            return self._coerce_number
+        if self.widget_type == WidgetType.SELECT:
+            return self._coerce_choice
+        if self.widget_type == WidgetType.CHECKBOX:
+            return self._coerce_choices if self.choices else self._coerce_bool
+        if self.widget_type == WidgetType.DATE:
+            return self._coerce_date
+        return self._coerce_text
+
+    def validate(self, data: Dict[str, Any], output: Dict[str, Any]) -> None:
+        """校验 data 中的字段，把转换后的值写入 output"""
+        value = data.get(self.name)
+        if self.name not in data and not self.required and not _is_empty(self.default_value):
+            # 非必填字段缺失时使用控件默认值（必填字段必须由调用方提供）
+            value = self.default_value
+        if _is_empty(value):
+            if self.required:
+                raise _Invalid(f"{self.label}不能为空")
+            # 非必填的空值: 文本保留原值，其他类型去掉该字段，交给处理器的默认值
+            if self.widget_type not in _TEXT_TYPES:
+                output.pop(self.name, None)
+            return
+        output[self.name] = self._coerce(value)
+
+    def _check_length(self, text: str) -> None:
+        if self.min_length is not None and len(text) < self.min_length:
+            raise _Invalid(f"{self.label}长度不能少于{self.min_length}个字符")
+        if self.max_length is not None and len(text) > self.max_length:
+            raise _Invalid(f"{self.label}长度不能超过{self.max_length}个字符")
+        if self.pattern is not None and not self.pattern.search(text):
+            raise _Invalid(f"{self.label}格式不正确")
+
+    def _coerce_text(self, value: Any) -> str:
+        if isinstance(value, (dict, list)):
+            raise _Invalid(f"{self.label}必须是文本")
+        text = value if isinstance(value, str) else str(value)
+        self._check_length(text)
+        return text
+
+    def _coerce_number(self, value: Any) -> Any:
+        try:
+            number = _to_number(value)
+        except (TypeError, ValueError):
+            raise _Invalid(f"{self.label}必须是数字")
+        if self.min_value is not None and number < self.min_value:
+            raise _Invalid(f"{self.label}不能小于{self.min_value}")
+        if self.max_value is not None and number > self.max_value:
+            raise _Invalid(f"{self.label}不能大于{self.max_value}")
+        return number
+
+    def _coerce_choice(self, value: Any) -> str:
+        text = str(value)
+        if self.choices and text not in self.choices:
+            raise _Invalid(f"{self.label}的取值无效: {text}")
+        return text
+
+    def _coerce_choices(self, value: Any) -> List[str]:
+        values = value.split(",") if isinstance(value, str) else value
+        if not isinstance(values, list):
+            raise _Invalid(f"{self.label}必须是选项列表")
+        return [self._coerce_choice(v.strip() if isinstance(v, str) else v) for v in values]
+
+    def _coerce_bool(self, value: Any) -> bool:
+        try:
+            return _to_bool(value)
+        except ValueError:
+            raise _Invalid(f"{self.label}必须是布尔值")
+
+    def _coerce_date(self, value: Any) -> str:
+        try:
+            text = _to_date(value)
+        except ValueError:
+            raise _Invalid(f"{self.label}不是有效的日期")
+        self._check_length(text)
+        return text
+
+
+class ModuleValidator:
+    """模块参数校验器
+
+    模块注册时编译一次，执行前校验并按控件类型转换参数（例如查询参数中的数字字符串）。
+    未声明为控件的字段原样保留；PARAGRAPH 控件只用于展示，不参与校验。
+    """
+
+    def __init__(self, module: Module):
+        self.fields = [
+            FieldValidator(widget) for widget in module.widgets
+            if widget.widget_type != WidgetType.PARAGRAPH
+        ]
+
+    def validate(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """校验参数并返回转换后的新字典，失败时抛出 ValidationError（包含所有错误字段）"""
+        if not isinstance(data, dict):
+            raise ValidationError([{"field": "", "message": "请求参数必须是JSON对象"}])
+
+        output = dict(data)
+        errors: List[Dict[str, str]] = []
+        for field_validator in self.fields:
+            try:
+                field_validator.validate(data, output)
+            except _Invalid as e:
+                errors.append({"field": field_validator.name, "message": str(e)})
+        if errors:
+            raise ValidationError(errors)
+        return output
+
+
+def compile_validator(module: Module) -> Optional[ModuleValidator]:
+    """编译模块的校验器（没有需要校验的控件时返回 None）"""
+    validator = ModuleValidator(module)
+    return validator if validator.fields else None
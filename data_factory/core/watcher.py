@@ -0,0 +1,114 @@
+"""
+插件目录监视器 - 插件文件变化时只重新加载该插件
+"""
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .plugin_manager import PluginManager
+
+
+def plugin_signature(plugin_path: Path) -> Optional[Tuple[int, int, int]]:
+    """插件目录签名: (最大修改时间, 文件数, 总大小)，忽略 __pycache__ 和隐藏文件"""
+    if not (plugin_path / "main.py").exists():
+        return None
+    latest = count = total = 0
+    for path in plugin_path.rglob("*"):
+        if "__pycache__" in path.parts or path.name.startswith('.') or not path.is_file():
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        latest = max(latest, stat.st_mtime_ns)
+        count += 1
+        total += stat.st_size
+    return latest, count, total
+
+
+class PluginWatcher:
+    """轮询插件目录的后台线程
+
+    每个插件目录单独计算签名，签名变化并在下一次轮询时保持不变（避免读到写了一半的文件）后，
+    调用 PluginManager.reload_plugin() 只重新加载该插件。新增目录会被加载，删除的目录会被卸载。
+    """
+
+    def __init__(self, manager: "PluginManager", interval: float = 1.0):
+        self.manager = manager
+        self.interval = interval
+        self._signatures: Dict[str, Tuple[int, int, int]] = {}
+        self._pending: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """记录当前签名并启动监视线程"""
+        if self._thread is not None:
+            return
+        self._signatures = self._scan()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="data-factory-plugin-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止监视线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _scan(self) -> Dict[str, Tuple[int, int, int]]:
+        signatures = {}
+        plugins_dir = self.manager.plugins_dir
+        if not plugins_dir.exists():
+            return signatures
+        for plugin_path in plugins_dir.iterdir():
+            if plugin_path.is_dir() and not plugin_path.name.startswith('.'):
+                signature = plugin_signature(plugin_path)
+                if signature is not None:
+                    signatures[plugin_path.name] = signature
+        return signatures
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"插件目录监视失败: {e}")
+
+    def poll(self) -> None:
+        """比较一次签名，重新加载已经稳定的变化插件"""
+        current = self._scan()
+        changed = {
+            plugin_id for plugin_id in set(current) | set(self._signatures)
+            if current.get(plugin_id) != self._signatures.get(plugin_id)
+        }
+
+        for plugin_id in changed:
+            signature = current.get(plugin_id)
+            if plugin_id not in self._pending or self._pending[plugin_id] != signature:
+                # 第一次看到这个变化，等下一次轮询确认文件已经写完
+                self._pending[plugin_id] = signature
+                continue
+
+            del self._pending[plugin_id]
+            try:
+                modules = self.manager.reload_plugin(plugin_id)
+                if modules is None:
+                    print(f"插件已卸载: {plugin_id}")
+                else:
+                    print(f"插件已重新加载: {plugin_id} ({len(modules)} 个模块)")
+            except Exception as e:
+                print(f"重新加载插件失败 {plugin_id}: {e}")
+            # 加载失败也记录签名，文件再次修改时重试
+            if signature is None:
+                self._signatures.pop(plugin_id, None)
+            else:
+                self._signatures[plugin_id] = signature
+
+        for plugin_id in list(self._pending):
+            if plugin_id not in changed:
+                del self._pending[plugin_id]
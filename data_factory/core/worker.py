@@ -0,0 +1,286 @@
+"""
+隔离执行工作进程
+"""
+import importlib.util
+import sys
+import time
+import traceback
+from contextlib import contextmanager
+from dataclasses import fields
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from .interfaces import (
+    Handler, ExecutionContext, ThreadSafety, CancellationToken, ExecutionCancelled, ResourceLimits
+)
+from .handler_cache import create_handler, dispose_handler
+from .limits import LimitExceeded, ProcessLimits, check, limits_from_dict
+from .metrics import count_rows
+from .profiling import ProfileSession, dump_profile
+from .serialization import dumps, loads
+from . import tracing
+from .transport import spill_payload
+
+
+# 进度帧的最小发送间隔（秒）
+PROGRESS_INTERVAL = 0.1
+
+# 工作进程内的缓存: 插件路径 -> (加载代次, 插件模块), (插件路径, 处理器类名) -> 处理器实例
+_plugin_modules: Dict[str, Tuple[int, Any]] = {}
+_handlers: Dict[Tuple[str, str], Handler] = {}
+
+
+@contextmanager
+def plugin_import_path(plugin_path: str):
+    """导入插件期间把插件目录放在 sys.path 最前面，插件可以导入同目录下的模块"""
+    path = str(Path(plugin_path).resolve())
+    sys.path.insert(0, path)
+    try:
+        yield
+    finally:
+        try:
+            sys.path.remove(path)
+        except ValueError:
+            pass
+
+
+def _load_plugin_module(plugin_path: str, generation: int = 0) -> Any:
+    """导入插件模块（同一加载代次只导入一次，插件重新加载后丢弃旧模块和处理器）"""
+    cached = _plugin_modules.get(plugin_path)
+    if cached is not None:
+        if cached[0] == generation:
+            return cached[1]
+        for key in [k for k in _handlers if k[0] == plugin_path]:
+            dispose_handler(_handlers.pop(key))
+
+    main_file = Path(plugin_path) / "main.py"
+    spec = importlib.util.spec_from_file_location(
+        f"plugin_{Path(plugin_path).name}", main_file
+    )
+    if not spec or not spec.loader:
+        raise ImportError(f"无法加载插件: {plugin_path}")
+
+    plugin_module = importlib.util.module_from_spec(spec)
+    with tracing.span("plugin.import", attributes={"plugin": Path(plugin_path).name}), \
+            plugin_import_path(plugin_path):
+        spec.loader.exec_module(plugin_module)
+    _plugin_modules[plugin_path] = (generation, plugin_module)
+    return plugin_module
+
+
+def _get_handler(plugin_path: str, handler_class_name: str, generation: int = 0) -> Handler:
+    """获取处理器实例（工作进程单线程执行，SHARED 和 PER_THREAD 实例都会缓存）"""
+    plugin_module = _load_plugin_module(plugin_path, generation)
+    key = (plugin_path, handler_class_name)
+    handler = _handlers.get(key)
+    if handler is None:
+        handler = create_handler(getattr(plugin_module, handler_class_name))
+        if handler.thread_safety != ThreadSafety.PER_REQUEST:
+            _handlers[key] = handler
+    return handler
+
+
+def _release_handler(plugin_path: str, handler_class_name: str, handler: Handler) -> None:
+    """释放未缓存的处理器实例"""
+    if _handlers.get((plugin_path, handler_class_name)) is not handler:
+        dispose_handler(handler)
+
+
+class SharedFlagToken(CancellationToken):
+    """读取共享内存标志的取消令牌（主进程取消时把标志置为1）"""
+
+    def __init__(self, flag: Any):
+        super().__init__()
+        self._flag = flag
+
+    @property
+    def cancelled(self) -> bool:
+        return bool(self._flag.value)
+
+
+def _progress_sender(conn: Any) -> Callable[[int, Optional[int]], None]:
+    """把进度作为额外的帧发回主进程（最多每 PROGRESS_INTERVAL 秒一帧，完成时总会发送）"""
+    last = 0.0
+
+    def report(done: int, total: Optional[int] = None) -> None:
+        nonlocal last
+        now = time.monotonic()
+        if now - last >= PROGRESS_INTERVAL or (total is not None and done >= total):
+            last = now
+            conn.send_bytes(dumps({"op": "progress", "done": done, "total": total}))
+
+    return report
+
+
+def _build_context(context_data: Dict[str, Any]) -> ExecutionContext:
+    """根据请求中的字典还原执行上下文"""
+    names = {f.name for f in fields(ExecutionContext)}
+    return ExecutionContext(**{k: v for k, v in context_data.items() if k in names})
+
+
+def execute_request(request: Dict[str, Any], cancel_token: Optional[CancellationToken] = None,
+                    progress_callback: Optional[Callable[[int, Optional[int]], None]] = None
+                    ) -> Dict[str, Any]:
+    """执行单个请求，返回可序列化的输出（上下文指定了 profile 时输出中带有剖析结果）
+
+    请求带有 limits 时在资源限制内执行，超出时输出对应的错误码；输出中的 cpu_time 为消耗的CPU时间。
+    """
+    start_time = time.time()
+    profiles: List[Dict[str, Any]] = []
+    limits = limits_from_dict(request.get("limits"))
+    usage = ProcessLimits(limits)
+    try:
+        plugin_path, handler_class_name = request["plugin_path"], request["handler_class"]
+        handler = _get_handler(plugin_path, handler_class_name, request.get("generation", 0))
+        try:
+            context = _build_context(request.get("context") or {})
+            context.cancel_token = cancel_token
+            context.progress_callback = progress_callback
+            context.profile_callback = profiles.append
+            with tracing.span("handle"), ProfileSession(context), usage:
+                result = handler.handle(request.get("data") or {}, context)
+        finally:
+            _release_handler(plugin_path, handler_class_name, handler)
+        rows = result.rows if result.rows is not None else count_rows(result.data)
+        # 处理器捕获了 SIGXCPU 抛出的异常时，按实际用量检查
+        check(limits, cpu_time=usage.cpu_time, rows=rows)
+        response = {
+            "success": result.status.value == "success",
+            "status": result.status.value,
+            "data": result.data,
+            "message": result.message,
+            "error_code": result.error_code,
+            "execution_time": time.time() - start_time,
+            "rows": rows
+        }
+    except LimitExceeded as e:
+        response = {
+            "success": False,
+            "status": "error",
+            "data": None,
+            "message": e.message,
+            "error_code": e.error_code,
+            "execution_time": time.time() - start_time
+        }
+    except ExecutionCancelled as e:
+        response = {
+            "success": False,
+            "status": "error",
+            "data": None,
+            "message": f"执行已取消: {e}",
+            "error_code": "CANCELLED",
+            "execution_time": time.time() - start_time
+        }
+    except Exception as e:
+        response = {
+            "success": False,
+            "status": "error",
+            "data": None,
+            "message": str(e),
+            "error_code": "EXECUTION_ERROR",
+            "traceback": traceback.format_exc(),
+            "execution_time": time.time() - start_time
+        }
+    response["cpu_time"] = usage.cpu_time
+    if profiles:
+        response["profile"] = dump_profile(profiles[0])
+    return response
+
+
+def encode_response(response: Dict[str, Any], inline_limit: Optional[int] = None,
+                    spans: Optional[List[tracing.Span]] = None,
+                    limits: Optional[ResourceLimits] = None,
+                    result_path: Optional[str] = None) -> Tuple[bytes, bytes]:
+    """把输出编码为 (头部, 结果数据) 两段JSON
+
+    结果数据单独编码，主进程可以不解码直接转发给客户端。
+    结果数据超过 inline_limit 字节时写入内存映射文件（result_path 为主进程分配的路径），
+    头部的 result_file 为文件路径。
+    spans 为这次执行记录的 span，放在头部传回主进程导出。
+    结果数据超过 limits.max_output_bytes 时不传回，头部为 OUTPUT_LIMIT_EXCEEDED 错误。
+    """
+    header = {key: value for key, value in response.items() if key != "data"}
+    try:
+        with tracing.span("serialize"):
+            payload = dumps(response.get("data"))
+        check(limits, output_bytes=len(payload))
+    except LimitExceeded as e:
+        header.update({
+            "success": False,
+            "status": "error",
+            "message": e.message,
+            "error_code": e.error_code,
+            "rows": None
+        })
+        payload = b"null"
+    except (TypeError, ValueError) as e:
+        header.update({
+            "success": False,
+            "status": "error",
+            "message": f"结果无法序列化: {e}",
+            "error_code": "OUTPUT_PARSE_ERROR"
+        })
+        payload = b"null"
+    header, payload = spill_payload(header, payload, inline_limit, result_path)
+    if spans:
+        header["spans"] = [span.to_dict() for span in spans]
+    return dumps(header), payload
+
+
+def _process(request: Dict[str, Any], cancel_token: Optional[CancellationToken] = None,
+             progress_callback: Optional[Callable[[int, Optional[int]], None]] = None
+             ) -> Tuple[bytes, bytes]:
+    """执行请求并编码结果，上下文带有 trace_parent 时记录的 span 随结果头部传回"""
+    trace_parent = (request.get("context") or {}).get("trace_parent")
+    with tracing.collect() as spans, tracing.attach(trace_parent):
+        response = execute_request(request, cancel_token, progress_callback)
+        return encode_response(response, request.get("inline_limit"), spans,
+                               limits_from_dict(request.get("limits")), request.get("result_path"))
+
+
+def worker_main(conn: Any, cancel_flag: Any = None) -> None:
+    """工作进程主循环
+
+    请求通过管道以帧的形式传输（Connection.send_bytes 自带长度前缀），每一帧是一个UTF-8编码的JSON对象；
+    每个结果占两帧：头部（状态、消息等）和结果数据，请求带有 progress 时结果之前还会发送
+    {"op": "progress"} 进度帧。收到 shutdown 指令或管道关闭时退出。
+    cancel_flag 为与主进程共享的取消标志，处理器通过 context.check_cancelled() 读取。
+    """
+    cancel_token = SharedFlagToken(cancel_flag) if cancel_flag is not None else None
+
+    while True:
+        try:
+            payload = conn.recv_bytes()
+        except (EOFError, OSError):
+            break
+
+        request = loads(payload)
+        if request.get("op") == "shutdown":
+            break
+
+        progress = _progress_sender(conn) if request.get("progress") else None
+        header, data = _process(request, cancel_token, progress)
+        conn.send_bytes(header)
+        conn.send_bytes(data)
+
+    for handler in _handlers.values():
+        dispose_handler(handler)
+    conn.close()
+
+
+def run_once() -> None:
+    """单次执行入口（SimpleIsolator 的子进程）
+
+    从标准输入读取一个请求，结果写到标准输出：头部一行，之后是结果数据。
+    插件中的 print 输出重定向到标准错误，不会混入结果。
+    """
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    sys.stdout = sys.stderr
+    request = loads(stdin.read())
+    header, data = _process(request)
+    stdout.write(header + b"\n" + data)
+    stdout.flush()
+
+
+if __name__ == "__main__":
+    run_once()
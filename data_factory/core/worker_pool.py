@@ -0,0 +1,338 @@
+"""
+常驻工作进程池 - 预热的隔离执行环境
+"""
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Any, Tuple, TYPE_CHECKING
+
+from .interfaces import Result, ResultStatus, ExecutionContext, ResourceLimits
+from .limits import MEMORY_LIMIT_EXCEEDED, limits_to_dict
+from .profiling import load_profile
+from . import tracing
+from .serialization import dumps, loads
+from .transport import DEFAULT_INLINE_LIMIT, discard_result_file, receive_payload, result_path
+from .worker import worker_main
+
+if TYPE_CHECKING:
+    from .plugin_manager import PluginInfo
+
+
+class WorkerTimeout(Exception):
+    """工作进程执行超时"""
+
+
+class WorkerCrashed(Exception):
+    """工作进程异常退出"""
+
+
+class WorkerCancelled(Exception):
+    """执行已取消，工作进程在宽限时间内没有结束"""
+
+
+class WorkerProcess:
+    """单个常驻工作进程"""
+
+    def __init__(self, ctx: Any, slot: int):
+        self.slot = slot
+        self.requests = 0
+        self._conn, child_conn = ctx.Pipe()
+        self._cancel_flag = ctx.Value("b", 0, lock=False)  # 取消标志，工作进程中的处理器轮询读取
+        self._process = ctx.Process(
+            target=worker_main,
+            args=(child_conn, self._cancel_flag),
+            name=f"data-factory-worker-{slot}",
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid
+
+    def is_alive(self) -> bool:
+        return self._process.is_alive()
+
+    def call(self, request: Dict[str, Any], timeout: float, context: ExecutionContext = None,
+             cancel_grace: float = 1.0) -> Tuple[Dict[str, Any], bytes]:
+        """发送一个请求帧并等待结果，返回 (头部, 编码后的结果数据)
+
+        等待期间收到的进度帧转交给 context.report_progress()；timeout 是整个请求的时间，不因进度帧重新计时。
+        context 的取消令牌被触发后置位取消标志，cancel_grace 秒内没有返回结果时抛出 WorkerCancelled。
+        """
+        self.requests += 1
+        token = context.cancel_token if context is not None else None
+        deadline = time.monotonic() + timeout
+        cancel_deadline = None
+        self._cancel_flag.value = 0
+        if token is not None:
+            token.add_callback(self._cancel)
+        try:
+            self._conn.send_bytes(dumps(request))
+            while True:
+                cancel_deadline = self._wait(deadline, token, cancel_grace, cancel_deadline)
+                header = loads(self._conn.recv_bytes())
+                if header.get("op") != "progress":
+                    break
+                context.report_progress(header["done"], header.get("total"))
+            # 头部和结果数据连续发送，数据帧很大时可能还没有完全到达
+            if not self._conn.poll(max(0.0, deadline - time.monotonic())):
+                raise WorkerTimeout()
+            payload = self._conn.recv_bytes()
+        except (EOFError, OSError, BrokenPipeError) as e:
+            raise WorkerCrashed(str(e) or "管道已关闭")
+        finally:
+            if token is not None:
+                token.remove_callback(self._cancel)
+        return header, payload
+
+    def _cancel(self) -> None:
+        self._cancel_flag.value = 1
+
+    def _wait(self, deadline: float, token: Any, cancel_grace: float,
+              cancel_deadline: Optional[float]) -> Optional[float]:
+        """等待下一帧，返回取消的截止时间（未取消时为 None）
+
+        deadline 和 cancel_deadline 是整个请求的绝对截止时间，由 call() 在多次等待之间传递：
+        超过 deadline 抛出 WorkerTimeout，取消后超过宽限时间抛出 WorkerCancelled。
+        """
+        while True:
+            now = time.monotonic()
+            if token is not None and token.cancelled and cancel_deadline is None:
+                cancel_deadline = now + cancel_grace
+            if cancel_deadline is not None and now >= cancel_deadline:
+                raise WorkerCancelled()
+            if now >= deadline:
+                raise WorkerTimeout()
+            # 有取消令牌时分段等待，以便及时发现取消
+            wait = deadline - now if token is None else min(deadline - now, 0.05)
+            if cancel_deadline is not None:
+                wait = min(wait, cancel_deadline - now)
+            if self._conn.poll(wait):
+                return cancel_deadline
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """停止工作进程（先礼后兵）"""
+        if self._process.is_alive():
+            try:
+                self._conn.send_bytes(b'{"op": "shutdown"}')
+            except (OSError, BrokenPipeError):
+                pass
+            self._process.join(timeout)
+        self.kill()
+
+    def kill(self) -> None:
+        """强制结束工作进程"""
+        if self._process.is_alive():
+            self._process.kill()
+        self._process.join()
+        self._conn.close()
+
+
+class WorkerPool:
+    """工作进程池
+
+    每个工作进程常驻内存，插件模块和处理器实例在进程内缓存，
+    避免每次调用都重新启动解释器。工作进程处理 max_requests 个请求后回收，
+    超时或崩溃时自动重启；请求被取消后 cancel_grace 秒内没有结束时也会结束并重启工作进程。
+    超出内存限制的工作进程也会重启，不把碎片化的堆留给之后的请求。
+    """
+
+    def __init__(self, size: int = 4, max_requests: int = 1000, timeout: int = 30,
+                 inline_limit: Optional[int] = DEFAULT_INLINE_LIMIT, cancel_grace: float = 1.0):
+        if size < 1:
+            raise ValueError("工作进程池大小至少为1")
+        self.size = size
+        self.max_requests = max_requests
+        self.timeout = timeout
+        self.inline_limit = inline_limit  # 超过该大小的结果通过内存映射文件返回
+        self.cancel_grace = cancel_grace  # 取消后等待处理器自行结束的时间，超过后结束工作进程
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[WorkerProcess]" = queue.Queue()
+        self._workers: List[WorkerProcess] = []
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self.restarts = 0  # 超时、崩溃、取消或超出内存限制后重启的次数
+        self.recycled = 0  # 达到 max_requests 后回收的次数
+
+    def start(self) -> None:
+        """启动所有工作进程"""
+        with self._lock:
+            if self._started or self._closed:
+                return
+            for slot in range(self.size):
+                worker = WorkerProcess(self._ctx, slot)
+                self._workers.append(worker)
+                self._idle.put(worker)
+            self._started = True
+
+    def execute(self, plugin_info: "PluginInfo", handler_class_name: str,
+                data: Dict[str, Any], context: ExecutionContext = None,
+                encoded: bool = False, limits: Optional[ResourceLimits] = None) -> Result:
+        """在工作进程中执行处理器（encoded=True 时结果数据保持为 EncodedJSON，不在主进程解码）
+
+        limits 为模块的资源预算，由工作进程在执行时强制限制。
+        """
+        if self._closed:
+            return Result(
+                status=ResultStatus.ERROR,
+                message="工作进程池已关闭",
+                error_code="POOL_CLOSED"
+            )
+        self.start()
+
+        request = {
+            "plugin_path": plugin_info.path,
+            "generation": plugin_info.generation,
+            "handler_class": handler_class_name,
+            "data": data,
+            "context": context.to_dict() if context else {},
+            "inline_limit": self.inline_limit,
+            "progress": context is not None and context.progress_callback is not None,
+            "result_path": result_path(),
+            "limits": limits_to_dict(limits)
+        }
+
+        try:
+            with tracing.span("pool.acquire"):
+                worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            return Result(
+                status=ResultStatus.ERROR,
+                message=f"等待空闲工作进程超时 ({self.timeout}秒)",
+                error_code="TIMEOUT_ERROR"
+            )
+
+        if not worker.is_alive():
+            worker = self._replace(worker)
+
+        try:
+            return self._call(worker, request, context, encoded)
+        finally:
+            # 工作进程已经返回或被结束；超时、取消或崩溃时工作进程可能已经写入了结果文件
+            discard_result_file(request["result_path"])
+
+    def _call(self, worker: WorkerProcess, request: Dict[str, Any],
+              context: Optional[ExecutionContext], encoded: bool) -> Result:
+        """把请求交给工作进程并解析结果，工作进程超时、被取消或崩溃时重启"""
+        try:
+            with tracing.span("pool.call", attributes={"worker.slot": worker.slot, "process.pid": worker.pid}):
+                # 工作进程中的 span 挂在 pool.call 下面
+                request["context"]["trace_parent"] = tracing.current_traceparent()
+                output, payload = worker.call(request, self.timeout, context, self.cancel_grace)
+        except WorkerCancelled:
+            self._release(self._replace(worker))
+            return Result(
+                status=ResultStatus.ERROR,
+                message=f"执行已取消: {context.cancel_token.reason}",
+                error_code="CANCELLED"
+            )
+        except WorkerTimeout:
+            self._release(self._replace(worker))
+            return Result(
+                status=ResultStatus.ERROR,
+                message=f"执行超时 ({self.timeout}秒)",
+                error_code="TIMEOUT_ERROR"
+            )
+        except WorkerCrashed as e:
+            self._release(self._replace(worker))
+            return Result(
+                status=ResultStatus.ERROR,
+                message=f"工作进程异常退出: {e}",
+                error_code="EXECUTION_ERROR"
+            )
+        except Exception as e:
+            self._release(self._replace(worker))
+            return Result(
+                status=ResultStatus.ERROR,
+                message=str(e),
+                error_code="UNKNOWN_ERROR"
+            )
+
+        try:
+            data = receive_payload(output, payload, encoded, request["result_path"])
+        except (ValueError, OSError) as e:
+            # 结果文件缺失、被截断或不是分配的路径：工作进程状态不可信，重启
+            self._release(self._replace(worker))
+            return Result(
+                status=ResultStatus.ERROR,
+                message=f"结果读取失败: {e}",
+                error_code="OUTPUT_PARSE_ERROR"
+            )
+
+        if output.get("error_code") == MEMORY_LIMIT_EXCEEDED:
+            worker = self._replace(worker)
+        elif worker.requests >= self.max_requests:
+            worker = self._replace(worker, graceful=True)
+        self._release(worker)
+
+        tracing.emit(output.get("spans"))
+        if output.get("profile") and context is not None:
+            context.report_profile(load_profile(output["profile"]))
+        message = output.get("message", "")
+        token = context.cancel_token if context is not None else None
+        if output.get("error_code") == "CANCELLED" and token is not None and token.reason:
+            # 工作进程只能读到取消标志，取消原因在主进程中
+            message = f"执行已取消: {token.reason}"
+        return Result(
+            status=ResultStatus(output.get("status", "error")),
+            data=data,
+            message=message,
+            error_code=output.get("error_code"),
+            execution_time=output.get("execution_time"),
+            rows=output.get("rows"),
+            cpu_time=output.get("cpu_time")
+        )
+
+    def _release(self, worker: WorkerProcess) -> None:
+        """归还工作进程"""
+        if self._closed:
+            worker.stop()
+        else:
+            self._idle.put(worker)
+
+    def _replace(self, worker: WorkerProcess, graceful: bool = False) -> WorkerProcess:
+        """回收或重启工作进程，返回同一槽位上的新进程"""
+        if graceful:
+            worker.stop()
+        else:
+            worker.kill()
+        # 计数器由多个调度线程更新，/metrics 读取
+        with self._lock:
+            if graceful:
+                self.recycled += 1
+            else:
+                self.restarts += 1
+        if self._closed:
+            return worker
+        new_worker = WorkerProcess(self._ctx, worker.slot)
+        with self._lock:
+            self._workers[worker.slot] = new_worker
+        return new_worker
+
+    def stats(self) -> Dict[str, Any]:
+        """工作进程池状态"""
+        with self._lock:
+            workers = list(self._workers)
+            restarts, recycled = self.restarts, self.recycled
+        return {
+            "size": self.size,
+            "alive": sum(1 for w in workers if w.is_alive()),
+            "idle": self._idle.qsize(),
+            "requests": [w.requests for w in workers],
+            "restarts": restarts,
+            "recycled": recycled
+        }
+
+    def close(self) -> None:
+        """关闭工作进程池"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for worker in workers:
+            worker.stop()
@@ -0,0 +1,103 @@
+"""
+Web服务配置（从环境变量读取）
+"""
+import os
+import tempfile
+from dataclasses import dataclass
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+@dataclass
+class Settings:
+    """服务配置"""
+    plugins_dir: str = "examples/plugins"
+    executor: str = "thread"                     # thread: 进程内线程池执行, process: 常驻工作进程池执行
+    max_workers: int = 8                         # 执行线程数（process 模式下同时也是工作进程数）
+    module_concurrency: int = 4                  # 单个模块的默认并发上限
+    module_queue_depth: int = 16                 # 单个模块的排队上限，超出返回429
+    memory_budget: int = 0                       # 同时执行的请求按模块 max_memory_bytes 预留内存的总预算（字节），0 表示不限制
+    max_queue_depth: int = 64                    # 全局排队上限，超出返回503
+    timeout: int = 30                            # 隔离执行超时（秒）
+    max_requests_per_worker: int = 1000          # 工作进程回收前处理的请求数
+    lazy_discovery: bool = False                 # 使用注册快照，插件首次执行时才导入
+    watch_plugins: bool = False                  # 监视插件目录，文件变化时重新加载对应插件
+    watch_interval: float = 1.0                  # 插件目录轮询间隔（秒）
+    drain_timeout: float = 30.0                  # 重新加载后等待旧版本请求排空的时间（秒）
+    batch_parallelism: int = 4                   # 单个批量请求内同时执行的参数组数
+    max_batch_size: int = 10000                  # 单个批量请求的参数组数上限
+    result_inline_limit: int = 1024 * 1024       # 隔离执行结果超过该字节数时通过内存映射文件返回
+    result_cache_size: int = 256 * 1024 * 1024  # 结果缓存的内存上限（字节），0 表示不缓存
+    result_cache_ttl: float = 3600.0             # 结果缓存的默认有效期（秒）
+    result_cache_dir: str = ""                   # 结果缓存的磁盘目录，为空时只缓存在内存中
+    result_cache_disk_size: int = 4 * 1024 * 1024 * 1024  # 磁盘缓存上限（字节）
+    state_dir: str = os.path.join(tempfile.gettempdir(), "data_factory")  # 持久状态目录
+    job_workers: int = 2                         # 后台任务的执行线程数
+    job_dir: str = ""                            # 任务记录和结果文件目录，为空时使用 <state_dir>/jobs
+    job_ttl: float = 7 * 24 * 3600.0             # 任务结束后保留记录和结果文件的时间（秒），0 表示一直保留
+    job_event_interval: float = 0.5              # 任务进度事件（SSE）的检查间隔（秒）
+    profile_capacity: int = 32                   # 保留的剖析结果数，0 表示不启用性能剖析
+    profile_header: bool = True                  # 是否允许通过 X-Profile 请求头剖析单个请求
+    trace_file: str = ""                         # 链路追踪数据（OTLP JSON Lines）的文件路径
+    trace_endpoint: str = ""                     # 链路追踪收集器的 OTLP/HTTP 地址，例如 http://localhost:4318/v1/traces
+    trace_sample_rate: float = 1.0               # 新链路的采样率（0 到 1）
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def load_settings() -> Settings:
+    """从 DATA_FACTORY_* 环境变量加载配置"""
+    defaults = Settings()
+    executor = os.environ.get("DATA_FACTORY_EXECUTOR", defaults.executor)
+    if executor not in ("thread", "process"):
+        raise ValueError(f"未知的执行器类型: {executor}")
+
+    return Settings(
+        plugins_dir=os.environ.get("DATA_FACTORY_PLUGINS_DIR", defaults.plugins_dir),
+        executor=executor,
+        max_workers=_env_int("DATA_FACTORY_MAX_WORKERS", defaults.max_workers),
+        module_concurrency=_env_int("DATA_FACTORY_MODULE_CONCURRENCY", defaults.module_concurrency),
+        module_queue_depth=_env_int("DATA_FACTORY_MODULE_QUEUE_DEPTH", defaults.module_queue_depth),
+        memory_budget=_env_int("DATA_FACTORY_MEMORY_BUDGET", defaults.memory_budget),
+        max_queue_depth=_env_int("DATA_FACTORY_MAX_QUEUE_DEPTH", defaults.max_queue_depth),
+        timeout=_env_int("DATA_FACTORY_TIMEOUT", defaults.timeout),
+        max_requests_per_worker=_env_int(
+            "DATA_FACTORY_MAX_REQUESTS_PER_WORKER", defaults.max_requests_per_worker
+        ),
+        lazy_discovery=_env_bool("DATA_FACTORY_LAZY_DISCOVERY", defaults.lazy_discovery),
+        watch_plugins=_env_bool("DATA_FACTORY_WATCH_PLUGINS", defaults.watch_plugins),
+        watch_interval=_env_float("DATA_FACTORY_WATCH_INTERVAL", defaults.watch_interval),
+        drain_timeout=_env_float("DATA_FACTORY_DRAIN_TIMEOUT", defaults.drain_timeout),
+        batch_parallelism=_env_int("DATA_FACTORY_BATCH_PARALLELISM", defaults.batch_parallelism),
+        max_batch_size=_env_int("DATA_FACTORY_MAX_BATCH_SIZE", defaults.max_batch_size),
+        result_inline_limit=_env_int("DATA_FACTORY_RESULT_INLINE_LIMIT", defaults.result_inline_limit),
+        result_cache_size=_env_int("DATA_FACTORY_RESULT_CACHE_SIZE", defaults.result_cache_size),
+        result_cache_ttl=_env_float("DATA_FACTORY_RESULT_CACHE_TTL", defaults.result_cache_ttl),
+        result_cache_dir=os.environ.get("DATA_FACTORY_RESULT_CACHE_DIR", defaults.result_cache_dir),
+        result_cache_disk_size=_env_int(
+            "DATA_FACTORY_RESULT_CACHE_DISK_SIZE", defaults.result_cache_disk_size
+        ),
+        state_dir=os.environ.get("DATA_FACTORY_STATE_DIR") or defaults.state_dir,
+        job_workers=_env_int("DATA_FACTORY_JOB_WORKERS", defaults.job_workers),
+        job_dir=os.environ.get("DATA_FACTORY_JOB_DIR", defaults.job_dir),
+        job_ttl=_env_float("DATA_FACTORY_JOB_TTL", defaults.job_ttl),
+        job_event_interval=_env_float("DATA_FACTORY_JOB_EVENT_INTERVAL", defaults.job_event_interval),
+        profile_capacity=_env_int("DATA_FACTORY_PROFILE_CAPACITY", defaults.profile_capacity),
+        profile_header=_env_bool("DATA_FACTORY_PROFILE_HEADER", defaults.profile_header),
+        trace_file=os.environ.get("DATA_FACTORY_TRACE_FILE", defaults.trace_file),
+        trace_endpoint=os.environ.get("DATA_FACTORY_TRACE_ENDPOINT", defaults.trace_endpoint),
+        trace_sample_rate=_env_float("DATA_FACTORY_TRACE_SAMPLE_RATE", defaults.trace_sample_rate)
+    )
@@ -3,14 +3,34 @@ FastAPI主应用
 """
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any, List
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any, Callable, Iterator, List, Optional
+import asyncio
+import functools
 import os
+import time
+import uuid
 from pathlib import Path
 
-from ..core.plugin_manager import PluginManager
-from ..core.interfaces import ExecutionContext
+from ..core.plugin_manager import PluginManager, batch_record
+from ..core.interfaces import CancellationToken, ExecutionContext, Result, ResultStatus
+from ..core.dispatcher import ExecutionDispatcher, DispatchRejected
+from ..core.export import EXPORT_FORMATS, TableEncoder, check_format
+from ..core.jobs import JobManager, JobRejected, SUCCEEDED
+from ..core.limits import LimitExceeded
+from ..core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, ExecutionMetrics, result_rows
+from ..core.profiling import Profiler, parse_mode
+from ..core import tracing
+from ..core.result_cache import ResultCache
+from ..core.rng import SEEDED_EPOCH
+from ..core.serialization import dumps, encode_envelope
+from ..core.streaming import RecordStream, StreamEncoder, STREAM_FORMATS
+from ..core.transport import MappedJSON, iter_envelope
+from ..core.validation import ValidationError
+from ..core.watcher import PluginWatcher
+from .config import load_settings
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -28,8 +48,150 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 全局插件管理器
-plugin_manager = PluginManager("examples/plugins")
+# 服务配置
+settings = load_settings()
+
+
+class TracingMiddleware:
+    """为每个HTTP请求记录根 span（客户端 traceparent 请求头指定的 span 作为父 span）
+
+    响应头 X-Trace-Id 为链路ID；未配置导出器时直接转发请求。
+    """
+    
+    def __init__(self, app: Any):
+        self.app = app
+    
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not tracing.enabled():
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope["method"]
+        traceparent = dict(scope["headers"]).get(b"traceparent")
+        with tracing.span(
+            f"{method} {scope['path']}",
+            parent=traceparent.decode("latin-1") if traceparent else None,
+            root=True, kind=tracing.KIND_SERVER,
+            attributes={"http.method": method, "http.target": scope["path"]}
+        ) as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+            
+            async def send_traced(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        root.set_error(f"HTTP {message['status']}")
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-trace-id", root.trace_id.encode("ascii"))
+                    ]
+                await send(message)
+            
+            await self.app(scope, receive, send_traced)
+            route = scope.get("route")
+            if route is not None and hasattr(route, "path"):
+                # 按路由模板命名，同一接口的 span 可以聚合
+                root.name = f"{method} {route.path}"
+
+
+app.add_middleware(TracingMiddleware)
+
+# 结果缓存（只缓存声明了 cacheable 的模块在指定种子时的结果）
+result_cache = ResultCache(
+    max_bytes=settings.result_cache_size,
+    default_ttl=settings.result_cache_ttl,
+    directory=settings.result_cache_dir or None,
+    max_disk_bytes=settings.result_cache_disk_size
+) if settings.result_cache_size > 0 else None
+
+# 性能剖析（X-Profile 请求头或管理接口设置的采样率触发，结果保留在内存中）
+profiler = Profiler(settings.profile_capacity) if settings.profile_capacity > 0 else None
+
+# 全局插件管理器（process 模式下处理器在常驻工作进程池中执行）
+plugin_manager = PluginManager(
+    settings.plugins_dir,
+    isolation="pool" if settings.executor == "process" else "none",
+    pool_size=settings.max_workers,
+    max_requests_per_worker=settings.max_requests_per_worker,
+    timeout=settings.timeout,
+    lazy_discovery=settings.lazy_discovery,
+    drain_timeout=settings.drain_timeout,
+    result_inline_limit=settings.result_inline_limit,
+    result_cache=result_cache,
+    profiler=profiler
+)
+
+# 插件目录监视器（插件文件变化时只重新加载该插件）
+watcher = PluginWatcher(plugin_manager, settings.watch_interval) if settings.watch_plugins else None
+
+# 运行指标（/metrics 以 Prometheus 文本格式输出）
+metrics = ExecutionMetrics()
+
+# 全局执行调度器（按模块声明的并发上限和内存预算准入）
+dispatcher = ExecutionDispatcher(
+    max_workers=settings.max_workers,
+    module_concurrency=settings.module_concurrency,
+    module_queue_depth=settings.module_queue_depth,
+    max_queue_depth=settings.max_queue_depth,
+    metrics=metrics,
+    memory_budget=settings.memory_budget,
+    resolve_limits=plugin_manager.get_limits
+)
+
+# 后台任务（长时间的生成在后台线程中执行，结果写入磁盘；与 Web 请求共用调度名额）
+jobs = JobManager(
+    plugin_manager,
+    settings.job_dir or os.path.join(settings.state_dir, "jobs"),
+    workers=settings.job_workers,
+    ttl=settings.job_ttl,
+    dispatcher=dispatcher
+)
+
+
+def _pool_stats() -> Optional[Dict[str, Any]]:
+    """process 模式下工作进程池的状态"""
+    isolator = plugin_manager.isolator
+    return isolator.stats() if hasattr(isolator, "stats") else None
+
+
+def _pool_stat(key: str) -> Callable[[], Any]:
+    return lambda: (_pool_stats() or {}).get(key)
+
+
+def _cache_stat(key: str) -> Callable[[], Any]:
+    return lambda: result_cache.stats()[key] if result_cache is not None else None
+
+
+# 抓取时读取的状态指标
+metrics.callback("data_factory_modules", "已加载的模块数", lambda: len(plugin_manager.modules))
+metrics.callback("data_factory_dispatch_pending", "执行中和排队中的请求数",
+                 lambda: dispatcher.stats()["pending"])
+metrics.callback(
+    "data_factory_module_pending", "各模块执行中和排队中的请求数",
+    lambda: {(module_id,): item["pending"]
+             for module_id, item in dispatcher.stats()["modules"].items()},
+    labels=("module",)
+)
+metrics.callback("data_factory_dispatch_memory_reserved_bytes", "执行中的请求预留的内存（字节）",
+                 lambda: dispatcher.stats()["memory_reserved"])
+metrics.callback("data_factory_worker_pool_size", "工作进程池大小", _pool_stat("size"))
+metrics.callback("data_factory_worker_pool_alive", "存活的工作进程数", _pool_stat("alive"))
+metrics.callback("data_factory_worker_pool_idle", "空闲的工作进程数", _pool_stat("idle"))
+metrics.callback("data_factory_worker_pool_restarts_total", "超时、崩溃或取消后重启的工作进程数",
+                 _pool_stat("restarts"), kind="counter")
+metrics.callback("data_factory_worker_pool_recycled_total", "处理请求数达到上限后回收的工作进程数",
+                 _pool_stat("recycled"), kind="counter")
+metrics.callback("data_factory_result_cache_hits_total", "结果缓存命中次数",
+                 _cache_stat("hits"), kind="counter")
+metrics.callback("data_factory_result_cache_misses_total", "结果缓存未命中次数",
+                 _cache_stat("misses"), kind="counter")
+metrics.callback("data_factory_result_cache_evictions_total", "结果缓存淘汰的条目数",
+                 _cache_stat("evictions"), kind="counter")
+metrics.callback("data_factory_result_cache_entries", "结果缓存的内存条目数", _cache_stat("entries"))
+metrics.callback("data_factory_result_cache_bytes", "结果缓存占用的内存字节数", _cache_stat("bytes"))
+metrics.callback("data_factory_result_cache_disk_bytes", "结果缓存占用的磁盘字节数",
+                 _cache_stat("disk_bytes"))
 
 # 挂载静态文件
 static_dir = Path(__file__).parent / "static"
@@ -40,10 +202,29 @@ if static_dir.exists():
 @app.on_event("startup")
 async def startup_event():
     """应用启动时扫描插件"""
+    if settings.trace_endpoint:
+        tracing.configure(tracing.HttpExporter(settings.trace_endpoint), settings.trace_sample_rate)
+    elif settings.trace_file:
+        tracing.configure(tracing.FileExporter(settings.trace_file), settings.trace_sample_rate)
     modules = plugin_manager.scan_plugins()
     print(f"🚀 数据工厂启动成功，加载了 {len(modules)} 个插件模块")
     for module in modules:
         print(f"  - {module.group_name}/{module.module_name} (作者: {module.author})")
+    if watcher:
+        watcher.start()
+        print(f"👀 正在监视插件目录: {plugin_manager.plugins_dir}")
+    jobs.start(asyncio.get_running_loop())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时释放执行资源"""
+    if watcher:
+        watcher.stop()
+    jobs.stop()
+    dispatcher.shutdown()
+    plugin_manager.shutdown()
+    tracing.shutdown()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -282,33 +463,398 @@ async def index():
     return HTMLResponse(content=html_content)
 
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """判断 If-None-Match 请求头是否命中当前ETag"""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
 @app.get("/api/modules")
-async def list_modules() -> List[Dict[str, Any]]:
+async def list_modules(request: Request) -> Response:
     """获取模块列表"""
-    return plugin_manager.list_modules()
+    body, etag = plugin_manager.get_catalog()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.get("/api/modules/{module_id}")
 async def get_module(module_id: str) -> Dict[str, Any]:
     """获取模块详情"""
-    modules = plugin_manager.list_modules()
-    module = next((m for m in modules if m["id"] == module_id), None)
+    module = plugin_manager.describe_module(module_id)
     if not module:
         raise HTTPException(status_code=404, detail="模块不存在")
     return module
 
 
+def _execution_context(request: Request) -> ExecutionContext:
+    """根据请求创建执行上下文（X-Seed 请求头指定随机数种子，生成结果可复现；X-Profile 请求头剖析这次执行）"""
+    seed = request.headers.get("x-seed")
+    if seed is not None:
+        try:
+            seed = int(seed)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="X-Seed 必须是整数")
+    profile = request.headers.get("x-profile")
+    if profile is not None and profiler is not None and settings.profile_header:
+        try:
+            profile = parse_mode(profile)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        profile = None
+    request_id = request.headers.get("x-request-id")
+    if request_id is None and profile is not None:
+        # 剖析结果按请求ID查找
+        request_id = uuid.uuid4().hex
+    return ExecutionContext(
+        client_ip=request.client.host,
+        request_id=request_id,
+        seed=seed,
+        profile=profile,
+        trace_parent=tracing.current_traceparent(),
+        reference_time=SEEDED_EPOCH if seed is not None else None,
+        cancel_token=CancellationToken()
+    )
+
+
+async def _cancel_on_disconnect(request: Request, token: CancellationToken) -> None:
+    """等待客户端断开连接，断开时触发取消令牌（请求体已经读完，之后只会收到 http.disconnect）"""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            token.cancel("客户端已断开")
+            return
+
+
+async def _submit_cancellable(request: Request, context: ExecutionContext, module_id: str,
+                              func: Callable[..., Any], *args: Any) -> Any:
+    """在调度器中执行 func(*args)，执行或排队期间客户端断开时触发上下文的取消令牌"""
+    watcher = asyncio.ensure_future(_cancel_on_disconnect(request, context.cancel_token))
+    try:
+        return await dispatcher.submit(module_id, func, *args)
+    finally:
+        watcher.cancel()
+
+
+class ResultResponse(JSONResponse):
+    """结果响应：使用 core.serialization 编码，隔离执行返回的 EncodedJSON 数据直接拼接，不再解码"""
+    
+    def render(self, content: Any) -> bytes:
+        return encode_envelope(content)
+
+
+def _busy_response(error: DispatchRejected) -> JSONResponse:
+    """调度队列已满时的响应（模块繁忙429，服务器繁忙503）"""
+    status_code = 429 if error.error_code == "MODULE_BUSY" else 503
+    return ResultResponse(
+        status_code=status_code,
+        content={
+            "status": "error",
+            "data": None,
+            "message": error.message,
+            "error_code": error.error_code,
+            "execution_time": None
+        },
+        headers={"Retry-After": "1"}
+    )
+
+
+def _requested_format(request: Request) -> Optional[str]:
+    """协商输出格式：_format 查询参数优先，其次是 Accept 请求头"""
+    fmt = request.query_params.get("_format")
+    if fmt:
+        return fmt
+    accept = request.headers.get("accept", "")
+    if "application/x-ndjson" in accept:
+        return "ndjson"
+    if "text/event-stream" in accept:
+        return "sse"
+    for name, media_type in EXPORT_FORMATS.items():
+        if media_type.split(";")[0] in accept:
+            return name
+    return None
+
+
+def _error_response(message: str, error_code: Optional[str], status_code: int = 200) -> JSONResponse:
+    """普通错误响应"""
+    return ResultResponse(
+        status_code=status_code,
+        content={
+            "status": "error",
+            "data": None,
+            "message": message,
+            "error_code": error_code,
+            "execution_time": None
+        }
+    )
+
+
+def _validate(module_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """校验参数并记录校验耗时，失败时抛出 ValidationError"""
+    started = time.perf_counter()
+    try:
+        with tracing.span("validate"):
+            return plugin_manager.validate(module_id, data)
+    except ValidationError:
+        metrics.observe_request(module_id, "error", "VALIDATION_ERROR")
+        raise
+    finally:
+        metrics.observe_phase(module_id, "validation", time.perf_counter() - started)
+
+
+def _validation_response(error: ValidationError) -> JSONResponse:
+    """参数校验失败的响应（请求不会进入调度队列）"""
+    return ResultResponse(
+        status_code=400,
+        content={
+            "status": "error",
+            "data": {"errors": error.errors},
+            "message": str(error),
+            "error_code": "VALIDATION_ERROR",
+            "execution_time": None
+        }
+    )
+
+
+async def _stream_response(module_id: str, data: Dict[str, Any],
+                           context: ExecutionContext, fmt: str) -> Response:
+    """以 NDJSON / JSON 数组或 CSV / Parquet / Arrow IPC 流式返回模块生成的记录"""
+    if fmt not in STREAM_FORMATS:
+        try:
+            check_format(fmt)
+        except ValueError as e:
+            return _error_response(str(e), "UNSUPPORTED_FORMAT", 400)
+    if not plugin_manager.supports_streaming(module_id):
+        return _error_response(f"模块不支持流式输出: {module_id}", "STREAM_NOT_SUPPORTED", 400)
+    
+    return await _encode_stream(
+        module_id, fmt, functools.partial(plugin_manager.open_stream, module_id, data, context),
+        context.cancel_token
+    )
+
+
+async def _encode_stream(module_id: str, fmt: str, open_stream: Callable[[], RecordStream],
+                         token: Optional[CancellationToken] = None) -> Response:
+    """在调度器名额内打开记录流并编码为流式响应（客户端断开时触发取消令牌）"""
+    try:
+        reservation = dispatcher.reserve(module_id)
+    except DispatchRejected as e:
+        return _busy_response(e)
+    
+    # 先生成第一块数据，参数错误可以作为普通错误响应返回
+    try:
+        await reservation.acquire()
+        started = time.perf_counter()
+        stream = await dispatcher.run(open_stream)
+        if fmt in STREAM_FORMATS:
+            encoder = StreamEncoder(stream, fmt)
+        else:
+            encoder = TableEncoder(stream, fmt)
+        first_chunk = await dispatcher.run(encoder.next_chunk)
+    except LimitExceeded as e:
+        reservation.release()
+        metrics.observe_request(module_id, "error", e.error_code)
+        return _error_response(e.message, e.error_code)
+    except ValueError as e:
+        reservation.release()
+        metrics.observe_request(module_id, "error")
+        return _error_response(str(e), None)
+    except Exception as e:
+        reservation.release()
+        metrics.observe_request(module_id, "error", "EXECUTION_ERROR")
+        return _error_response(f"执行失败: {str(e)}", "EXECUTION_ERROR")
+    except BaseException:
+        reservation.release()
+        raise
+    
+    async def body():
+        # 流式输出时生成和编码交替进行，整个响应体的耗时都计入 execution 阶段
+        error_code, size = "CANCELLED", len(first_chunk)
+        try:
+            yield first_chunk
+            while not encoder.done:
+                chunk = await dispatcher.run(encoder.next_chunk)
+                size += len(chunk)
+                yield chunk
+            error = getattr(encoder, "error", None)
+            error_code = getattr(error, "error_code", "EXECUTION_ERROR") if error else None
+        except Exception as e:
+            error_code = getattr(e, "error_code", "EXECUTION_ERROR")
+            raise
+        finally:
+            if token is not None and not encoder.done:
+                # 客户端断开：正在线程池中生成的处理器通过 check_cancelled() 尽快停止
+                token.cancel("客户端已断开")
+            try:
+                stream.close()
+            except ValueError:
+                # 生成器仍在线程池中执行（客户端断开），由其自行结束
+                pass
+            reservation.release()
+            metrics.observe_request(module_id, "error" if error_code else "success", error_code,
+                                    time.perf_counter() - started, stream.count)
+            metrics.add_response_bytes(module_id, size)
+    
+    headers = None
+    if fmt in EXPORT_FORMATS:
+        headers = {"Content-Disposition": f'attachment; filename="{module_id}.{fmt}"'}
+    return StreamingResponse(body(), media_type=encoder.media_type, headers=headers)
+
+
+def _sse_event(event: str, payload: bytes) -> bytes:
+    """编码一个 Server-Sent Events 事件（紧凑JSON中没有换行，数据占一行）"""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + payload + b"\n\n"
+
+
+class _ProgressRelay:
+    """把执行线程中报告的进度转交给事件循环（只保留最新值，事件循环取走前不重复唤醒）"""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.changed = asyncio.Event()
+        self.latest: Optional[Dict[str, Any]] = None
+        self._notified = False
+    
+    def __call__(self, done: int, total: Optional[int] = None) -> None:
+        self.latest = {"done": done, "total": total}
+        if not self._notified:
+            self._notified = True
+            self.loop.call_soon_threadsafe(self.changed.set)
+    
+    def take(self) -> Optional[Dict[str, Any]]:
+        self.changed.clear()
+        self._notified = False
+        latest, self.latest = self.latest, None
+        return latest
+
+
+async def _progress_response(module_id: str, data: Dict[str, Any],
+                             context: ExecutionContext) -> Response:
+    """以 Server-Sent Events 返回执行进度：若干 progress 事件，最后是 result 事件（执行结果信封）"""
+    try:
+        reservation = dispatcher.reserve(module_id)
+    except DispatchRejected as e:
+        return _busy_response(e)
+    
+    relay = _ProgressRelay(asyncio.get_running_loop())
+    context.progress_callback = relay
+    
+    def finished(task: asyncio.Future) -> None:
+        """客户端断开后处理器才结束：释放调度名额并记录结果"""
+        reservation.release()
+        if not task.cancelled() and task.exception() is None:
+            metrics.observe_result(module_id, task.result())
+    
+    async def events():
+        task = None
+        size = 0
+        try:
+            await reservation.acquire()
+            task = asyncio.ensure_future(
+                dispatcher.run(_execute_encoded, module_id, data, context, False)
+            )
+            while not task.done():
+                waiter = asyncio.ensure_future(relay.changed.wait())
+                await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                progress = relay.take()
+                if progress is not None and not task.done():
+                    event = _sse_event("progress", dumps(progress))
+                    size += len(event)
+                    yield event
+            result = task.result()
+            metrics.observe_result(module_id, result)
+            envelope = {
+                "status": result.status.value,
+                "data": result.data,
+                "message": result.message,
+                "error_code": result.error_code,
+                "execution_time": result.execution_time
+            }
+            if isinstance(result.data, MappedJSON):
+                payload = b"".join(iter_envelope(envelope, result.data))
+            else:
+                payload = encode_envelope(envelope)
+            event = _sse_event("result", payload)
+            size += len(event)
+            yield event
+        finally:
+            metrics.add_response_bytes(module_id, size)
+            if task is not None and not task.done():
+                # 客户端断开：触发取消令牌，处理器结束后再释放调度名额
+                context.cancel_token.cancel("客户端已断开")
+                task.add_done_callback(finished)
+            else:
+                reservation.release()
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+def _encoded_response(module_id: str, envelope: Dict[str, Any]) -> Response:
+    """编码结果信封，记录编码耗时和响应大小"""
+    started = time.perf_counter()
+    with tracing.span("response.serialize"):
+        response = ResultResponse(envelope)
+    metrics.observe_phase(module_id, "serialization", time.perf_counter() - started)
+    metrics.add_response_bytes(module_id, len(response.body))
+    return response
+
+
+def _count_bytes(module_id: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """写出流式响应的同时累计响应大小"""
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        metrics.add_response_bytes(module_id, size)
+
+
+def _result_response(module_id: str, result: Result, envelope: Dict[str, Any],
+                     context: Optional[ExecutionContext] = None) -> Response:
+    """执行结果的响应（内存映射文件中的结果数据按块写出），同时记录执行指标
+
+    这次执行被剖析时，X-Profile-Id 响应头为剖析结果的ID。
+    """
+    metrics.observe_result(module_id, result)
+    if isinstance(envelope.get("data"), MappedJSON):
+        response = StreamingResponse(
+            _count_bytes(module_id, iter_envelope(envelope, envelope["data"])),
+            media_type="application/json"
+        )
+    else:
+        response = _encoded_response(module_id, envelope)
+    if context is not None and context.profile is not None and context.request_id is not None:
+        record = profiler.store.find(context.request_id)
+        if record is not None:
+            response.headers["X-Profile-Id"] = record.id
+    return response
+
+
+# 隔离执行的结果数据以编码后的字节返回，由 ResultResponse 直接写入响应
+_execute_encoded = functools.partial(plugin_manager.execute_module, encoded=True)
+
+
 @app.post("/api/modules/{module_id}/execute")
 async def execute_module(module_id: str, data: Dict[str, Any], request: Request) -> Dict[str, Any]:
     """执行模块"""
     # 创建执行上下文
-    context = ExecutionContext(
-        client_ip=request.client.host,
-        request_id=request.headers.get("x-request-id")
-    )
+    context = _execution_context(request)
     
-    # 直接执行模块（绕过子进程）
-    module = plugin_manager.get_module(module_id)
+    with tracing.span("route"):
+        module = plugin_manager.get_module(module_id)
     if not module:
         return {
             "status": "error",
@@ -318,49 +864,42 @@ async def execute_module(module_id: str, data: Dict[str, Any], request: Request)
             "execution_time": None
         }
     
+    # 先校验参数，非法请求不占用调度名额
     try:
-        import time
-        start_time = time.time()
-        
-        # 直接实例化处理器
-        handler = module.handler_class()
-        result = handler.handle(data, context)
-        
-        execution_time = time.time() - start_time
-        
-        return {
-            "status": result.status.value,
-            "data": result.data,
-            "message": result.message,
-            "error_code": result.error_code,
-            "execution_time": execution_time
-        }
-    except Exception as e:
-        import traceback
-        return {
-            "status": "error",
-            "data": None,
-            "message": f"执行失败: {str(e)}",
-            "error_code": "EXECUTION_ERROR",
-            "execution_time": None,
-            "traceback": traceback.format_exc()
-        }
+        data = _validate(module_id, data)
+    except ValidationError as e:
+        return _validation_response(e)
+    
+    fmt = _requested_format(request)
+    if fmt == "sse":
+        return await _progress_response(module_id, data, context)
+    if fmt:
+        return await _stream_response(module_id, data, context, fmt)
+    
+    # 在调度器线程池中执行，避免阻塞事件循环；客户端断开时取消执行
+    try:
+        result = await _submit_cancellable(
+            request, context, module_id, _execute_encoded, module_id, data, context, False
+        )
+    except DispatchRejected as e:
+        return _busy_response(e)
+    
+    return _result_response(module_id, result, {
+        "status": result.status.value,
+        "data": result.data,
+        "message": result.message,
+        "error_code": result.error_code,
+        "execution_time": result.execution_time
+    }, context)
 
 
 @app.api_route("/dmm/{action_space}/{action_name}", methods=["GET", "POST"])
 async def http_service(action_space: str, action_name: str, request: Request):
     """HTTP服务接口"""
     # 查找对应的模块
-    modules = plugin_manager.list_modules()
-    target_module = None
-    
-    for module_data in modules:
-        module = plugin_manager.get_module(module_data["id"])
-        if module and module.action_space == action_space and module.action_name == action_name:
-            target_module = module_data
-            break
-    
-    if not target_module:
+    with tracing.span("route"):
+        module_id = plugin_manager.find_route(action_space, action_name)
+    if not module_id:
         raise HTTPException(status_code=404, detail="服务不存在")
     
     # 获取请求数据
@@ -371,42 +910,349 @@ async def http_service(action_space: str, action_name: str, request: Request):
             data = {}
     else:
         data = dict(request.query_params)
+        data.pop("_format", None)
     
-    # 直接执行模块（绕过子进程）
-    context = ExecutionContext(
-        client_ip=request.client.host,
-        request_id=request.headers.get("x-request-id")
-    )
+    context = _execution_context(request)
     
-    module = plugin_manager.get_module(target_module["id"])
-    if not module:
-        raise HTTPException(status_code=500, detail="模块加载失败")
+    # 先校验参数，非法请求不占用调度名额
+    try:
+        data = _validate(module_id, data)
+    except ValidationError as e:
+        return _validation_response(e)
     
+    fmt = _requested_format(request)
+    if fmt == "sse":
+        return await _progress_response(module_id, data, context)
+    if fmt:
+        return await _stream_response(module_id, data, context, fmt)
+    
+    # 在调度器线程池中执行，避免阻塞事件循环；客户端断开时取消执行
     try:
-        import time
-        start_time = time.time()
-        
-        # 直接实例化处理器
-        handler = module.handler_class()
-        result = handler.handle(data, context)
-        
-        execution_time = time.time() - start_time
-        
-        return {
-            "status": result.status.value,
-            "data": result.data,
-            "message": result.message,
-            "execution_time": execution_time
+        result = await _submit_cancellable(
+            request, context, module_id, _execute_encoded, module_id, data, context, False
+        )
+    except DispatchRejected as e:
+        return _busy_response(e)
+    
+    return _result_response(module_id, result, {
+        "status": result.status.value,
+        "data": result.data,
+        "message": result.message,
+        "execution_time": result.execution_time
+    }, context)
+
+
+async def _batch_response(module_id: str, items: List[Dict[str, Any]],
+                          request: Request) -> Response:
+    """批量执行模块：整个批次占用一个调度名额，批次内按 batch_parallelism 并行"""
+    if len(items) > settings.max_batch_size:
+        return _error_response(
+            f"批量参数过多: {len(items)} (上限 {settings.max_batch_size})", "BATCH_TOO_LARGE", 413
+        )
+    
+    context = _execution_context(request)
+    
+    fmt = _requested_format(request)
+    if fmt:
+        if fmt not in STREAM_FORMATS:
+            return _error_response(f"不支持的输出格式: {fmt}", "UNSUPPORTED_FORMAT", 400)
+        return await _encode_stream(module_id, fmt, functools.partial(
+            plugin_manager.open_batch_stream, module_id, items, context,
+            settings.batch_parallelism
+        ), context.cancel_token)
+    
+    start_time = time.time()
+    try:
+        results = await _submit_cancellable(
+            request, context, module_id, plugin_manager.execute_batch, module_id, items, context,
+            settings.batch_parallelism
+        )
+    except DispatchRejected as e:
+        return _busy_response(e)
+    
+    error_count = sum(1 for result in results if result.status == ResultStatus.ERROR)
+    if error_count == 0:
+        status = ResultStatus.SUCCESS
+    elif error_count == len(results):
+        status = ResultStatus.ERROR
+    else:
+        status = ResultStatus.WARNING
+    
+    execution_time = time.time() - start_time
+    metrics.observe_request(module_id, status.value, None, execution_time,
+                            sum(result_rows(result) for result in results))
+    return _encoded_response(module_id, {
+        "status": status.value,
+        "data": {
+            "results": [batch_record(index, result) for index, result in enumerate(results)],
+            "total_count": len(results),
+            "success_count": len(results) - error_count,
+            "error_count": error_count
+        },
+        "message": f"批量执行完成: 成功 {len(results) - error_count} 组，失败 {error_count} 组",
+        "error_code": None,
+        "execution_time": execution_time
+    })
+
+
+@app.post("/api/modules/{module_id}/batch")
+async def execute_module_batch(module_id: str, items: List[Dict[str, Any]],
+                               request: Request) -> Response:
+    """批量执行模块（请求体为参数数组，按顺序返回每组参数的结果）"""
+    if not plugin_manager.get_module(module_id):
+        return _error_response(f"模块不存在: {module_id}", "MODULE_NOT_FOUND")
+    return await _batch_response(module_id, items, request)
+
+
+@app.post("/dmm/{action_space}/{action_name}/batch")
+async def http_service_batch(action_space: str, action_name: str, request: Request) -> Response:
+    """HTTP服务批量接口"""
+    module_id = plugin_manager.find_route(action_space, action_name)
+    if not module_id:
+        raise HTTPException(status_code=404, detail="服务不存在")
+    
+    try:
+        items = await request.json()
+    except ValueError:
+        items = None
+    if not isinstance(items, list):
+        return _error_response("请求体必须是参数数组", "INVALID_BATCH", 400)
+    return await _batch_response(module_id, items, request)
+
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(body: Dict[str, Any], request: Request) -> Response:
+    """提交后台任务: {"module_id": ..., "data": {...}, "format": "ndjson"}（X-Seed 请求头指定种子）"""
+    module_id = body.get("module_id")
+    data = body.get("data") or {}
+    if not isinstance(module_id, str) or not isinstance(data, dict):
+        return _error_response("请求体需要 module_id 和 data 对象", "INVALID_JOB", 400)
+    if not plugin_manager.get_module(module_id):
+        return _error_response(f"模块不存在: {module_id}", "MODULE_NOT_FOUND", 404)
+    
+    context = _execution_context(request)
+    try:
+        data = _validate(module_id, data)
+    except ValidationError as e:
+        return _validation_response(e)
+    
+    try:
+        job = await run_in_threadpool(jobs.submit, module_id, data, body.get("format"), context.seed)
+    except JobRejected as e:
+        return _error_response(e.message, e.error_code, 400)
+    return JSONResponse(status_code=202, content=job.to_dict(),
+                        headers={"Location": f"/api/jobs/{job.id}"})
+
+
+@app.get("/api/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    """列出最近的任务"""
+    return [job.to_dict() for job in await run_in_threadpool(jobs.list, status, limit)]
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """任务状态和进度（已写入的记录数）"""
+    job = await run_in_threadpool(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job.to_dict()
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    """取消任务（执行中的任务在写完当前块后停止）"""
+    job = await run_in_threadpool(jobs.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job.to_dict()
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request) -> Response:
+    """以 Server-Sent Events 推送任务进度：进度变化时发送 progress 事件，结束时发送 status 事件"""
+    job = await run_in_threadpool(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    async def events():
+        last = None
+        while True:
+            current = await run_in_threadpool(jobs.get, job_id)
+            if current is None or current.finished:
+                yield _sse_event("status", dumps(current.to_dict() if current else None))
+                return
+            state = (current.status, current.progress, current.total)
+            if state != last:
+                last = state
+                yield _sse_event("progress", dumps(current.to_dict()))
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(settings.job_event_interval)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def download_job_result(job_id: str) -> Response:
+    """下载任务的结果文件"""
+    job = await run_in_threadpool(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if job.status != SUCCEEDED:
+        return _error_response(f"任务没有可下载的结果: {job.status}", "JOB_NOT_FINISHED", 409)
+    return FileResponse(job.result_path, media_type=job.media_type, filename=job.filename)
+
+
+@app.delete("/api/jobs/{job_id}")
+async def delete_job(job_id: str) -> Dict[str, Any]:
+    """删除已结束的任务及其结果文件"""
+    if not await run_in_threadpool(jobs.delete, job_id):
+        job = await run_in_threadpool(jobs.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        return _error_response("任务尚未结束，请先取消", "JOB_NOT_FINISHED", 409)
+    return {"status": "success", "job_id": job_id}
+
+
+@app.get("/api/admin/plugins")
+async def list_plugins() -> List[Dict[str, Any]]:
+    """列出已加载的插件及其加载代次、正在执行的请求数"""
+    return [
+        {
+            "id": plugin.id,
+            "path": plugin.path,
+            "modules": plugin.module_ids,
+            "loaded_at": plugin.loaded_at,
+            "generation": plugin.generation,
+            "inflight": plugin.inflight,
+            "imported": plugin.imported
         }
+        for plugin in plugin_manager.loaded_plugins.values()
+    ]
+
+
+@app.post("/api/admin/plugins/{plugin_id}/reload")
+async def reload_plugin(plugin_id: str) -> Dict[str, Any]:
+    """重新加载单个插件（目录已删除时卸载）"""
+    try:
+        modules = await run_in_threadpool(plugin_manager.reload_plugin, plugin_id)
     except Exception as e:
-        import traceback
-        return {
-            "status": "error",
-            "data": None,
-            "message": f"执行失败: {str(e)}",
-            "execution_time": None,
-            "traceback": traceback.format_exc()
-        }
+        return _error_response(f"重新加载插件失败: {str(e)}", "PLUGIN_LOAD_ERROR", 500)
+    
+    plugin = plugin_manager.loaded_plugins.get(plugin_id)
+    return {
+        "status": "success",
+        "plugin_id": plugin_id,
+        "loaded": plugin is not None,
+        "modules": plugin.module_ids if plugin else [],
+        "generation": plugin.generation if plugin else None
+    }
+
+
+@app.delete("/api/admin/plugins/{plugin_id}")
+async def unload_plugin(plugin_id: str) -> Dict[str, Any]:
+    """卸载插件（正在执行的请求继续完成）"""
+    if not await run_in_threadpool(plugin_manager.unload_plugin, plugin_id):
+        raise HTTPException(status_code=404, detail="插件不存在")
+    return {"status": "success", "plugin_id": plugin_id}
+
+
+@app.get("/api/admin/cache")
+async def cache_stats() -> Dict[str, Any]:
+    """结果缓存的命中率和占用空间"""
+    if result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **result_cache.stats()}
+
+
+@app.delete("/api/admin/cache")
+async def clear_cache() -> Dict[str, Any]:
+    """清空结果缓存"""
+    if result_cache is not None:
+        await run_in_threadpool(result_cache.clear)
+    return {"status": "success"}
+
+
+def _profiling_disabled() -> JSONResponse:
+    return _error_response("未启用性能剖析（DATA_FACTORY_PROFILE_CAPACITY 为 0）", "PROFILING_DISABLED", 404)
+
+
+@app.get("/api/admin/profiling")
+async def profiling_settings() -> Dict[str, Any]:
+    """性能剖析的采样率设置"""
+    if profiler is None:
+        return _profiling_disabled()
+    return {
+        "capacity": profiler.store.capacity,
+        "header": settings.profile_header,
+        "rates": profiler.rates()
+    }
+
+
+@app.post("/api/admin/profiling")
+async def set_profiling_rate(body: Dict[str, Any]) -> Dict[str, Any]:
+    """设置采样率: {"module_id": 可选, "rate": 0.01, "mode": "sample"}（rate 为0时关闭，不指定模块时对所有模块生效）"""
+    if profiler is None:
+        return _profiling_disabled()
+    module_id = body.get("module_id")
+    if module_id is not None and not plugin_manager.get_module(module_id):
+        return _error_response(f"模块不存在: {module_id}", "MODULE_NOT_FOUND", 404)
+    try:
+        profiler.set_rate(module_id, float(body.get("rate", 0)), body.get("mode", "sample"))
+    except (TypeError, ValueError) as e:
+        return _error_response(str(e), "INVALID_PROFILING", 400)
+    return {"status": "success", "rates": profiler.rates()}
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles(module_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """列出保留的剖析结果（按时间倒序，包含耗时最多的函数）"""
+    if profiler is None:
+        return _profiling_disabled()
+    return [record.to_dict() for record in profiler.store.list(module_id)]
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, format: Optional[str] = None) -> Response:
+    """下载剖析结果：format=pstats（cprofile 方式，pstats.Stats 可读取）或 collapsed（sample 方式，火焰图工具可读取的折叠栈）
+
+    不指定 format 时返回摘要。
+    """
+    if profiler is None:
+        return _profiling_disabled()
+    record = profiler.store.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="剖析结果不存在或已被淘汰")
+    if format is None:
+        return record.to_dict()
+    if format not in record.formats:
+        return _error_response(
+            f"该剖析结果没有 {format} 格式（可选 {' / '.join(record.formats)}）", "UNSUPPORTED_FORMAT", 400
+        )
+    filename = f"{record.module_id}-{record.id}"
+    if format == "pstats":
+        return Response(record.pstats, media_type="application/octet-stream", headers={
+            "Content-Disposition": f'attachment; filename="{filename}.pstats"'
+        })
+    return Response(record.collapsed, media_type="text/plain; charset=utf-8", headers={
+        "Content-Disposition": f'attachment; filename="{filename}.collapsed.txt"'
+    })
+
+
+@app.delete("/api/admin/profiles")
+async def clear_profiles() -> Dict[str, Any]:
+    """清空剖析结果"""
+    if profiler is not None:
+        profiler.store.clear()
+    return {"status": "success"}
+
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Response:
+    """Prometheus 文本格式的运行指标"""
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
 
 
 @app.get("/health")
@@ -417,4 +1263,4 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -2,11 +2,12 @@
 订单演示插件 - 展示订单数据生成功能
 """
 import json
-import random
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 from decimal import Decimal
 
+import numpy as np
+
 # 导入数据工厂核心接口
 import sys
 import os
@@ -19,8 +20,27 @@ if str(project_root) not in sys.path:
 
 from data_factory.core.interfaces import (
     Register, Handler, Module, Widget, WidgetType, SelectOption, 
-    ValidationRule, Result, ResultStatus, ExecutionContext
+    ValidationRule, Result, ResultStatus, ExecutionContext, ThreadSafety
 )
+from data_factory.core.columnar import Columns
+from data_factory.core.ids import BusinessNumber, context_sequence
+from data_factory.core.rng import context_streams, context_time
+from data_factory.core.streaming import drain
+
+
+# 每次按列生成的行数
+CHUNK_ROWS = 10000
+
+# 订单号: ORD + 日期 + 10位序列号（序列号跨请求、跨进程递增）
+ORDER_NUMBER = BusinessNumber("ORD{time:%Y%m%d}{seq:010d}")
+
+# 收货地址按省份权重抽取
+PROVINCE_WEIGHTS = {"北京市": 2, "上海市": 2, "广东省": 3, "江苏省": 2, "浙江省": 2, "山东省": 1}
+CITIES = ["北京市", "上海市", "广州市", "深圳市", "杭州市", "南京市"]
+DISTRICTS = ["朝阳区", "海淀区", "天河区", "福田区", "西湖区", "玄武区"]
+STREETS = ['中山路', '人民路', '建设路']
+PHONE_PREFIXES = ['130', '131', '132', '133', '134', '135', '136', '137', '138', '139']
+PAYMENT_METHODS = ["alipay", "wechat", "card", "balance"]
 
 
 class OrderDemoRegister(Register):
@@ -58,7 +78,6 @@ class OrderDemoRegister(Register):
                 default_value="3",
                 help_text="订单包含的商品种类数量",
                 validation=ValidationRule(
-                    required=True,
                     min_value=1,
                     max_value=20
                 )
@@ -71,7 +90,6 @@ class OrderDemoRegister(Register):
                 default_value="50",
                 help_text="生成订单的最小金额（元）",
                 validation=ValidationRule(
-                    required=True,
                     min_value=0.01
                 )
             ),
@@ -83,7 +101,6 @@ class OrderDemoRegister(Register):
                 default_value="1000",
                 help_text="生成订单的最大金额（元）",
                 validation=ValidationRule(
-                    required=True,
                     min_value=0.01
                 )
             ),
@@ -107,11 +124,10 @@ class OrderDemoRegister(Register):
                 widget_type=WidgetType.NUMBER,
                 placeholder="要生成的订单数量",
                 default_value="5",
-                help_text="要生成的订单数据条数",
+                help_text="要生成的订单数据条数（大批量请使用流式输出 ?_format=ndjson）",
                 validation=ValidationRule(
-                    required=True,
                     min_value=1,
-                    max_value=50
+                    max_value=1000000
                 )
             )
         ]
@@ -126,15 +142,19 @@ class OrderDemoRegister(Register):
             action_name="generate",
             help_msg="订单数据生成器可以创建包含完整商品信息的订单数据，支持不同订单类型和状态。",
             author="数据工厂团队",
-            version="1.0.0"
+            version="1.0.0",
+            cacheable=True
         )
 
 
 class OrderDemoHandler(Handler):
     """订单演示处理器"""
     
-    def __init__(self):
-        # 预定义商品数据
+    # 商品目录只读，实例可以在线程间共享
+    thread_safety = ThreadSafety.SHARED
+    
+    def setup(self):
+        # 预定义商品数据（每个进程只加载一次）
         self.products = [
             {"name": "iPhone 15 Pro", "category": "电子产品", "price": 8999.00},
             {"name": "MacBook Air", "category": "电子产品", "price": 7999.00},
@@ -149,57 +169,34 @@ class OrderDemoHandler(Handler):
             {"name": "海尔冰箱", "category": "家电", "price": 3499.00},
             {"name": "戴森吸尘器", "category": "家电", "price": 2199.00}
         ]
+        self.prices = np.array([product["price"] for product in self.products])
+        # 明细固定字段模板: 下标 i * 商品数 + j 对应第 i 个明细位置上的第 j 种商品
+        self.item_templates = [
+            {
+                "item_id": f"item_{i + 1}",
+                "product_name": product["name"],
+                "category": product["category"],
+                "unit_price": product["price"]
+            }
+            for i in range(len(self.products))
+            for product in self.products
+        ]
     
     def handle(self, data: Dict[str, Any], context: ExecutionContext = None) -> Result:
         try:
-            # 获取输入参数
-            user_id = data.get("user_id", "").strip()
-            order_type = data.get("order_type", "normal")
-            product_count = int(data.get("product_count", 3))
-            min_amount = float(data.get("min_amount", 50))
-            max_amount = float(data.get("max_amount", 1000))
-            status = data.get("status", "paid")
-            generate_count = int(data.get("generate_count", 1))
-            
-            # 验证参数
-            if not user_id:
-                return Result(
-                    status=ResultStatus.ERROR,
-                    message="用户ID不能为空"
-                )
-            
-            if min_amount >= max_amount:
-                return Result(
-                    status=ResultStatus.ERROR,
-                    message="最小金额必须小于最大金额"
-                )
-            
-            # 生成订单数据
-            orders = []
-            for i in range(generate_count):
-                order_data = self._generate_order_data(
-                    user_id, order_type, product_count, 
-                    min_amount, max_amount, status, i
-                )
-                orders.append(order_data)
+            orders, summary = drain(self.stream(data, context))
             
             # 构造结果
-            if generate_count == 1:
+            if len(orders) == 1:
                 result_data = orders[0]
                 message = f"成功生成订单: {result_data['order_no']}"
             else:
-                total_amount = sum(order['total_amount'] for order in orders)
                 result_data = {
                     "orders": orders,
                     "total_count": len(orders),
-                    "summary": {
-                        "total_amount": round(total_amount, 2),
-                        "avg_amount": round(total_amount / len(orders), 2),
-                        "order_types": self._count_by_field(orders, 'order_type'),
-                        "status_distribution": self._count_by_field(orders, 'status')
-                    }
+                    "summary": summary
                 }
-                message = f"成功生成 {len(orders)} 个订单，总金额 ¥{total_amount:.2f}"
+                message = f"成功生成 {len(orders)} 个订单，总金额 ¥{summary['total_amount']:.2f}"
             
             return Result(
                 status=ResultStatus.SUCCESS,
@@ -207,6 +204,11 @@ class OrderDemoHandler(Handler):
                 message=message
             )
             
+        except ValueError as e:
+            return Result(
+                status=ResultStatus.ERROR,
+                message=str(e)
+            )
         except Exception as e:
             return Result(
                 status=ResultStatus.ERROR,
@@ -214,103 +216,159 @@ class OrderDemoHandler(Handler):
                 error_code="PROCESSING_ERROR"
             )
     
-    def _generate_order_data(self, user_id: str, order_type: str, product_count: int,
-                           min_amount: float, max_amount: float, status: str, index: int) -> Dict[str, Any]:
-        """生成单个订单数据"""
+    def stream(self, data: Dict[str, Any], context: ExecutionContext = None):
+        """逐条生成订单数据，汇总信息增量计算"""
+        # 获取输入参数
+        user_id = data.get("user_id", "").strip()
+        order_type = data.get("order_type", "normal")
+        product_count = int(data.get("product_count", 3))
+        min_amount = float(data.get("min_amount", 50))
+        max_amount = float(data.get("max_amount", 1000))
+        status = data.get("status", "paid")
+        generate_count = int(data.get("generate_count", 1))
         
-        # 生成订单号
-        order_no = f"ORD{int(time.time())}{index:03d}"
+        # 验证参数
+        if not user_id:
+            raise ValueError("用户ID不能为空")
         
-        # 随机选择商品
-        selected_products = random.sample(self.products, min(product_count, len(self.products)))
+        if min_amount >= max_amount:
+            raise ValueError("最小金额必须小于最大金额")
         
-        # 生成订单商品
-        order_items = []
-        subtotal = 0
+        # 按列批量生成随机字段，指定种子时结果可复现
+        seed = context_streams(context).seed
+        now = int(context_time(context))
         
-        for i, product in enumerate(selected_products):
-            quantity = random.randint(1, 5)
-            unit_price = product["price"]
-            item_total = unit_price * quantity
-            subtotal += item_total
-            
-            order_items.append({
-                "item_id": f"item_{i + 1}",
-                "product_name": product["name"],
-                "category": product["category"],
-                "unit_price": unit_price,
-                "quantity": quantity,
-                "total_price": item_total
-            })
+        total_amount = 0.0
+        
+        for offset in range(0, generate_count, CHUNK_ROWS):
+            if context is not None:
+                # 客户端断开或任务取消时尽快停止，每段报告一次进度
+                context.check_cancelled()
+                context.report_progress(offset, generate_count)
+            columns = Columns(seed, offset, min(CHUNK_ROWS, generate_count - offset))
+            order_nos = ORDER_NUMBER.format(
+                context_sequence(context, "order_no", offset, columns.count), now
+            )
+            orders, chunk_amount = self._generate_orders(
+                columns, order_nos, now, user_id, order_type, product_count,
+                min_amount, max_amount, status
+            )
+            total_amount += chunk_amount
+            yield from orders
+        
+        if context is not None:
+            context.report_progress(generate_count, generate_count)
+        
+        # 订单类型和状态由参数决定，每个订单都相同
+        return {
+            "total_amount": round(total_amount, 2),
+            "avg_amount": round(total_amount / generate_count, 2) if generate_count else 0,
+            "order_types": {order_type: generate_count} if generate_count else {},
+            "status_distribution": {status: generate_count} if generate_count else {}
+        }
+    
+    def _generate_orders(self, columns: Columns, order_nos: List[str], now: int,
+                         user_id: str, order_type: str,
+                         product_count: int, min_amount: float, max_amount: float,
+                         status: str) -> Tuple[List[Dict[str, Any]], float]:
+        """生成一段订单数据，返回 (订单列表, 总金额)
+        
+        商品、数量和金额按列一次计算，逐行只组装字典。
+        """
+        
+        # 随机选择商品，每行 k 个不重复的商品
+        k = min(product_count, len(self.products))
+        picks = columns.sample_indices("products", len(self.products), k)
+        quantities = columns.integers("quantity", 1, 5, width=k)
+        unit_prices = self.prices[picks]
+        subtotals = (unit_prices * quantities).sum(axis=1)
         
         # 调整总金额到指定范围
-        if subtotal < min_amount:
-            # 如果金额太小，增加商品数量
-            adjustment_ratio = min_amount / subtotal
-            for item in order_items:
-                item["quantity"] = int(item["quantity"] * adjustment_ratio) + 1
-                item["total_price"] = item["unit_price"] * item["quantity"]
-        elif subtotal > max_amount:
-            # 如果金额太大，减少商品数量
-            adjustment_ratio = max_amount / subtotal
-            for item in order_items:
-                item["quantity"] = max(1, int(item["quantity"] * adjustment_ratio))
-                item["total_price"] = item["unit_price"] * item["quantity"]
+        too_small = subtotals < min_amount
+        too_large = subtotals > max_amount
+        quantities = np.where(
+            too_small[:, None],
+            (quantities * (min_amount / subtotals)[:, None]).astype(np.int64) + 1,
+            quantities
+        )
+        quantities = np.where(
+            too_large[:, None],
+            np.maximum(1, (quantities * (max_amount / subtotals)[:, None]).astype(np.int64)),
+            quantities
+        )
         
         # 重新计算总金额
-        subtotal = sum(item["total_price"] for item in order_items)
+        item_totals = unit_prices * quantities
+        subtotals = item_totals.sum(axis=1)
         
         # 计算优惠和运费
-        discount = round(subtotal * random.uniform(0, 0.1), 2)  # 0-10%优惠
-        shipping_fee = 0 if subtotal > 99 else 10  # 满99包邮
-        total_amount = subtotal - discount + shipping_fee
+        discounts = np.round(subtotals * columns.uniform("discount", 0, 0.1), 2)  # 0-10%优惠
+        shipping_fees = np.where(subtotals > 99, 0, 10)  # 满99包邮
+        totals = np.round(subtotals - discounts + shipping_fees, 2)
         
-        # 生成订单数据
-        order_data = {
-            "order_no": order_no,
-            "user_id": user_id,
-            "order_type": order_type,
-            "status": status,
-            "items": order_items,
-            "subtotal": round(subtotal, 2),
-            "discount": discount,
-            "shipping_fee": shipping_fee,
-            "total_amount": round(total_amount, 2),
-            "payment_method": random.choice(["alipay", "wechat", "card", "balance"]),
-            "shipping_address": self._generate_address(),
-            "created_at": int(time.time()) - random.randint(0, 86400 * 30),  # 最近30天内
-            "updated_at": int(time.time()),
-            "remark": f"订单备注信息 - {order_type}订单"
-        }
+        # 订单商品明细（商品固定字段预先组装，所有明细在一个推导式中只填数量和金额）
+        product_total = len(self.products)
+        template_ids = (picks + np.arange(k) * product_total).ravel().tolist()
+        templates = self.item_templates
+        items = [
+            {**templates[template_id], "quantity": quantity, "total_price": item_total}
+            for template_id, quantity, item_total in zip(
+                template_ids, quantities.ravel().tolist(), item_totals.ravel().tolist()
+            )
+        ]
+        order_items = [items[start:start + k] for start in range(0, len(items), k)]
         
-        return order_data
+        payment_methods = columns.choice("payment_method", PAYMENT_METHODS)
+        addresses = self._generate_addresses(columns)
+        created_ats = now - columns.integers("created_at", 0, 86400 * 30)  # 最近30天内
+        remark = f"订单备注信息 - {order_type}订单"
+        
+        orders = [
+            {
+                "order_no": order_no,
+                "user_id": user_id,
+                "order_type": order_type,
+                "status": status,
+                "items": items,
+                "subtotal": subtotal,
+                "discount": discount,
+                "shipping_fee": shipping_fee,
+                "total_amount": total_amount,
+                "payment_method": payment_method,
+                "shipping_address": address,
+                "created_at": created_at,
+                "updated_at": now,
+                "remark": remark
+            }
+            for (order_no, items, subtotal, discount, shipping_fee, total_amount,
+                 payment_method, address, created_at) in zip(
+                order_nos, order_items, np.round(subtotals, 2).tolist(), discounts.tolist(),
+                shipping_fees.tolist(), totals.tolist(), payment_methods, addresses,
+                created_ats.tolist()
+            )
+        ]
+        return orders, float(totals.sum())
     
-    def _generate_address(self) -> Dict[str, str]:
+    def _generate_addresses(self, columns: Columns) -> List[Dict[str, str]]:
         """生成收货地址"""
-        provinces = ["北京市", "上海市", "广东省", "江苏省", "浙江省", "山东省"]
-        cities = ["北京市", "上海市", "广州市", "深圳市", "杭州市", "南京市"]
-        districts = ["朝阳区", "海淀区", "天河区", "福田区", "西湖区", "玄武区"]
+        provinces = columns.weighted("province", PROVINCE_WEIGHTS)
+        cities = columns.choice("city", CITIES)
+        districts = columns.choice("district", DISTRICTS)
+        streets = columns.choice("street", STREETS)
+        numbers = columns.integers("street_no", 1, 999).tolist()
+        receivers = columns.integers("receiver", 1, 999).tolist()
+        phones = columns.phones("phone", PHONE_PREFIXES)
         
-        return {
-            "province": random.choice(provinces),
-            "city": random.choice(cities),
-            "district": random.choice(districts),
-            "detail": f"{random.choice(['中山路', '人民路', '建设路'])}{random.randint(1, 999)}号",
-            "receiver": f"收货人{random.randint(1, 999)}",
-            "phone": self._generate_phone()
-        }
-    
-    def _generate_phone(self) -> str:
-        """生成随机手机号"""
-        prefixes = ['130', '131', '132', '133', '134', '135', '136', '137', '138', '139']
-        prefix = random.choice(prefixes)
-        suffix = ''.join([str(random.randint(0, 9)) for _ in range(8)])
-        return f"{prefix}{suffix}"
-    
-    def _count_by_field(self, orders: list, field: str) -> Dict[str, int]:
-        """统计字段值分布"""
-        counts = {}
-        for order in orders:
-            value = order.get(field, 'unknown')
-            counts[value] = counts.get(value, 0) + 1
-        return counts
+        return [
+            {
+                "province": province,
+                "city": city,
+                "district": district,
+                "detail": f"{street}{number}号",
+                "receiver": f"收货人{receiver}",
+                "phone": phone
+            }
+            for province, city, district, street, number, receiver, phone in zip(
+                provinces, cities, districts, streets, numbers, receivers, phones
+            )
+        ]
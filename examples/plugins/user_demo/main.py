@@ -2,9 +2,10 @@
 用户演示插件 - 展示如何创建数据工厂插件
 """
 import json
-import random
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
 
 # 导入数据工厂核心接口
 import sys
@@ -18,8 +19,25 @@ if str(project_root) not in sys.path:
 
 from data_factory.core.interfaces import (
     Register, Handler, Module, Widget, WidgetType, SelectOption, 
-    ValidationRule, Result, ResultStatus, ExecutionContext
+    ValidationRule, Result, ResultStatus, ExecutionContext, ThreadSafety
 )
+from data_factory.core.columnar import Columns
+from data_factory.core.ids import context_ids
+from data_factory.core.rng import context_streams, context_time
+from data_factory.core.streaming import drain
+
+
+# 每次按列生成的行数
+CHUNK_ROWS = 10000
+
+# 地址按城市权重抽取
+CITY_WEIGHTS = {
+    '北京市': 3, '上海市': 3, '广州市': 2, '深圳市': 2,
+    '杭州市': 1, '南京市': 1, '武汉市': 1, '成都市': 1
+}
+DISTRICTS = ['朝阳区', '海淀区', '西城区', '东城区', '丰台区', '石景山区', '通州区', '昌平区']
+STREETS = ['中山路', '人民路', '解放路', '建设路', '和平路', '友谊路', '光明路', '胜利路']
+OPTIONAL_TAGS = ["VIP用户", "活跃用户", "新用户", "老用户", "高价值用户"]
 
 
 class UserDemoRegister(Register):
@@ -94,11 +112,10 @@ class UserDemoRegister(Register):
                 widget_type=WidgetType.NUMBER,
                 placeholder="请输入要生成的用户数量",
                 default_value="1",
-                help_text="要生成的用户数据条数",
+                help_text="要生成的用户数据条数（大批量请使用流式输出 ?_format=ndjson）",
                 validation=ValidationRule(
-                    required=True,
                     min_value=1,
-                    max_value=100
+                    max_value=1000000
                 )
             )
         ]
@@ -113,61 +130,33 @@ class UserDemoRegister(Register):
             action_name="generate",
             help_msg="这是一个用户数据生成的演示插件，展示了如何使用数据工厂创建测试数据。支持单个和批量生成用户数据。",
             author="数据工厂团队",
-            version="1.0.0"
+            version="1.0.0",
+            cacheable=True
         )
 
 
 class UserDemoHandler(Handler):
     """用户演示处理器"""
     
+    # 处理器无实例状态，可以在线程间共享
+    thread_safety = ThreadSafety.SHARED
+    
     def handle(self, data: Dict[str, Any], context: ExecutionContext = None) -> Result:
         try:
             # 模拟处理时间
             time.sleep(0.1)
             
-            # 获取输入参数
-            name = data.get("name", "").strip()
-            gender = data.get("gender", "female")
-            age = data.get("age")
-            email = data.get("email", "").strip()
-            description = data.get("description", "").strip()
-            generate_count = int(data.get("generate_count", 1))
-            
-            # 验证必填参数
-            if not name:
-                return Result(
-                    status=ResultStatus.ERROR,
-                    message="姓名不能为空"
-                )
-            
-            if age is None or age < 0 or age > 150:
-                return Result(
-                    status=ResultStatus.ERROR,
-                    message="年龄必须在0-150之间"
-                )
-            
-            # 生成用户数据
-            users = []
-            for i in range(generate_count):
-                user_data = self._generate_user_data(
-                    name, gender, age, email, description, i
-                )
-                users.append(user_data)
+            users, summary = drain(self.stream(data, context))
             
             # 构造结果
-            if generate_count == 1:
+            if len(users) == 1:
                 result_data = users[0]
                 message = f"成功生成用户数据: {result_data['name']}"
             else:
                 result_data = {
                     "users": users,
                     "total_count": len(users),
-                    "summary": {
-                        "male_count": len([u for u in users if u['gender'] == 'male']),
-                        "female_count": len([u for u in users if u['gender'] == 'female']),
-                        "other_count": len([u for u in users if u['gender'] == 'other']),
-                        "avg_age": sum(u['age'] for u in users) / len(users)
-                    }
+                    "summary": summary
                 }
                 message = f"成功生成 {len(users)} 条用户数据"
             
@@ -177,6 +166,11 @@ class UserDemoHandler(Handler):
                 message=message
             )
             
+        except ValueError as e:
+            return Result(
+                status=ResultStatus.ERROR,
+                message=str(e)
+            )
         except Exception as e:
             return Result(
                 status=ResultStatus.ERROR,
@@ -184,92 +178,130 @@ class UserDemoHandler(Handler):
                 error_code="PROCESSING_ERROR"
             )
     
-    def _generate_user_data(self, base_name: str, base_gender: str, base_age: int, 
-                           base_email: str, base_description: str, index: int) -> Dict[str, Any]:
-        """生成单个用户数据"""
+    def stream(self, data: Dict[str, Any], context: ExecutionContext = None):
+        """逐条生成用户数据，汇总信息增量计算"""
+        # 获取输入参数
+        name = data.get("name", "").strip()
+        gender = data.get("gender", "female")
+        age = data.get("age")
+        email = data.get("email", "").strip()
+        description = data.get("description", "").strip()
+        generate_count = int(data.get("generate_count", 1))
+        
+        # 验证必填参数
+        if not name:
+            raise ValueError("姓名不能为空")
+        
+        if age is None or age < 0 or age > 150:
+            raise ValueError("年龄必须在0-150之间")
+        
+        # 按列批量生成随机字段，指定种子时结果可复现
+        seed = context_streams(context).seed
+        now = int(context_time(context))
+        
+        gender_counts = {"male": 0, "female": 0, "other": 0}
+        age_total = 0
+        
+        for offset in range(0, generate_count, CHUNK_ROWS):
+            if context is not None:
+                # 客户端断开或任务取消时尽快停止，每段报告一次进度
+                context.check_cancelled()
+                context.report_progress(offset, generate_count)
+            columns = Columns(seed, offset, min(CHUNK_ROWS, generate_count - offset))
+            ids = context_ids(context, offset, columns.count)
+            users, chunk_age_total = self._generate_users(
+                columns, ids, now, name, gender, age, email, description
+            )
+            gender_counts[gender] = gender_counts.get(gender, 0) + columns.count
+            age_total += chunk_age_total
+            yield from users
+        
+        if context is not None:
+            context.report_progress(generate_count, generate_count)
+        
+        return {
+            "male_count": gender_counts["male"],
+            "female_count": gender_counts["female"],
+            "other_count": gender_counts["other"],
+            "avg_age": age_total / generate_count if generate_count else 0
+        }
+    
+    def _generate_users(self, columns: Columns, ids: List[int], now: int, base_name: str,
+                        base_gender: str, base_age: int, base_email: str,
+                        base_description: str) -> Tuple[List[Dict[str, Any]], int]:
+        """生成一段用户数据，返回 (用户列表, 年龄总和)
+        
+        随机字段按列一次生成，逐行只组装字典。
+        用户ID为64位雪花ID，以字符串返回（JavaScript 的数字无法精确表示64位整数）。
+        """
+        indexes = range(columns.start, columns.start + columns.count)
         
         # 姓名变化
-        if index == 0:
-            name = base_name
-        else:
-            name = f"{base_name}_{index + 1}"
+        names = [f"{base_name}_{index + 1}" if index else base_name for index in indexes]
         
         # 年龄随机变化
-        age = max(1, min(150, base_age + random.randint(-5, 5)))
+        ages = np.clip(base_age + columns.integers("age", -5, 5), 1, 150)
         
         # 邮箱变化
         if base_email and '@' in base_email:
-            email_parts = base_email.split('@')
-            if index == 0:
-                email = base_email
-            else:
-                email = f"{email_parts[0]}_{index + 1}@{email_parts[1]}"
+            email_user, email_domain = base_email.split('@', 1)
+            emails = [f"{email_user}_{index + 1}@{email_domain}" if index else base_email
+                      for index in indexes]
         else:
-            email = f"user_{index + 1}@example.com"
+            emails = [f"user_{index + 1}@example.com" for index in indexes]
         
-        # 生成额外的用户属性
-        user_data = {
-            "id": f"user_{int(time.time())}_{index}",
-            "name": name,
-            "gender": base_gender,
-            "age": age,
-            "email": email,
-            "description": base_description,
-            "phone": self._generate_phone(),
-            "address": self._generate_address(),
-            "created_at": int(time.time()),
-            "is_active": True,
-            "tags": self._generate_tags(base_gender, age)
-        }
+        phones = columns.phones("phone")
+        addresses = self._generate_addresses(columns)
+        tags = self._generate_tags(columns, base_gender, ages)
         
-        return user_data
-    
-    def _generate_phone(self) -> str:
-        """生成随机手机号"""
-        prefixes = ['130', '131', '132', '133', '134', '135', '136', '137', '138', '139',
-                   '150', '151', '152', '153', '155', '156', '157', '158', '159',
-                   '180', '181', '182', '183', '184', '185', '186', '187', '188', '189']
-        prefix = random.choice(prefixes)
-        suffix = ''.join([str(random.randint(0, 9)) for _ in range(8)])
-        return f"{prefix}{suffix}"
+        users = [
+            {
+                "id": str(user_id),
+                "name": name,
+                "gender": base_gender,
+                "age": age,
+                "email": email,
+                "description": base_description,
+                "phone": phone,
+                "address": address,
+                "created_at": now,
+                "is_active": True,
+                "tags": user_tags
+            }
+            for user_id, name, age, email, phone, address, user_tags in zip(
+                ids, names, ages.tolist(), emails, phones, addresses, tags
+            )
+        ]
+        return users, int(ages.sum())
     
-    def _generate_address(self) -> str:
+    def _generate_addresses(self, columns: Columns) -> List[str]:
         """生成随机地址"""
-        cities = ['北京市', '上海市', '广州市', '深圳市', '杭州市', '南京市', '武汉市', '成都市']
-        districts = ['朝阳区', '海淀区', '西城区', '东城区', '丰台区', '石景山区', '通州区', '昌平区']
-        streets = ['中山路', '人民路', '解放路', '建设路', '和平路', '友谊路', '光明路', '胜利路']
+        cities = columns.weighted("city", CITY_WEIGHTS)
+        districts = columns.choice("district", DISTRICTS)
+        streets = columns.choice("street", STREETS)
+        numbers = columns.integers("street_no", 1, 999).tolist()
         
-        city = random.choice(cities)
-        district = random.choice(districts)
-        street = random.choice(streets)
-        number = random.randint(1, 999)
-        
-        return f"{city}{district}{street}{number}号"
+        return [
+            f"{city}{district}{street}{number}号"
+            for city, district, street, number in zip(cities, districts, streets, numbers)
+        ]
     
-    def _generate_tags(self, gender: str, age: int) -> list:
+    def _generate_tags(self, columns: Columns, gender: str, ages: np.ndarray) -> List[List[str]]:
         """根据性别和年龄生成标签"""
-        tags = []
-        
         # 年龄相关标签
-        if age < 18:
-            tags.append("未成年")
-        elif age < 30:
-            tags.append("青年")
-        elif age < 60:
-            tags.append("中年")
-        else:
-            tags.append("老年")
+        age_tags = np.select(
+            [ages < 18, ages < 30, ages < 60], ["未成年", "青年", "中年"], default="老年"
+        ).tolist()
         
         # 性别相关标签
         if gender == "male":
-            tags.append("男性用户")
+            gender_tag = "男性用户"
         elif gender == "female":
-            tags.append("女性用户")
+            gender_tag = "女性用户"
         else:
-            tags.append("其他性别用户")
+            gender_tag = "其他性别用户"
         
         # 随机添加一些标签
-        optional_tags = ["VIP用户", "活跃用户", "新用户", "老用户", "高价值用户"]
-        tags.extend(random.sample(optional_tags, random.randint(1, 3)))
+        optional_tags = columns.tag_sets("tags", OPTIONAL_TAGS, 1, 3)
         
-        return tags
+        return [[age_tag, gender_tag] + extra for age_tag, extra in zip(age_tags, optional_tags)]
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+插件执行路径基准测试
+
+用法:
+    python scripts/benchmark.py [--quick] [--output benchmark.json] [--compare baseline.json]
+
+测量以下路径，结果写入 JSON 文件，便于在不同提交之间对比:
+  - scan_plugins: 扫描并导入演示插件的耗时（完整导入 / 注册快照）
+  - execute: execute_module 的单次延迟 p50/p99（进程内 / 工作进程池 / 子进程）
+  - generation: 演示插件在 1 / 100 / 10k / 1M 行时的生成速度（行/秒）
+  - http: /dmm 路由在并发下的吞吐量（进程内 ASGI 客户端，不经过网络）
+
+--compare 与之前的结果文件逐项对比，变差超过 --threshold 时以非零状态退出。
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Callable
+
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from data_factory.core.interfaces import ExecutionContext, ResultStatus
+from data_factory.core.plugin_manager import PluginManager
+from data_factory.core.registry_cache import SNAPSHOT_FILE
+from data_factory.core.serialization import serializer_name
+
+
+PLUGINS_DIR = project_root / "examples" / "plugins"
+USER_MODULE = "user_demo_UserDemoRegister"
+ORDER_MODULE = "order_demo_OrderDemoRegister"
+SEED = 20240101
+
+
+def user_params(rows: int) -> Dict[str, Any]:
+    return {"name": "张三", "age": 30, "email": "zhangsan@example.com", "generate_count": rows}
+
+
+def order_params(rows: int) -> Dict[str, Any]:
+    return {"user_id": "user_12345", "product_count": 3, "min_amount": 50,
+            "max_amount": 1000, "generate_count": rows}
+
+
+GENERATION_CASES = [(USER_MODULE, user_params), (ORDER_MODULE, order_params)]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """最近秩百分位数（q 取 0-100）"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """延迟统计（毫秒）"""
+    ms = [sample * 1000 for sample in samples]
+    return {
+        "runs": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(statistics.mean(ms), 3),
+        "min_ms": round(min(ms), 3)
+    }
+
+
+def timed(func: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def check(result) -> None:
+    if result.status == ResultStatus.ERROR:
+        raise RuntimeError(f"执行失败: {result.message}")
+
+
+# ---- 插件扫描 ----
+
+def bench_scan(repeat: int) -> Dict[str, Any]:
+    """完整导入与注册快照两种扫描方式（在临时目录中的插件副本上测量，不改动示例插件目录）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        plugins_dir = Path(tmp) / "plugins"
+        shutil.copytree(PLUGINS_DIR, plugins_dir,
+                        ignore=shutil.ignore_patterns("__pycache__", SNAPSHOT_FILE))
+        results = {}
+        for name, lazy in (("full", False), ("snapshot", True)):
+            # 第一次扫描写入注册快照，不计入
+            PluginManager(str(plugins_dir), isolation="none", lazy_discovery=lazy).scan_plugins()
+            samples = []
+            for _ in range(repeat):
+                manager = PluginManager(str(plugins_dir), isolation="none", lazy_discovery=lazy)
+                samples.append(timed(manager.scan_plugins))
+            results[name] = summarize(samples)
+        return results
+
+
+# ---- 单次执行延迟 ----
+
+def bench_execute(runs: int, subprocess_runs: int) -> Dict[str, Any]:
+    """execute_module 单行请求的延迟（user_demo 的 handle() 包含 0.1 秒模拟处理时间）"""
+    results = {}
+    for isolation, count in (("none", runs), ("pool", runs), ("subprocess", subprocess_runs)):
+        manager = PluginManager(str(PLUGINS_DIR), isolation=isolation, pool_size=1, timeout=60)
+        manager.scan_plugins()
+        try:
+            for module_id, params in GENERATION_CASES:
+                data = params(1)
+                check(manager.execute_module(module_id, data))  # 预热（导入插件、启动工作进程）
+                samples = []
+                for _ in range(count):
+                    start = time.perf_counter()
+                    check(manager.execute_module(module_id, data, ExecutionContext()))
+                    samples.append(time.perf_counter() - start)
+                results[f"{isolation}/{module_id}"] = summarize(samples)
+        finally:
+            manager.shutdown()
+    return results
+
+
+# ---- 生成速度 ----
+
+def bench_generation(sizes: List[int], repeat: int) -> Dict[str, Any]:
+    """通过 open_stream() 生成并取出全部记录（进程内，不包含编码），取最短耗时"""
+    manager = PluginManager(str(PLUGINS_DIR), isolation="none")
+    manager.scan_plugins()
+    results = {}
+    try:
+        for module_id, params in GENERATION_CASES:
+            for rows in sizes:
+                data = params(rows)
+                context = ExecutionContext(seed=SEED)
+                best = float("inf")
+                # 百万行只测一次
+                for _ in range(repeat if rows < 1000000 else 1):
+                    stream = manager.open_stream(module_id, data, context)
+                    best = min(best, timed(lambda: sum(1 for _ in stream)))
+                results[f"{module_id}/{rows}"] = {
+                    "rows": rows,
+                    "seconds": round(best, 6),
+                    "rows_per_second": round(rows / best, 1)
+                }
+    finally:
+        manager.shutdown()
+    return results
+
+
+# ---- HTTP 吞吐量 ----
+
+async def _http_load(app: Any, path: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    remaining = iter(range(requests))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        await client.get(path)  # 预热
+
+        async def worker():
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                key = str(response.status_code)
+                statuses[key] = statuses.get(key, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 1),
+        "statuses": statuses,
+        **summarize(latencies)
+    }
+
+
+def bench_http(requests: int, concurrency: int, executor: str) -> Dict[str, Any]:
+    """/dmm/order/generate 在并发下的吞吐量（每个请求生成10条订单）"""
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        print("⚠️ 未安装 httpx，跳过 HTTP 测试: pip install httpx")
+        return {}
+
+    state_dir = tempfile.mkdtemp(prefix="data-factory-bench-")
+    # Web 应用在导入时读取配置：调度队列足够容纳全部并发请求，避免测到 429
+    os.environ.update({
+        "DATA_FACTORY_PLUGINS_DIR": str(PLUGINS_DIR),
+        "DATA_FACTORY_EXECUTOR": executor,
+        "DATA_FACTORY_MODULE_QUEUE_DEPTH": str(concurrency),
+        "DATA_FACTORY_MAX_QUEUE_DEPTH": str(concurrency * 2),
+        "DATA_FACTORY_STATE_DIR": state_dir,
+        "DATA_FACTORY_WATCH_PLUGINS": "false"
+    })
+    from data_factory.web import main as web
+
+    async def run():
+        await web.startup_event()
+        try:
+            path = "/dmm/order/generate?user_id=user_12345&generate_count=10"
+            return await _http_load(web.app, path, requests, concurrency)
+        finally:
+            await web.shutdown_event()
+
+    try:
+        result = asyncio.run(run())
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+    return {"executor": executor, **result}
+
+
+# ---- 结果文件 ----
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "serializer": serializer_name()
+    }
+
+
+# 对比时各指标的方向：True 表示越大越好
+METRICS = {"p50_ms": False, "p99_ms": False, "rows_per_second": True, "requests_per_second": True}
+
+
+def flatten(results: Dict[str, Any]) -> Dict[str, float]:
+    """把结果展开为 {"execute/none/...:p50_ms": 数值} 形式的可比较指标"""
+    metrics = {}
+    for section, cases in results.items():
+        if section == "http":
+            cases = {cases.get("executor", ""): cases} if cases else {}
+        for case, values in cases.items():
+            for metric in METRICS:
+                if metric in values:
+                    metrics[f"{section}/{case}:{metric}"] = values[metric]
+    return metrics
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> bool:
+    """打印与基线的差异，返回是否有指标变差超过 threshold（比例）"""
+    before, after = flatten(baseline["results"]), flatten(current["results"])
+    commit = baseline.get("environment", {}).get("commit") or "基线"
+    print(f"\n🔍 与 {commit} 对比（变差超过 {threshold:.0%} 标记为 ❌）")
+    regressed = False
+    common = [key for key in sorted(after) if before.get(key)]
+    if not common:
+        print("  （没有可对比的指标）")
+    for key in common:
+        higher_is_better = METRICS[key.rsplit(":", 1)[1]]
+        change = after[key] / before[key] - 1
+        worse = -change if higher_is_better else change
+        mark = "❌" if worse > threshold else ("✅" if worse < -threshold else "  ")
+        regressed = regressed or worse > threshold
+        print(f"  {mark} {key:<64}{before[key]:>14,.2f} → {after[key]:>14,.2f} ({change:+.1%})")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="插件执行路径基准测试")
+    parser.add_argument("--quick", action="store_true", help="快速模式（更少的次数，最多生成10万行）")
+    parser.add_argument("--output", default="benchmark.json", help="结果文件")
+    parser.add_argument("--compare", help="与之前的结果文件对比")
+    parser.add_argument("--threshold", type=float, default=0.1, help="对比时视为变差的比例")
+    parser.add_argument("--only", nargs="+", choices=["scan", "execute", "generation", "http"],
+                        help="只运行指定的测试")
+    parser.add_argument("--sizes", type=int, nargs="+", help="生成速度测试的行数")
+    parser.add_argument("--concurrency", type=int, default=32, help="HTTP 测试的并发数")
+    parser.add_argument("--requests", type=int, help="HTTP 测试的请求数")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="HTTP 测试的执行器")
+    args = parser.parse_args()
+
+    quick = args.quick
+    sizes = args.sizes or ([1, 100, 10000, 100000] if quick else [1, 100, 10000, 1000000])
+    selected = set(args.only or ["scan", "execute", "generation", "http"])
+    results: Dict[str, Any] = {}
+
+    if "scan" in selected:
+        print("🔌 插件扫描...")
+        results["scan_plugins"] = bench_scan(5 if quick else 20)
+    if "execute" in selected:
+        print("⚡ 单次执行延迟...")
+        results["execute"] = bench_execute(20 if quick else 200, 5 if quick else 30)
+    if "generation" in selected:
+        print("📈 生成速度...")
+        results["generation"] = bench_generation(sizes, 2 if quick else 5)
+    if "http" in selected:
+        print("🌐 HTTP 吞吐量...")
+        requests = args.requests or (500 if quick else 5000)
+        results["http"] = bench_http(requests, args.concurrency, args.executor)
+
+    report = {"environment": environment(), "results": results}
+    Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    for key, value in flatten(results).items():
+        print(f"  {key:<64}{value:>14,.2f}")
+    print(f"\n💾 结果已写入 {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
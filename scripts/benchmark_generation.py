@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+数据生成性能对比: 逐行生成 vs 列式批量生成
+
+用法: python scripts/benchmark_generation.py [--rows 100000] [--repeat 3]
+
+逐行基线是演示插件移植到 data_factory.core.columnar 之前的原始实现
+（全局 random 模块，逐个字段调用 randint/choice/sample），去掉了 user_demo 中模拟处理耗时的 sleep。
+完整记录的对比使用同样的原始实现逐行组装字典，与演示插件的 stream() 比较。
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+from data_factory.core.columnar import Columns
+from data_factory.core.interfaces import ExecutionContext
+from data_factory.core.plugin_manager import PluginManager
+from data_factory.core.streaming import drain
+
+
+SEED = 20240101
+PHONE_PREFIXES = ['130', '131', '132', '133', '134', '135', '136', '137', '138', '139',
+                  '150', '151', '152', '153', '155', '156', '157', '158', '159',
+                  '180', '181', '182', '183', '184', '185', '186', '187', '188', '189']
+CITIES = ['北京市', '上海市', '广州市', '深圳市', '杭州市', '南京市', '武汉市', '成都市']
+DISTRICTS = ['朝阳区', '海淀区', '西城区', '东城区', '丰台区', '石景山区', '通州区', '昌平区']
+STREETS = ['中山路', '人民路', '解放路', '建设路', '和平路', '友谊路', '光明路', '胜利路']
+OPTIONAL_TAGS = ["VIP用户", "活跃用户", "新用户", "老用户", "高价值用户"]
+PRODUCTS = [
+    {"name": "iPhone 15 Pro", "category": "电子产品", "price": 8999.00},
+    {"name": "MacBook Air", "category": "电子产品", "price": 7999.00},
+    {"name": "AirPods Pro", "category": "电子产品", "price": 1899.00},
+    {"name": "Nike Air Max", "category": "运动鞋", "price": 899.00},
+    {"name": "Adidas 三叶草", "category": "运动鞋", "price": 699.00},
+    {"name": "优衣库T恤", "category": "服装", "price": 99.00},
+    {"name": "ZARA外套", "category": "服装", "price": 299.00},
+    {"name": "星巴克咖啡豆", "category": "食品", "price": 128.00},
+    {"name": "农夫山泉", "category": "饮品", "price": 2.50},
+    {"name": "小米电视", "category": "家电", "price": 2999.00},
+    {"name": "海尔冰箱", "category": "家电", "price": 3499.00},
+    {"name": "戴森吸尘器", "category": "家电", "price": 2199.00}
+]
+PRICES = [product["price"] for product in PRODUCTS]
+
+
+# ---- 逐行基线（移植前演示插件的实现） ----
+
+def legacy_phone() -> str:
+    prefix = random.choice(PHONE_PREFIXES)
+    suffix = ''.join([str(random.randint(0, 9)) for _ in range(8)])
+    return f"{prefix}{suffix}"
+
+
+def legacy_address() -> str:
+    city = random.choice(CITIES)
+    district = random.choice(DISTRICTS)
+    street = random.choice(STREETS)
+    number = random.randint(1, 999)
+    return f"{city}{district}{street}{number}号"
+
+
+def legacy_tags() -> list:
+    return random.sample(OPTIONAL_TAGS, random.randint(1, 3))
+
+
+def legacy_amount() -> float:
+    subtotal = sum(product["price"] * random.randint(1, 5) for product in random.sample(PRODUCTS, 3))
+    return round(subtotal - round(subtotal * random.uniform(0, 0.1), 2), 2)
+
+
+def legacy_column(field, rows: int) -> list:
+    random.seed(SEED)
+    return [field() for _ in range(rows)]
+
+
+def legacy_user(index: int, base_name: str, base_gender: str, base_age: int, base_email: str,
+                base_description: str) -> dict:
+    name = base_name if index == 0 else f"{base_name}_{index + 1}"
+    age = max(1, min(150, base_age + random.randint(-5, 5)))
+    if base_email and '@' in base_email:
+        email_parts = base_email.split('@')
+        email = base_email if index == 0 else f"{email_parts[0]}_{index + 1}@{email_parts[1]}"
+    else:
+        email = f"user_{index + 1}@example.com"
+    tags = ["未成年" if age < 18 else "青年" if age < 30 else "中年" if age < 60 else "老年"]
+    tags.append({"male": "男性用户", "female": "女性用户"}.get(base_gender, "其他性别用户"))
+    tags.extend(legacy_tags())
+    return {
+        "id": f"user_{int(time.time())}_{index}",
+        "name": name,
+        "gender": base_gender,
+        "age": age,
+        "email": email,
+        "description": base_description,
+        "phone": legacy_phone(),
+        "address": legacy_address(),
+        "created_at": int(time.time()),
+        "is_active": True,
+        "tags": tags
+    }
+
+
+def legacy_order(index: int, user_id: str, order_type: str, product_count: int,
+                 min_amount: float, max_amount: float, status: str) -> dict:
+    order_no = f"ORD{int(time.time())}{index:03d}"
+    order_items = []
+    subtotal = 0
+    for i, product in enumerate(random.sample(PRODUCTS, min(product_count, len(PRODUCTS)))):
+        quantity = random.randint(1, 5)
+        item_total = product["price"] * quantity
+        subtotal += item_total
+        order_items.append({
+            "item_id": f"item_{i + 1}",
+            "product_name": product["name"],
+            "category": product["category"],
+            "unit_price": product["price"],
+            "quantity": quantity,
+            "total_price": item_total
+        })
+    if subtotal < min_amount:
+        ratio = min_amount / subtotal
+        for item in order_items:
+            item["quantity"] = int(item["quantity"] * ratio) + 1
+            item["total_price"] = item["unit_price"] * item["quantity"]
+    elif subtotal > max_amount:
+        ratio = max_amount / subtotal
+        for item in order_items:
+            item["quantity"] = max(1, int(item["quantity"] * ratio))
+            item["total_price"] = item["unit_price"] * item["quantity"]
+    subtotal = sum(item["total_price"] for item in order_items)
+    discount = round(subtotal * random.uniform(0, 0.1), 2)
+    shipping_fee = 0 if subtotal > 99 else 10
+    total_amount = subtotal - discount + shipping_fee
+    return {
+        "order_no": order_no,
+        "user_id": user_id,
+        "order_type": order_type,
+        "status": status,
+        "items": order_items,
+        "subtotal": round(subtotal, 2),
+        "discount": discount,
+        "shipping_fee": shipping_fee,
+        "total_amount": round(total_amount, 2),
+        "payment_method": random.choice(["alipay", "wechat", "card", "balance"]),
+        "shipping_address": {
+            "province": random.choice(["北京市", "上海市", "广东省", "江苏省", "浙江省", "山东省"]),
+            "city": random.choice(["北京市", "上海市", "广州市", "深圳市", "杭州市", "南京市"]),
+            "district": random.choice(["朝阳区", "海淀区", "天河区", "福田区", "西湖区", "玄武区"]),
+            "detail": f"{random.choice(['中山路', '人民路', '建设路'])}{random.randint(1, 999)}号",
+            "receiver": f"收货人{random.randint(1, 999)}",
+            "phone": legacy_phone()
+        },
+        "created_at": int(time.time()) - random.randint(0, 86400 * 30),
+        "updated_at": int(time.time()),
+        "remark": f"订单备注信息 - {order_type}订单"
+    }
+
+
+def legacy_users(rows: int) -> list:
+    random.seed(SEED)
+    return [legacy_user(i, "张三", "female", 30, "zhangsan@example.com", "") for i in range(rows)]
+
+
+def legacy_orders(rows: int) -> list:
+    random.seed(SEED)
+    return [legacy_order(i, "user_12345", "normal", 3, 50, 1000, "paid") for i in range(rows)]
+
+
+# ---- 列式实现 ----
+
+def columnar_amount(columns: Columns) -> np.ndarray:
+    prices = np.array(PRICES)[columns.sample_indices("products", len(PRICES), 3)]
+    subtotals = (prices * columns.integers("quantity", 1, 5, width=3)).sum(axis=1)
+    return np.round(subtotals - np.round(subtotals * columns.uniform("discount", 0, 0.1), 2), 2)
+
+
+PRIMITIVES = [
+    ("手机号", legacy_phone, lambda c: c.phones("phone")),
+    ("地址", legacy_address, lambda c: [
+        f"{city}{district}{street}{number}号" for city, district, street, number in zip(
+            c.choice("city", CITIES), c.choice("district", DISTRICTS),
+            c.choice("street", STREETS), c.integers("street_no", 1, 999).tolist())
+    ]),
+    ("标签集合", legacy_tags, lambda c: c.tag_sets("tags", OPTIONAL_TAGS, 1, 3)),
+    ("订单金额", legacy_amount, columnar_amount),
+]
+
+
+def best_of(repeat: int, func) -> float:
+    """多次执行取最短耗时"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据生成性能对比")
+    parser.add_argument("--rows", type=int, default=100000, help="生成行数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最短耗时）")
+    args = parser.parse_args()
+    rows = args.rows
+
+    print(f"📈 单列生成 {rows:,} 行（行/秒）")
+    print(f"{'字段':<8}{'逐行':>14}{'列式':>14}{'倍数':>10}")
+    for label, legacy, columnar in PRIMITIVES:
+        legacy_time = best_of(args.repeat, lambda: legacy_column(legacy, rows))
+        columnar_time = best_of(args.repeat, lambda: columnar(Columns(SEED, 0, rows)))
+        print(f"{label:<8}{rows / legacy_time:>14,.0f}{rows / columnar_time:>14,.0f}"
+              f"{legacy_time / columnar_time:>9.1f}x")
+
+    print(f"\n📦 演示插件完整记录 {rows:,} 行（行/秒，包含逐行组装字典）")
+    print(f"{'模块':<32}{'逐行':>14}{'列式':>14}{'倍数':>10}")
+    pm = PluginManager(str(project_root / "examples" / "plugins"), isolation="none")
+    pm.scan_plugins()
+    context = ExecutionContext(seed=SEED)
+    cases = [
+        ("user_demo_UserDemoRegister", legacy_users,
+         {"name": "张三", "age": 30, "email": "zhangsan@example.com", "generate_count": rows}),
+        ("order_demo_OrderDemoRegister", legacy_orders,
+         {"user_id": "user_12345", "product_count": 3, "min_amount": 50,
+          "max_amount": 1000, "generate_count": rows}),
+    ]
+    for module_id, legacy, data in cases:
+        handler = pm.handlers.acquire(module_id, pm.resolve_handler_class(module_id))
+        legacy_time = best_of(args.repeat, lambda: legacy(rows))
+        elapsed = best_of(args.repeat, lambda: drain(handler.stream(data, context)))
+        print(f"{module_id:<32}{rows / legacy_time:>14,.0f}{rows / elapsed:>14,.0f}"
+              f"{legacy_time / elapsed:>9.1f}x")
+    pm.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -52,8 +52,8 @@ def test_plugin_execution():
             
             print(f"📋 测试用户模块: {module.module_name}")
             
-            # 直接实例化处理器（绕过子进程）
-            handler = module.handler_class()
+            # 直接获取处理器实例（绕过子进程）
+            handler = pm.handlers.acquire(module_id, module.handler_class)
             test_data = {
                 'name': '测试用户',
                 'gender': 'female',
@@ -83,7 +83,7 @@ def test_plugin_execution():
             
             print(f"\n🛒 测试订单模块: {module.module_name}")
             
-            handler = module.handler_class()
+            handler = pm.handlers.acquire(module_id, module.handler_class)
             test_data = {
                 'user_id': 'user_12345',
                 'order_type': 'normal',
@@ -32,7 +32,9 @@ def main():
     print("=" * 50)
     
     # 启动服务
-    os.system(f"{sys.executable} -m uvicorn data_factory.web.main:app --host 0.0.0.0 --port 8000 --reload")
+    # 插件文件变化时只重新加载对应插件，不重启整个服务
+    os.environ.setdefault("DATA_FACTORY_WATCH_PLUGINS", "true")
+    os.system(f"{sys.executable} -m uvicorn data_factory.web.main:app --host 0.0.0.0 --port 8000")
 
 
 if __name__ == "__main__":
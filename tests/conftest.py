@@ -0,0 +1,29 @@
+"""
+测试公共夹具
+"""
+import shutil
+from pathlib import Path
+
+import pytest
+
+
+PLUGINS_SOURCE = Path(__file__).parent / "plugins"
+SAMPLE_MODULE = "sample_SampleRegister"
+LIMITED_MODULE = "limited_LimitedRegister"  # 声明了CPU时间和内存限制
+SIBLING_MODULE = "sibling_SiblingRegister"  # 导入同目录下的模块
+
+
+@pytest.fixture
+def plugins_dir(tmp_path: Path) -> Path:
+    """复制测试插件到临时目录（插件目录中会写入注册快照等文件）"""
+    target = tmp_path / "plugins"
+    shutil.copytree(PLUGINS_SOURCE, target, ignore=shutil.ignore_patterns("__pycache__"))
+    return target
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """序列号、进程号等持久状态写入临时目录"""
+    directory = tmp_path / "state"
+    monkeypatch.setenv("DATA_FACTORY_STATE_DIR", str(directory))
+    return directory
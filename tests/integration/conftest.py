@@ -0,0 +1,51 @@
+"""
+集成测试夹具 - 按环境变量配置创建 Web 应用，通过 TestClient 发送请求
+"""
+import importlib
+import sys
+import time
+from typing import Callable, Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def make_client(plugins_dir, tmp_path, monkeypatch) -> Iterator[Callable[..., TestClient]]:
+    """创建测试客户端：关键字参数为 DATA_FACTORY_* 配置（去掉前缀的小写名称）
+
+    Web 应用在导入时读取配置，每次创建都重新导入 data_factory.web.main。
+    """
+    clients = []
+
+    def create(**settings) -> TestClient:
+        monkeypatch.setenv("DATA_FACTORY_PLUGINS_DIR", str(plugins_dir))
+        monkeypatch.setenv("DATA_FACTORY_JOB_DIR", str(tmp_path / "jobs"))
+        monkeypatch.setenv("DATA_FACTORY_JOB_EVENT_INTERVAL", "0.05")
+        for name, value in settings.items():
+            monkeypatch.setenv(f"DATA_FACTORY_{name.upper()}", str(value))
+        sys.modules.pop("data_factory.web.main", None)
+        main = importlib.import_module("data_factory.web.main")
+        client = TestClient(main.app)
+        client.__enter__()  # 触发 startup 事件
+        client.main = main
+        clients.append(client)
+        return client
+
+    yield create
+    for client in clients:
+        client.__exit__(None, None, None)
+    sys.modules.pop("data_factory.web.main", None)
+
+
+@pytest.fixture
+def client(make_client) -> TestClient:
+    return make_client()
+
+
+def wait_until(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("等待超时")
+        time.sleep(0.01)
@@ -0,0 +1,42 @@
+"""
+批量执行接口测试
+"""
+import json
+
+from tests.conftest import SAMPLE_MODULE
+
+
+def test_batch(client):
+    items = [{"count": 1, "prefix": "a"}, {"prefix": "missing-count"}, {"count": 2, "prefix": "c"}]
+    response = client.post(f"/api/modules/{SAMPLE_MODULE}/batch", json=items)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "warning"
+    data = body["data"]
+    assert (data["total_count"], data["success_count"], data["error_count"]) == (3, 2, 1)
+    results = data["results"]
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert results[0]["data"][0]["name"] == "a-0"
+    assert results[1]["error_code"] == "VALIDATION_ERROR"
+    assert [row["name"] for row in results[2]["data"]] == ["c-0", "c-1"]
+
+
+def test_batch_route(client):
+    response = client.post("/dmm/sample/generate/batch", json=[{"count": 1}] * 3)
+    assert response.json()["data"]["success_count"] == 3
+    response = client.post("/dmm/sample/generate/batch", json={"count": 1})
+    assert response.status_code == 400 and response.json()["error_code"] == "INVALID_BATCH"
+
+
+def test_batch_stream(client):
+    response = client.post(f"/api/modules/{SAMPLE_MODULE}/batch", json=[{"count": 1}] * 5,
+                           params={"_format": "ndjson"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines[:-1]] == [0, 1, 2, 3, 4]
+    assert lines[-1]["_trailer"]["summary"] == {"success_count": 5, "error_count": 0}
+
+
+def test_batch_too_large(make_client):
+    client = make_client(max_batch_size=2)
+    response = client.post(f"/api/modules/{SAMPLE_MODULE}/batch", json=[{"count": 1}] * 3)
+    assert response.status_code == 413 and response.json()["error_code"] == "BATCH_TOO_LARGE"
@@ -0,0 +1,29 @@
+"""
+模块目录和路由接口测试
+"""
+from tests.conftest import SAMPLE_MODULE
+
+
+def test_catalog_etag(client):
+    response = client.get("/api/modules")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert SAMPLE_MODULE in {module["id"] for module in response.json()}
+
+    cached = client.get("/api/modules", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert client.get("/api/modules", headers={"If-None-Match": f'W/{etag}'}).status_code == 304
+    assert client.get("/api/modules", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_module_detail(client):
+    assert client.get(f"/api/modules/{SAMPLE_MODULE}").status_code == 200
+    assert client.get("/api/modules/missing").status_code == 404
+
+
+def test_route_lookup(client):
+    response = client.get("/dmm/sample/generate", params={"count": 2})
+    assert response.status_code == 200
+    assert [row["name"] for row in response.json()["data"]] == ["row-0", "row-1"]
+    assert client.get("/dmm/sample/missing").status_code == 404
@@ -0,0 +1,79 @@
+"""
+执行接口测试
+"""
+import threading
+
+from tests.conftest import SAMPLE_MODULE
+from tests.integration.conftest import wait_until
+
+
+def execute(client, data, **kwargs):
+    return client.post(f"/api/modules/{SAMPLE_MODULE}/execute", json=data, **kwargs)
+
+
+def hold_module(client, seconds=1.0):
+    """在后台线程中执行慢请求，等它占用调度名额后返回线程"""
+    thread = threading.Thread(target=execute, args=(client, {"count": 1, "mode": "sleep",
+                                                             "seconds": seconds}))
+    thread.start()
+    wait_until(lambda: client.main.dispatcher.stats()["pending"] == 1)
+    return thread
+
+
+def test_execute(client):
+    response = execute(client, {"count": 3, "prefix": "p"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "success" and body["error_code"] is None
+    assert [row["name"] for row in body["data"]] == ["p-0", "p-1", "p-2"]
+
+
+def test_execute_missing_module(client):
+    response = client.post("/api/modules/missing/execute", json={})
+    assert response.json()["error_code"] == "MODULE_NOT_FOUND"
+
+
+def test_handler_error(client):
+    body = execute(client, {"count": 1, "mode": "error"}).json()
+    assert body["status"] == "error" and "故意失败" in body["message"]
+
+
+def test_module_busy(make_client):
+    client = make_client(module_concurrency=1, module_queue_depth=0)
+    thread = hold_module(client)
+    try:
+        response = execute(client, {"count": 1})
+        assert response.status_code == 429
+        assert response.json()["error_code"] == "MODULE_BUSY"
+        assert response.headers["retry-after"] == "1"
+    finally:
+        thread.join()
+    assert execute(client, {"count": 1}).status_code == 200
+
+
+def test_server_busy(make_client):
+    client = make_client(max_workers=1, max_queue_depth=0)
+    thread = hold_module(client)
+    try:
+        response = execute(client, {"count": 1})
+        assert response.status_code == 503
+        assert response.json()["error_code"] == "SERVER_BUSY"
+    finally:
+        thread.join()
+
+
+def test_validation_error(client):
+    response = execute(client, {"prefix": "p"})
+    assert response.status_code == 400
+    body = response.json()
+    assert body["error_code"] == "VALIDATION_ERROR"
+    assert body["data"]["errors"]
+    # 非法请求不占用调度名额
+    assert client.main.dispatcher.stats()["pending"] == 0
+    assert execute(client, {"count": 100001}).status_code == 400
+    assert client.get("/dmm/sample/generate", params={"count": "abc"}).status_code == 400
+
+
+def test_optional_default_applied(client):
+    body = execute(client, {"count": 1}).json()
+    assert body["data"][0]["name"] == "row-0"
@@ -0,0 +1,75 @@
+"""
+后台任务接口测试
+"""
+import json
+
+from tests.conftest import SAMPLE_MODULE
+from tests.integration.conftest import wait_until
+
+
+def submit(client, data, **body):
+    return client.post("/api/jobs", json={"module_id": SAMPLE_MODULE, "data": data, **body})
+
+
+def wait_finished(client, job_id):
+    wait_until(lambda: client.get(f"/api/jobs/{job_id}").json()["status"]
+               in ("succeeded", "failed", "cancelled"), timeout=10)
+    return client.get(f"/api/jobs/{job_id}").json()
+
+
+def test_job_lifecycle(client):
+    response = submit(client, {"count": 250})
+    assert response.status_code == 202
+    job = response.json()
+    assert response.headers["location"] == f"/api/jobs/{job['id']}"
+    assert job["format"] == "ndjson"
+
+    done = wait_finished(client, job["id"])
+    assert done["status"] == "succeeded" and done["progress"] == 250
+    assert job["id"] in {item["id"] for item in client.get("/api/jobs").json()}
+
+    result = client.get(f"/api/jobs/{job['id']}/result")
+    assert result.status_code == 200
+    assert result.headers["content-type"].startswith("application/x-ndjson")
+    lines = result.text.splitlines()
+    assert len(lines) == 251 and json.loads(lines[-1])["_trailer"]["total_count"] == 250
+
+    assert client.delete(f"/api/jobs/{job['id']}").json()["status"] == "success"
+    assert client.get(f"/api/jobs/{job['id']}").status_code == 404
+
+
+def test_json_job_with_seed(client):
+    def run():
+        job = client.post("/api/jobs", json={"module_id": SAMPLE_MODULE, "data": {"count": 3},
+                                             "format": "json"}, headers={"X-Seed": "5"}).json()
+        assert wait_finished(client, job["id"])["seed"] == 5
+        return client.get(f"/api/jobs/{job['id']}/result").json()["data"]
+    assert run() == run()
+
+
+def test_cancel_job(client):
+    job = submit(client, {"count": 1, "mode": "sleep", "seconds": 10}, format="json").json()
+    wait_until(lambda: client.get(f"/api/jobs/{job['id']}").json()["status"] == "running")
+    assert client.delete(f"/api/jobs/{job['id']}").status_code == 409
+    assert client.get(f"/api/jobs/{job['id']}/result").status_code == 409
+    client.post(f"/api/jobs/{job['id']}/cancel")
+    assert wait_finished(client, job["id"])["status"] == "cancelled"
+
+
+def test_job_events(client):
+    job = submit(client, {"count": 10}).json()
+    response = client.get(f"/api/jobs/{job['id']}/events")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert events[-1][0] == "event: status"
+    assert json.loads(events[-1][1][len("data: "):])["status"] == "succeeded"
+
+
+def test_job_rejections(client):
+    assert submit(client, {"count": 1}, format="xml").json()["error_code"] == "UNSUPPORTED_FORMAT"
+    assert submit(client, {}).json()["error_code"] == "VALIDATION_ERROR"
+    response = client.post("/api/jobs", json={"module_id": "missing", "data": {}})
+    assert response.status_code == 404
+    response = client.post("/api/jobs", json={"data": {}})
+    assert response.status_code == 400 and response.json()["error_code"] == "INVALID_JOB"
+    assert client.get("/api/jobs/missing").status_code == 404
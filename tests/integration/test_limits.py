@@ -0,0 +1,52 @@
+"""
+资源限制和调度准入接口测试
+"""
+import os
+import threading
+
+from tests.conftest import LIMITED_MODULE, SAMPLE_MODULE
+from tests.integration.conftest import wait_until
+
+
+def test_limited_module_runs_isolated(client):
+    body = client.post(f"/api/modules/{LIMITED_MODULE}/execute", json={"count": 2}).json()
+    assert body["status"] == "success"
+    assert all(row["pid"] != os.getpid() for row in body["data"])
+
+
+def test_limited_module_rejects_streams(client):
+    for fmt in ("ndjson", "csv"):
+        response = client.post(f"/api/modules/{LIMITED_MODULE}/execute", json={"count": 2},
+                               params={"_format": fmt})
+        assert response.status_code == 400
+        assert response.json()["error_code"] == "STREAM_NOT_SUPPORTED"
+    response = client.post("/api/jobs", json={"module_id": LIMITED_MODULE, "data": {"count": 2},
+                                              "format": "ndjson"})
+    assert response.json()["error_code"] == "STREAM_NOT_SUPPORTED"
+    assert client.post("/api/jobs", json={"module_id": LIMITED_MODULE,
+                                          "data": {"count": 2}}).json()["format"] == "json"
+
+
+def test_memory_budget_reserved(make_client):
+    client = make_client(memory_budget=1024 * 1024 * 1024)
+    assert client.post(f"/api/modules/{LIMITED_MODULE}/execute", json={"count": 1}).status_code == 200
+    modules = client.main.dispatcher.stats()["modules"]
+    assert modules[LIMITED_MODULE]["memory"] == 512 * 1024 * 1024
+    assert client.main.dispatcher.stats()["memory_reserved"] == 0
+
+
+def test_jobs_share_dispatcher_slots(make_client):
+    client = make_client(module_concurrency=1)
+    thread = threading.Thread(target=client.post, args=(f"/api/modules/{SAMPLE_MODULE}/execute",),
+                              kwargs={"json": {"count": 1, "mode": "sleep", "seconds": 1}})
+    thread.start()
+    try:
+        wait_until(lambda: client.main.dispatcher.stats()["pending"] == 1)
+        job = client.post("/api/jobs", json={"module_id": SAMPLE_MODULE, "data": {"count": 1}}).json()
+        # 任务等待 Web 请求归还名额
+        wait_until(lambda: client.main.dispatcher.stats()["pending"] == 2)
+        assert client.get(f"/api/jobs/{job['id']}").json()["status"] == "running"
+    finally:
+        thread.join()
+    wait_until(lambda: client.get(f"/api/jobs/{job['id']}").json()["status"] == "succeeded")
+    wait_until(lambda: client.main.dispatcher.stats()["pending"] == 0)
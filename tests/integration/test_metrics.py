@@ -0,0 +1,53 @@
+"""
+运行指标接口测试
+"""
+import threading
+
+from tests.conftest import SAMPLE_MODULE
+from tests.integration.conftest import wait_until
+
+
+def samples(client):
+    """解析 /metrics 输出为 {序列: 数值}"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    values = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            values[series] = float(value)
+    return values
+
+
+def test_request_metrics(client):
+    for _ in range(2):
+        client.post(f"/api/modules/{SAMPLE_MODULE}/execute", json={"count": 3})
+    client.post(f"/api/modules/{SAMPLE_MODULE}/execute", json={"count": 1, "mode": "error"})
+    values = samples(client)
+    labels = f'module="{SAMPLE_MODULE}"'
+    assert values[f'data_factory_requests_total{{{labels},status="success",error_code=""}}'] == 2
+    assert values[f"data_factory_rows_generated_total{{{labels}}}"] == 6
+    for phase in ("queue", "validation", "execution", "serialization"):
+        series = f'data_factory_request_phase_seconds_count{{{labels},phase="{phase}"}}'
+        assert values[series] >= 2
+    buckets = [series for series in values
+               if series.startswith("data_factory_request_phase_seconds_bucket") and 'le="+Inf"' in series]
+    assert buckets
+    assert values["data_factory_dispatch_pending"] == 0
+
+
+def test_rejection_metrics(make_client):
+    client = make_client(module_concurrency=1, module_queue_depth=0)
+    thread = threading.Thread(target=client.post, args=(f"/api/modules/{SAMPLE_MODULE}/execute",),
+                              kwargs={"json": {"count": 1, "mode": "sleep", "seconds": 1}})
+    thread.start()
+    try:
+        wait_until(lambda: client.main.dispatcher.stats()["pending"] == 1)
+        client.post(f"/api/modules/{SAMPLE_MODULE}/execute", json={"count": 1})
+        values = samples(client)
+        rejected = f'data_factory_dispatch_rejections_total{{module="{SAMPLE_MODULE}",error_code="MODULE_BUSY"}}'
+        assert values[rejected] == 1
+        assert values[f'data_factory_module_pending{{module="{SAMPLE_MODULE}"}}'] == 1
+    finally:
+        thread.join()
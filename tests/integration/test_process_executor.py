@@ -0,0 +1,20 @@
+"""
+process 模式（常驻工作进程池）接口测试
+"""
+from tests.conftest import SAMPLE_MODULE
+
+
+def test_process_executor(make_client):
+    client = make_client(executor="process", max_workers=2, result_inline_limit=1024)
+    body = client.post(f"/api/modules/{SAMPLE_MODULE}/execute", json={"count": 3}).json()
+    assert body["status"] == "success" and len(body["data"]) == 3
+
+    # 超过 result_inline_limit 的结果通过结果文件返回
+    body = client.post(f"/api/modules/{SAMPLE_MODULE}/execute",
+                       json={"count": 1, "mode": "blob", "size": 100000}).json()
+    assert body["status"] == "success" and body["data"] == "x" * 100000
+
+    body = client.post(f"/api/modules/{SAMPLE_MODULE}/execute", json={"count": 1, "mode": "error"}).json()
+    assert body["status"] == "error" and "故意失败" in body["message"]
+    stats = client.main.plugin_manager.isolator.stats()
+    assert stats["size"] == 2
@@ -0,0 +1,37 @@
+"""
+执行进度（Server-Sent Events）接口测试
+"""
+import json
+
+from tests.conftest import SAMPLE_MODULE
+
+
+def parse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = block.split("\n")
+        events.append((lines[0][len("event: "):], json.loads(lines[1][len("data: "):])))
+    return events
+
+
+def test_progress_events(client):
+    response = client.post(f"/api/modules/{SAMPLE_MODULE}/execute",
+                           json={"count": 1, "mode": "busy", "seconds": 0.5},
+                           headers={"Accept": "text/event-stream"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    names = [name for name, _ in events]
+    assert names[-1] == "result" and names.count("result") == 1
+    assert "progress" in names
+    progress = [data["done"] for name, data in events if name == "progress"]
+    assert progress == sorted(progress)
+    result = events[-1][1]
+    assert result["status"] == "success" and result["data"][0]["name"] == "row-0"
+
+
+def test_progress_error_result(client):
+    response = client.get("/dmm/sample/generate", params={"count": 1, "mode": "error", "_format": "sse"})
+    events = parse_events(response.text)
+    assert events[-1][0] == "result" and events[-1][1]["status"] == "error"
+    assert client.main.dispatcher.stats()["pending"] == 0
@@ -0,0 +1,37 @@
+"""
+流式输出接口测试
+"""
+import json
+
+from tests.conftest import SAMPLE_MODULE
+
+
+def test_ndjson_stream(client):
+    response = client.post(f"/api/modules/{SAMPLE_MODULE}/execute", json={"count": 250},
+                           headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert len(lines) == 251
+    assert [json.loads(line)["name"] for line in lines[:2]] == ["row-0", "row-1"]
+    trailer = json.loads(lines[-1])["_trailer"]
+    assert trailer["total_count"] == 250 and trailer["summary"] == {"count": 250}
+
+
+def test_json_array_stream(client):
+    response = client.get("/dmm/sample/generate", params={"count": 3, "_format": "json-stream"})
+    assert response.status_code == 200
+    assert [row["name"] for row in response.json()["data"]] == ["row-0", "row-1", "row-2"]
+
+
+def test_stream_is_reproducible_with_seed(client):
+    def rows():
+        return client.get("/dmm/sample/generate", params={"count": 5, "_format": "ndjson"},
+                          headers={"X-Seed": "7"}).text.splitlines()[:-1]
+    assert rows() == rows()
+
+
+def test_unsupported_format(client):
+    response = client.get("/dmm/sample/generate", params={"count": 1, "_format": "xml"})
+    assert response.status_code == 400
+    assert response.json()["error_code"] == "UNSUPPORTED_FORMAT"
@@ -0,0 +1,44 @@
+"""
+测试插件 - 声明了CPU时间和内存限制的模块（只能隔离执行）
+"""
+import os
+from typing import Dict, Any
+
+from data_factory.core.interfaces import (
+    Register, Handler, Module, Widget, WidgetType, ValidationRule, Result, ResultStatus,
+    ExecutionContext, ResourceLimits
+)
+
+
+class LimitedRegister(Register):
+    """有资源限制的测试模块"""
+
+    def register(self) -> Module:
+        return Module(
+            handler_class=LimitedHandler,
+            group_name="测试",
+            module_name="有限制的测试数据",
+            widgets=[
+                Widget(
+                    name="count",
+                    label="条数",
+                    widget_type=WidgetType.NUMBER,
+                    validation=ValidationRule(required=True, min_value=0, max_value=100000)
+                )
+            ],
+            action_space="sample",
+            action_name="limited",
+            limits=ResourceLimits(max_cpu_seconds=10, max_memory_bytes=512 * 1024 * 1024)
+        )
+
+
+class LimitedHandler(Handler):
+    """生成 count 条记录，每条记录带有执行进程的 pid"""
+
+    def handle(self, data: Dict[str, Any], context: ExecutionContext = None) -> Result:
+        return Result(status=ResultStatus.SUCCESS, data=list(self.stream(data, context)))
+
+    def stream(self, data: Dict[str, Any], context: ExecutionContext = None):
+        pid = os.getpid()
+        for i in range(int(data.get("count", 1))):
+            yield {"id": i, "pid": pid}
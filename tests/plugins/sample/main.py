@@ -0,0 +1,83 @@
+"""
+测试插件 - 按参数生成记录，可以模拟慢执行、异常和大结果
+"""
+import time
+from typing import Dict, Any
+
+from data_factory.core.interfaces import (
+    Register, Handler, Module, Widget, WidgetType, ValidationRule, Result, ResultStatus,
+    ExecutionContext
+)
+from data_factory.core.ids import context_ids
+from data_factory.core.rng import context_streams
+
+
+class SampleRegister(Register):
+    """测试模块"""
+
+    def register(self) -> Module:
+        return Module(
+            handler_class=SampleHandler,
+            group_name="测试",
+            module_name="测试数据",
+            widgets=[
+                Widget(
+                    name="count",
+                    label="条数",
+                    widget_type=WidgetType.NUMBER,
+                    validation=ValidationRule(required=True, min_value=0, max_value=100000)
+                ),
+                Widget(
+                    name="prefix",
+                    label="前缀",
+                    widget_type=WidgetType.INPUT,
+                    default_value="row"
+                )
+            ],
+            action_space="sample",
+            action_name="generate",
+            cacheable=True
+        )
+
+
+class SampleHandler(Handler):
+    """生成 count 条记录；mode 为 sleep / busy / error / blob 时分别模拟慢执行、不响应取消的慢执行、异常和大结果，
+    为 print 时先向标准输出打印再正常生成"""
+
+    def handle(self, data: Dict[str, Any], context: ExecutionContext = None) -> Result:
+        mode = data.get("mode")
+        if mode == "sleep":
+            deadline = time.time() + float(data.get("seconds", 5))
+            while time.time() < deadline:
+                if context is not None:
+                    context.check_cancelled()
+                time.sleep(0.01)
+        elif mode == "busy":
+            # 不检查取消，只报告进度
+            deadline = time.time() + float(data.get("seconds", 5))
+            done = 0
+            while time.time() < deadline:
+                done += 1
+                if context is not None:
+                    context.report_progress(done)
+                time.sleep(0.01)
+        elif mode == "error":
+            raise RuntimeError("故意失败")
+        elif mode == "blob":
+            return Result(status=ResultStatus.SUCCESS, data="x" * int(data.get("size", 0)))
+        elif mode == "print":
+            print("插件输出")
+        records = list(self.stream(data, context))
+        return Result(status=ResultStatus.SUCCESS, data=records, message=f"生成 {len(records)} 条")
+
+    def stream(self, data: Dict[str, Any], context: ExecutionContext = None):
+        count = int(data.get("count", 1))
+        prefix = data.get("prefix", "row")
+        streams = context_streams(context)
+        ids = context_ids(context, 0, count)
+        for i in range(count):
+            if context is not None and i % 100 == 0:
+                context.check_cancelled()
+                context.report_progress(i, count)
+            yield {"id": ids[i], "name": f"{prefix}-{i}", "score": streams.row(i).randint(0, 100)}
+        return {"count": count}
@@ -0,0 +1,30 @@
+"""
+测试插件 - 导入同目录下的模块
+"""
+from typing import Dict, Any
+
+from data_factory.core.interfaces import (
+    Register, Handler, Module, Widget, WidgetType, Result, ResultStatus, ExecutionContext
+)
+
+import sibling_helpers
+
+
+class SiblingRegister(Register):
+    """导入同目录模块的测试模块"""
+
+    def register(self) -> Module:
+        return Module(
+            handler_class=SiblingHandler,
+            group_name="测试",
+            module_name="同目录模块",
+            widgets=[Widget(name="count", label="条数", widget_type=WidgetType.NUMBER, default_value=1)],
+            action_space="sample",
+            action_name="sibling"
+        )
+
+
+class SiblingHandler(Handler):
+    def handle(self, data: Dict[str, Any], context: ExecutionContext = None) -> Result:
+        return Result(status=ResultStatus.SUCCESS,
+                      data=[sibling_helpers.label(i) for i in range(int(data.get("count", 1)))])
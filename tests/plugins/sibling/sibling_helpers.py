@@ -0,0 +1,7 @@
+"""
+测试插件的同目录模块
+"""
+
+
+def label(index: int) -> str:
+    return f"sibling-{index}"
@@ -0,0 +1,109 @@
+"""
+进度报告和协作式取消测试
+"""
+import threading
+import time
+
+import pytest
+
+from data_factory.core.interfaces import (
+    CancellationToken, ExecutionCancelled, ExecutionContext, ResultStatus
+)
+from data_factory.core.plugin_manager import PluginManager
+
+from tests.conftest import SAMPLE_MODULE
+
+
+def test_token_callbacks():
+    token = CancellationToken()
+    calls = []
+    token.add_callback(lambda: calls.append("a"))
+    removed = lambda: calls.append("removed")
+    token.add_callback(removed)
+    token.remove_callback(removed)
+    token.cancel("第一次")
+    token.cancel("第二次")
+    assert calls == ["a"] and token.reason == "第一次"
+    # 已经取消后注册的回调立即调用
+    token.add_callback(lambda: calls.append("late"))
+    assert calls == ["a", "late"]
+
+
+def test_cancelled_is_not_swallowed_by_except_exception():
+    context = ExecutionContext(cancel_token=CancellationToken())
+    context.cancel_token.cancel("停止")
+
+    def handler():
+        try:
+            context.check_cancelled()
+        except Exception:
+            pytest.fail("取消被当作普通异常捕获")
+
+    with pytest.raises(ExecutionCancelled, match="停止"):
+        handler()
+
+
+def test_context_without_token():
+    context = ExecutionContext()
+    assert not context.cancelled
+    context.check_cancelled()
+    context.report_progress(1, 2)
+
+
+@pytest.fixture
+def manager(plugins_dir):
+    managers = []
+
+    def create(isolation):
+        manager = PluginManager(str(plugins_dir), isolation=isolation, timeout=10)
+        manager.scan_plugins()
+        managers.append(manager)
+        return manager
+
+    yield create
+    for manager in managers:
+        manager.shutdown()
+
+
+def test_in_process_cancel(manager):
+    token = CancellationToken()
+    threading.Timer(0.2, token.cancel, args=("客户端断开",)).start()
+    started = time.time()
+    result = manager("none").execute_module(
+        SAMPLE_MODULE, {"count": 1, "mode": "sleep", "seconds": 10}, ExecutionContext(cancel_token=token)
+    )
+    assert result.error_code == "CANCELLED" and "客户端断开" in result.message
+    assert time.time() - started < 2
+
+
+def test_in_process_progress(manager):
+    reports = []
+    context = ExecutionContext(progress_callback=lambda done, total: reports.append((done, total)))
+    result = manager("none").execute_module(SAMPLE_MODULE, {"count": 250}, context)
+    assert result.status == ResultStatus.SUCCESS
+    assert reports == [(0, 250), (100, 250), (200, 250)]
+
+
+def test_cancelled_stream_stops(manager):
+    token = CancellationToken()
+    stream = manager("none").open_stream(SAMPLE_MODULE, {"count": 1000},
+                                         ExecutionContext(cancel_token=token))
+    rows = []
+    with pytest.raises(ExecutionCancelled):
+        for row in stream:
+            rows.append(row)
+            if len(rows) == 150:
+                token.cancel()
+    assert len(rows) == 200
+
+
+def test_subprocess_is_killed_on_cancel(manager):
+    token = CancellationToken()
+    threading.Timer(0.5, token.cancel, args=("任务已取消",)).start()
+    started = time.time()
+    # busy 模式不检查取消，只能结束子进程
+    result = manager("subprocess").execute_module(
+        SAMPLE_MODULE, {"count": 1, "mode": "busy", "seconds": 10}, ExecutionContext(cancel_token=token)
+    )
+    assert result.error_code == "CANCELLED" and "任务已取消" in result.message
+    assert time.time() - started < 3
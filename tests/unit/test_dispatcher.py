@@ -0,0 +1,147 @@
+"""
+执行调度器测试
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from data_factory.core.dispatcher import ExecutionDispatcher, DispatchRejected
+from data_factory.core.interfaces import ResourceLimits
+
+
+def test_runs_off_event_loop():
+    dispatcher = ExecutionDispatcher(max_workers=2)
+
+    async def main():
+        loop_thread = threading.get_ident()
+        thread = await dispatcher.submit("m", threading.get_ident)
+        assert thread != loop_thread
+
+    try:
+        asyncio.run(main())
+    finally:
+        dispatcher.shutdown()
+
+
+def test_module_concurrency_limit():
+    dispatcher = ExecutionDispatcher(max_workers=8, module_concurrency=2)
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    async def main():
+        await asyncio.gather(*(dispatcher.submit("m", work) for _ in range(6)))
+
+    try:
+        asyncio.run(main())
+    finally:
+        dispatcher.shutdown()
+    assert peak == 2
+    assert dispatcher.stats()["pending"] == 0
+
+
+def test_module_busy_when_module_queue_full():
+    dispatcher = ExecutionDispatcher(max_workers=8, module_concurrency=1, module_queue_depth=1)
+    dispatcher.reserve("m")
+    dispatcher.reserve("m")
+    with pytest.raises(DispatchRejected) as info:
+        dispatcher.reserve("m")
+    assert info.value.error_code == "MODULE_BUSY"
+    # 其他模块不受影响
+    dispatcher.reserve("other")
+
+
+def test_server_busy_when_global_queue_full():
+    dispatcher = ExecutionDispatcher(max_workers=1, module_concurrency=4, max_queue_depth=1)
+    dispatcher.reserve("a")
+    dispatcher.reserve("b")
+    with pytest.raises(DispatchRejected) as info:
+        dispatcher.reserve("c")
+    assert info.value.error_code == "SERVER_BUSY"
+
+
+def test_release_frees_queue():
+    dispatcher = ExecutionDispatcher(max_workers=1, module_concurrency=1, module_queue_depth=0,
+                                     max_queue_depth=0)
+    reservation = dispatcher.reserve("m")
+    with pytest.raises(DispatchRejected):
+        dispatcher.reserve("m")
+    reservation.release()
+    reservation.release()  # 重复归还不重复计数
+    assert dispatcher.stats()["pending"] == 0
+    dispatcher.reserve("m")
+
+
+def test_module_limits_override():
+    dispatcher = ExecutionDispatcher(module_concurrency=4, module_queue_depth=0, module_limits={"m": 1})
+    dispatcher.reserve("m")
+    with pytest.raises(DispatchRejected):
+        dispatcher.reserve("m")
+
+
+def test_memory_budget_admission():
+    budgets = {"big": ResourceLimits(max_memory_bytes=60), "small": ResourceLimits(max_memory_bytes=30)}
+    dispatcher = ExecutionDispatcher(module_concurrency=4, memory_budget=100,
+                                     resolve_limits=budgets.get)
+
+    async def main():
+        first = dispatcher.reserve("big")
+        await first.acquire()
+        assert dispatcher.stats()["memory_reserved"] == 60
+
+        # 预算不足的请求排队，放得下的请求不被它阻塞
+        second = dispatcher.reserve("big")
+        waiting = asyncio.ensure_future(second.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiting.done() and dispatcher.stats()["memory_waiting"] == 1
+        small = dispatcher.reserve("small")
+        await asyncio.wait_for(small.acquire(), 1)
+        assert dispatcher.stats()["memory_reserved"] == 90
+
+        first.release()
+        await asyncio.wait_for(waiting, 1)
+        assert dispatcher.stats()["memory_reserved"] == 90
+        second.release()
+        small.release()
+        assert dispatcher.stats()["memory_reserved"] == 0
+
+    asyncio.run(main())
+
+
+def test_memory_budget_cancelled_waiter():
+    dispatcher = ExecutionDispatcher(memory_budget=100,
+                                     resolve_limits=lambda _: ResourceLimits(max_memory_bytes=80))
+
+    async def main():
+        first = dispatcher.reserve("m")
+        await first.acquire()
+        second = dispatcher.reserve("m")
+        waiting = asyncio.ensure_future(second.acquire())
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        second.release()
+        assert dispatcher.stats()["memory_waiting"] == 0
+        first.release()
+        assert dispatcher.stats()["memory_reserved"] == 0
+        assert dispatcher.stats()["pending"] == 0
+
+    asyncio.run(main())
+
+
+def test_memory_larger_than_budget_runs_alone():
+    dispatcher = ExecutionDispatcher(memory_budget=100,
+                                     resolve_limits=lambda _: ResourceLimits(max_memory_bytes=500))
+    assert dispatcher._budget("m")[1] == 100
@@ -0,0 +1,133 @@
+"""
+流式输出和表格导出测试
+"""
+import csv
+import io
+import json
+
+import pytest
+
+from data_factory.core.export import TableEncoder, check_format, export_stream, pa, pq
+from data_factory.core.streaming import RecordStream, StreamEncoder
+
+requires_pyarrow = pytest.mark.skipif(pa is None, reason="需要安装 pyarrow")
+
+
+def records(count=25, fail_at=None):
+    for i in range(count):
+        if i == fail_at:
+            raise RuntimeError("生成失败")
+        yield {"id": i, "name": f"用户{i}", "active": i % 2 == 0, "score": i * 1.5,
+               "tags": ["a", "b"][: i % 3], "address": {"city": "上海", "zip": f"{i:06d}"}}
+    return {"count": count}
+
+
+def encode(encoder):
+    chunks = []
+    while not encoder.done:
+        chunks.append(encoder.next_chunk())
+    return b"".join(chunks)
+
+
+def expected_rows(count=25):
+    return list(records(count))
+
+
+def test_ndjson_rows_and_trailer():
+    body = encode(StreamEncoder(RecordStream(records()), "ndjson", chunk_size=10))
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert lines[:-1] == expected_rows()
+    trailer = lines[-1]["_trailer"]
+    assert trailer["status"] == "success" and trailer["total_count"] == 25
+    assert trailer["summary"] == {"count": 25}
+
+
+def test_ndjson_error_mid_stream():
+    body = encode(StreamEncoder(RecordStream(records(fail_at=15)), "ndjson", chunk_size=10))
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert lines[:-1] == expected_rows()[:15]
+    trailer = lines[-1]["_trailer"]
+    assert trailer["status"] == "error" and "生成失败" in trailer["message"]
+    assert trailer["total_count"] == 15
+
+
+def test_json_stream_document():
+    body = json.loads(encode(StreamEncoder(RecordStream(records()), "json-stream", chunk_size=10)))
+    assert body["data"] == expected_rows() and body["_trailer"]["summary"] == {"count": 25}
+
+
+def test_csv_round_trip():
+    body = encode(TableEncoder(RecordStream(records()), "csv", chunk_size=10)).decode("utf-8")
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert len(rows) == 25
+    for row, expected in zip(rows, expected_rows()):
+        assert int(row["id"]) == expected["id"] and row["name"] == expected["name"]
+        assert row["active"] == ("true" if expected["active"] else "false")
+        assert float(row["score"]) == expected["score"]
+        assert json.loads(row["tags"]) == expected["tags"]
+        assert json.loads(row["address"]) == expected["address"]
+
+
+@requires_pyarrow
+def test_parquet_round_trip_with_summary():
+    body = encode(TableEncoder(RecordStream(records()), "parquet", chunk_size=10))
+    table = pq.read_table(io.BytesIO(body))
+    assert table.to_pylist() == expected_rows()
+    metadata = pq.ParquetFile(io.BytesIO(body)).metadata.metadata
+    assert json.loads(metadata[b"data_factory.summary"]) == {"count": 25}
+
+
+@requires_pyarrow
+def test_arrow_round_trip():
+    body = encode(TableEncoder(RecordStream(records()), "arrow", chunk_size=10))
+    assert pa.ipc.open_stream(body).read_all().to_pylist() == expected_rows()
+
+
+@requires_pyarrow
+def test_empty_stream():
+    assert encode(TableEncoder(RecordStream(records(0)), "csv")) == b""
+    table = pq.read_table(io.BytesIO(encode(TableEncoder(RecordStream(records(0)), "parquet"))))
+    assert table.num_rows == 0
+
+
+@pytest.mark.parametrize("fmt", ["csv", pytest.param("parquet", marks=requires_pyarrow),
+                                 pytest.param("arrow", marks=requires_pyarrow)])
+def test_error_mid_stream_raises(fmt):
+    encoder = TableEncoder(RecordStream(records(fail_at=15)), fmt, chunk_size=10)
+    body = encoder.next_chunk()
+    with pytest.raises(RuntimeError, match="生成失败"):
+        encoder.next_chunk()
+    if fmt == "parquet":
+        # 没有写入文件尾，不会被当作完整的文件读取
+        with pytest.raises(pa.ArrowInvalid):
+            pq.read_table(io.BytesIO(body))
+
+
+@requires_pyarrow
+def test_inconsistent_records_are_rejected():
+    def mixed():
+        yield {"id": 1}
+        yield {"id": "not a number"}
+
+    encoder = TableEncoder(RecordStream(mixed()), "arrow", chunk_size=1)
+    encoder.next_chunk()
+    with pytest.raises(ValueError):
+        encoder.next_chunk()
+
+
+@pytest.mark.parametrize("fmt", ["csv", pytest.param("parquet", marks=requires_pyarrow)])
+def test_export_stream_to_file(tmp_path, fmt):
+    path = tmp_path / "out" / f"users.{fmt}"
+    info = export_stream(RecordStream(records()), fmt, path, chunk_size=10)
+    assert info["total_count"] == 25 and info["size"] == path.stat().st_size
+    assert info["summary"] == {"count": 25}
+
+    failed = tmp_path / "out" / f"failed.{fmt}"
+    with pytest.raises(RuntimeError):
+        export_stream(RecordStream(records(fail_at=15)), fmt, failed, chunk_size=10)
+    assert sorted(p.name for p in path.parent.iterdir()) == [path.name]
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        check_format("xlsx")
@@ -0,0 +1,137 @@
+"""
+处理器实例缓存测试
+"""
+import threading
+
+from data_factory.core.handler_cache import HandlerCache
+from data_factory.core.interfaces import Handler, Result, ResultStatus, ThreadSafety
+from data_factory.core.plugin_manager import PluginManager
+
+from tests.conftest import SAMPLE_MODULE
+
+
+class Tracked(Handler):
+    setups = 0
+    teardowns = 0
+
+    def setup(self):
+        type(self).setups += 1
+
+    def teardown(self):
+        type(self).teardowns += 1
+
+    def handle(self, data, context=None):
+        return Result(status=ResultStatus.SUCCESS, data=id(self))
+
+
+class SharedHandler(Tracked):
+    thread_safety = ThreadSafety.SHARED
+
+
+class ThreadHandler(Tracked):
+    thread_safety = ThreadSafety.PER_THREAD
+
+
+class RequestHandler(Tracked):
+    thread_safety = ThreadSafety.PER_REQUEST
+
+
+def reset(*classes):
+    for cls in classes:
+        cls.setups = cls.teardowns = 0
+
+
+def in_thread(func):
+    box = []
+    thread = threading.Thread(target=lambda: box.append(func()))
+    thread.start()
+    thread.join()
+    return box[0]
+
+
+def test_shared_instance_is_reused():
+    reset(SharedHandler)
+    cache = HandlerCache()
+    first = cache.acquire("k", SharedHandler)
+    assert cache.acquire("k", SharedHandler) is first
+    assert in_thread(lambda: cache.acquire("k", SharedHandler)) is first
+    assert SharedHandler.setups == 1
+
+
+def test_per_request_instance_is_disposed_on_release():
+    reset(RequestHandler)
+    cache = HandlerCache()
+    handler = cache.acquire("k", RequestHandler)
+    assert cache.acquire("k", RequestHandler) is not handler
+    cache.release("k", handler)
+    assert RequestHandler.teardowns == 1
+
+
+def test_per_thread_instances_are_separate():
+    reset(ThreadHandler)
+    cache = HandlerCache()
+    mine = cache.acquire("k", ThreadHandler)
+    assert cache.acquire("k", ThreadHandler) is mine
+    assert in_thread(lambda: cache.acquire("k", ThreadHandler)) is not mine
+
+
+def test_finished_thread_instances_are_pruned():
+    reset(ThreadHandler)
+    cache = HandlerCache()
+    for _ in range(5):
+        in_thread(lambda: cache.acquire("k", ThreadHandler))
+    # 每次新建实例前清理已结束线程的实例，最多保留最后一个线程的
+    assert cache.stats()["per_thread"] <= 1
+    cache.prune()
+    assert cache.stats() == {"shared": 0, "per_thread": 0, "threads": 0}
+    assert ThreadHandler.setups == ThreadHandler.teardowns == 5
+
+
+def test_new_thread_never_gets_finished_thread_instance():
+    reset(ThreadHandler)
+    cache = HandlerCache()
+    seen = set()
+    for _ in range(20):
+        # 线程ID会被复用，实例按线程对象区分
+        handler = in_thread(lambda: cache.acquire("k", ThreadHandler))
+        assert handler not in seen
+        seen.add(handler)
+    assert len(seen) == 20
+
+
+def test_evict_and_clear_dispose_instances():
+    reset(SharedHandler, ThreadHandler)
+    cache = HandlerCache()
+    cache.acquire("a", SharedHandler)
+    cache.acquire("a", ThreadHandler)
+    cache.acquire("b", SharedHandler)
+    cache.evict("a")
+    assert SharedHandler.teardowns == 1 and ThreadHandler.teardowns == 1
+    cache.clear()
+    assert SharedHandler.teardowns == 2
+    assert cache.stats()["shared"] == 0
+
+
+def test_stale_class_is_replaced():
+    reset(ThreadHandler)
+
+    class Reloaded(ThreadHandler):
+        pass
+
+    cache = HandlerCache()
+    old = cache.acquire("k", ThreadHandler)
+    new = cache.acquire("k", Reloaded)
+    assert new is not old and type(new) is Reloaded
+    assert ThreadHandler.teardowns == 1
+
+
+def test_batch_does_not_accumulate_thread_instances(plugins_dir, monkeypatch):
+    manager = PluginManager(str(plugins_dir), isolation="none")
+    manager.scan_plugins()
+    handler_class = manager.resolve_handler_class(SAMPLE_MODULE)
+    monkeypatch.setattr(handler_class, "thread_safety", ThreadSafety.PER_THREAD)
+    for _ in range(3):
+        results = manager.execute_batch(SAMPLE_MODULE, [{"count": 1}] * 8, parallelism=4)
+        assert all(r.status == ResultStatus.SUCCESS for r in results)
+    assert manager.handlers.stats()["per_thread"] == 0
+    manager.shutdown()
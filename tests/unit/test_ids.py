@@ -0,0 +1,130 @@
+"""
+ID生成测试
+"""
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from data_factory.core import ids as ids_module
+from data_factory.core.ids import (
+    BusinessNumber, FileSequenceStore, Sequence, Snowflake, MAX_NODE_ID, MAX_PROCESS_ID,
+    acquire_process_id, configure_process, context_ids, decode_id, fcntl, get_snowflake
+)
+from data_factory.core.interfaces import ExecutionContext
+from data_factory.core.plugin_manager import PluginManager
+from data_factory.core.rng import SEEDED_EPOCH
+
+from tests.conftest import SAMPLE_MODULE
+
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    """切换到 UTC+8 时区"""
+    if not hasattr(time, "tzset"):
+        pytest.skip("当前平台不能切换时区")
+    monkeypatch.setenv("TZ", "Asia/Shanghai")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_business_number_uses_utc(local_timezone):
+    # 2023-12-31 20:00 UTC，在 UTC+8 已经是 2024-01-01
+    timestamp = SEEDED_EPOCH - 4 * 3600
+    number = BusinessNumber("ORD{time:%Y%m%d%H}{seq:04d}")
+    assert number.format([1, 2], timestamp) == ["ORD20231231200001", "ORD20231231200002"]
+
+
+def test_seeded_ids_are_reproducible_and_shardable():
+    context = ExecutionContext(seed=42, reference_time=SEEDED_EPOCH)
+    ids = context_ids(context, 0, 100)
+    assert ids == context_ids(ExecutionContext(seed=42, reference_time=SEEDED_EPOCH), 0, 100)
+    assert ids == context_ids(context, 0, 40) + context_ids(context, 40, 60)
+    assert ids == sorted(ids) and len(set(ids)) == 100
+
+
+def test_different_seeds_give_disjoint_ids():
+    seen = set()
+    for seed in range(200):
+        ids = context_ids(ExecutionContext(seed=seed, reference_time=SEEDED_EPOCH), 0, 500)
+        assert seen.isdisjoint(ids)
+        seen.update(ids)
+
+
+def test_seeded_ids_use_derived_worker_bits():
+    workers = {decode_id(context_ids(ExecutionContext(seed=seed), 0, 1)[0])["node_id"]
+               for seed in range(50)}
+    assert len(workers) > 1
+
+
+def test_batch_items_get_disjoint_ids(plugins_dir):
+    manager = PluginManager(str(plugins_dir), isolation="none")
+    manager.scan_plugins()
+    context = ExecutionContext(seed=1, reference_time=SEEDED_EPOCH)
+    results = manager.execute_batch(SAMPLE_MODULE, [{"count": 50}] * 4, context)
+    ids = [record["id"] for result in results for record in result.data]
+    assert len(ids) == 200 and len(set(ids)) == 200
+
+
+def test_snowflake_ids_are_unique_across_threads():
+    generator = Snowflake(1, 2)
+    with ThreadPoolExecutor(8) as executor:
+        chunks = list(executor.map(generator.next_ids, [500] * 16))
+    ids = [i for chunk in chunks for i in chunk]
+    assert len(set(ids)) == len(ids) == 8000
+    assert all(decode_id(i)["node_id"] == 1 and decode_id(i)["process_id"] == 2 for i in ids)
+
+
+def test_snowflake_rejects_out_of_range_ids():
+    with pytest.raises(ValueError):
+        Snowflake(0, MAX_PROCESS_ID + 1)
+    with pytest.raises(ValueError):
+        Snowflake(MAX_NODE_ID + 1, 0)
+    with pytest.raises(ValueError):
+        configure_process(-1)
+
+
+@pytest.mark.skipif(fcntl is None, reason="需要 flock")
+def test_process_ids_are_unique_and_overflow_raises(tmp_path):
+    held = [acquire_process_id(tmp_path) for _ in range(MAX_PROCESS_ID + 1)]
+    assert sorted(process_id for process_id, _ in held) == list(range(MAX_PROCESS_ID + 1))
+    with pytest.raises(RuntimeError):
+        acquire_process_id(tmp_path)
+    # 释放后号码可以被复用
+    held[5][1].close()
+    assert acquire_process_id(tmp_path)[0] == 5
+
+
+def _child_process_id(queue):
+    queue.put(get_snowflake().process_id)
+
+
+@pytest.mark.skipif(fcntl is None, reason="需要 flock")
+def test_processes_get_distinct_process_ids(monkeypatch):
+    # 当前进程在本测试的状态目录中重新分配进程号
+    monkeypatch.setattr(ids_module, "_process_id", None)
+    monkeypatch.setattr(ids_module, "_snowflake", None)
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    children = [ctx.Process(target=_child_process_id, args=(queue,)) for _ in range(3)]
+    mine = get_snowflake().process_id
+    # 子进程同时持有进程号：先全部启动，等全部结果返回后才结束
+    for child in children:
+        child.start()
+    ids = [queue.get(timeout=60) for _ in children]
+    for child in children:
+        child.join()
+    assert len(set(ids)) == 3
+    assert mine not in ids
+
+
+def test_sequence_blocks_do_not_overlap(tmp_path):
+    store = FileSequenceStore(tmp_path)
+    first = Sequence("order", store, block_size=10)
+    second = Sequence("order", FileSequenceStore(tmp_path), block_size=10)
+    values = [first.next() for _ in range(15)] + [second.next() for _ in range(15)]
+    values += list(first.take(30))
+    assert len(set(values)) == len(values)
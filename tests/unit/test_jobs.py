@@ -0,0 +1,264 @@
+"""
+后台任务测试
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from data_factory.core.dispatcher import ExecutionDispatcher
+from data_factory.core.jobs import (
+    Job, JobManager, JobRejected, JobStore, QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED
+)
+from data_factory.core.plugin_manager import PluginManager
+
+from tests.conftest import LIMITED_MODULE, SAMPLE_MODULE
+
+
+def wait_finished(jobs, job_id, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = jobs.get(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"任务未结束: {jobs.get(job_id)}")
+
+
+def make_job(job_id, status=QUEUED, created_at=None, **values):
+    return Job(id=job_id, module_id="m", data={"n": 1, "text": "中文"}, format="json", seed=None,
+               status=status, created_at=created_at or time.time(), **values)
+
+
+@pytest.fixture
+def manager(plugins_dir):
+    manager = PluginManager(str(plugins_dir), isolation="none")
+    manager.scan_plugins()
+    yield manager
+    manager.shutdown()
+
+
+@pytest.fixture
+def jobs(manager, tmp_path):
+    jobs = JobManager(manager, str(tmp_path / "jobs"), workers=2, progress_interval=0)
+    jobs.start()
+    yield jobs
+    jobs.stop()
+
+
+def test_store_round_trip(tmp_path):
+    store = JobStore(tmp_path / "jobs.db")
+    store.insert(make_job("a", created_at=1))
+    store.insert(make_job("b", created_at=2))
+    assert store.get("a").data == {"n": 1, "text": "中文"}
+    assert [job.id for job in store.list()] == ["b", "a"]
+    assert store.queued_ids() == ["a", "b"]
+    assert store.get("missing") is None
+
+
+def test_store_conditional_update(tmp_path):
+    store = JobStore(tmp_path / "jobs.db")
+    store.insert(make_job("a"))
+    assert store.update("a", expected=QUEUED, status=RUNNING)
+    assert not store.update("a", expected=QUEUED, status=CANCELLED)
+    assert store.get("a").status == RUNNING
+    assert store.requeue_running() == 1
+    assert store.get("a").status == QUEUED
+
+
+def test_store_expired_and_delete(tmp_path):
+    store = JobStore(tmp_path / "jobs.db")
+    store.insert(make_job("old", status=SUCCEEDED, finished_at=100))
+    store.insert(make_job("new", status=SUCCEEDED, finished_at=time.time()))
+    store.insert(make_job("queued"))
+    assert [job.id for job in store.expired(1000)] == ["old"]
+    store.delete("old")
+    assert store.get("old") is None
+
+
+def test_stream_job_writes_ndjson(jobs):
+    job = jobs.submit(SAMPLE_MODULE, {"count": 250, "prefix": "row"}, seed=1)
+    assert job.format == "ndjson" and job.status == QUEUED
+    done = wait_finished(jobs, job.id)
+    assert done.status == SUCCEEDED, done.message
+    assert done.progress == 250 and done.total == 250
+    lines = open(done.result_path, encoding="utf-8").read().splitlines()
+    # 最后一行为结尾的汇总信息
+    assert len(lines) == 251 and json.loads(lines[0])["name"] == "row-0"
+    trailer = json.loads(lines[-1])["_trailer"]
+    assert trailer["total_count"] == 250 and trailer["summary"] == {"count": 250}
+    assert done.result_size > 0
+
+
+def test_json_job_writes_envelope(jobs):
+    job = jobs.submit(SAMPLE_MODULE, {"count": 3}, fmt="json", seed=1)
+    done = wait_finished(jobs, job.id)
+    assert done.status == SUCCEEDED
+    envelope = json.load(open(done.result_path, encoding="utf-8"))
+    assert envelope["status"] == "success" and len(envelope["data"]) == 3
+
+
+def test_failed_job(jobs):
+    job = jobs.submit(SAMPLE_MODULE, {"count": 1, "mode": "error"}, fmt="json")
+    done = wait_finished(jobs, job.id)
+    assert done.status == FAILED and "故意失败" in done.message
+    assert done.result_path is None
+
+
+def test_cancel_running_job(jobs):
+    job = jobs.submit(SAMPLE_MODULE, {"count": 1, "mode": "sleep", "seconds": 10}, fmt="json")
+    deadline = time.time() + 5
+    while jobs.get(job.id).status != RUNNING and time.time() < deadline:
+        time.sleep(0.02)
+    jobs.cancel(job.id)
+    done = wait_finished(jobs, job.id)
+    assert done.status == CANCELLED
+    assert not list(jobs.results_dir.iterdir())
+
+
+def test_cancel_queued_job(manager, tmp_path):
+    jobs = JobManager(manager, str(tmp_path / "jobs"))
+    job = jobs.submit(SAMPLE_MODULE, {"count": 1})
+    assert jobs.cancel(job.id).status == CANCELLED
+    jobs.start()
+    try:
+        time.sleep(0.1)
+        assert jobs.get(job.id).status == CANCELLED
+    finally:
+        jobs.stop()
+
+
+def test_rejections(jobs):
+    with pytest.raises(JobRejected) as info:
+        jobs.submit("missing", {})
+    assert info.value.error_code == "MODULE_NOT_FOUND"
+    with pytest.raises(JobRejected) as info:
+        jobs.submit(SAMPLE_MODULE, {}, fmt="xml")
+    assert info.value.error_code == "UNSUPPORTED_FORMAT"
+
+
+def test_interrupted_jobs_are_requeued_on_start(manager, tmp_path):
+    directory = tmp_path / "jobs"
+    store = JobStore(directory / "jobs.db")
+    interrupted = make_job("x", status=RUNNING)
+    interrupted.module_id, interrupted.data = SAMPLE_MODULE, {"count": 2}
+    store.insert(interrupted)
+    jobs = JobManager(manager, str(directory))
+    jobs.start()
+    try:
+        assert wait_finished(jobs, "x").status == SUCCEEDED
+    finally:
+        jobs.stop()
+
+
+def test_expired_jobs_are_purged(manager, tmp_path):
+    jobs = JobManager(manager, str(tmp_path / "jobs"), ttl=60)
+    jobs.start()
+    try:
+        job = wait_finished(jobs, jobs.submit(SAMPLE_MODULE, {"count": 1}).id)
+        jobs.store.update(job.id, finished_at=time.time() - 120)
+        jobs._purge_expired()
+        assert jobs.get(job.id) is None
+        assert not list(jobs.results_dir.iterdir())
+    finally:
+        jobs.stop()
+
+
+def test_delete_only_finished_jobs(jobs):
+    job = jobs.submit(SAMPLE_MODULE, {"count": 1})
+    done = wait_finished(jobs, job.id)
+    assert jobs.delete(done.id)
+    assert jobs.get(done.id) is None
+    assert not jobs.delete(done.id)
+
+
+@pytest.fixture
+def loop():
+    """在后台线程中运行的事件循环（调度器所在的循环）"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def hold_slot(loop, dispatcher, module_id):
+    async def acquire():
+        reservation = dispatcher.reserve(module_id)
+        await reservation.acquire()
+        return reservation
+    return asyncio.run_coroutine_threadsafe(acquire(), loop).result(5)
+
+
+def test_jobs_wait_for_dispatcher_slot(manager, tmp_path, loop):
+    dispatcher = ExecutionDispatcher(module_concurrency=1)
+    jobs = JobManager(manager, str(tmp_path / "jobs"), dispatcher=dispatcher)
+    jobs.start(loop)
+    try:
+        held = hold_slot(loop, dispatcher, SAMPLE_MODULE)
+        job = jobs.submit(SAMPLE_MODULE, {"count": 3}, fmt="json")
+        time.sleep(0.3)
+        assert jobs.get(job.id).status == RUNNING
+        assert dispatcher.stats()["modules"][SAMPLE_MODULE]["pending"] == 2
+
+        loop.call_soon_threadsafe(held.release)
+        assert wait_finished(jobs, job.id).status == SUCCEEDED
+        time.sleep(0.05)
+        assert dispatcher.stats()["pending"] == 0
+    finally:
+        jobs.stop()
+        dispatcher.shutdown()
+
+
+def test_cancel_job_waiting_for_slot(manager, tmp_path, loop):
+    dispatcher = ExecutionDispatcher(module_concurrency=1)
+    jobs = JobManager(manager, str(tmp_path / "jobs"), dispatcher=dispatcher)
+    jobs.start(loop)
+    try:
+        held = hold_slot(loop, dispatcher, SAMPLE_MODULE)
+        job = jobs.submit(SAMPLE_MODULE, {"count": 3}, fmt="json")
+        time.sleep(0.2)
+        jobs.cancel(job.id)
+        assert wait_finished(jobs, job.id).status == CANCELLED
+        time.sleep(0.3)
+        # 排队中的名额已归还
+        assert dispatcher.stats()["pending"] == 1
+        loop.call_soon_threadsafe(held.release)
+    finally:
+        jobs.stop()
+        dispatcher.shutdown()
+
+
+def test_jobs_retry_when_dispatcher_busy(manager, tmp_path, loop):
+    dispatcher = ExecutionDispatcher(max_workers=1, module_concurrency=1, module_queue_depth=0,
+                                     max_queue_depth=0)
+    jobs = JobManager(manager, str(tmp_path / "jobs"), dispatcher=dispatcher)
+    jobs.start(loop)
+    try:
+        held = hold_slot(loop, dispatcher, SAMPLE_MODULE)
+        job = jobs.submit(SAMPLE_MODULE, {"count": 3}, fmt="json")
+        time.sleep(0.3)
+        assert jobs.get(job.id).status == RUNNING
+        loop.call_soon_threadsafe(held.release)
+        assert wait_finished(jobs, job.id).status == SUCCEEDED
+    finally:
+        jobs.stop()
+        dispatcher.shutdown()
+
+
+def test_limited_module_job_runs_isolated(jobs):
+    job = jobs.submit(LIMITED_MODULE, {"count": 2})
+    assert job.format == "json"
+    with pytest.raises(JobRejected) as info:
+        jobs.submit(LIMITED_MODULE, {"count": 2}, fmt="ndjson")
+    assert info.value.error_code == "STREAM_NOT_SUPPORTED"
+    done = wait_finished(jobs, job.id)
+    assert done.status == SUCCEEDED
+    with open(done.result_path, encoding="utf-8") as f:
+        rows = json.load(f)["data"]
+    assert all(row["pid"] != os.getpid() for row in rows)
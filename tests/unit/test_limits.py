@@ -0,0 +1,54 @@
+"""
+资源限制测试
+"""
+import os
+
+import pytest
+
+from data_factory.core.interfaces import ResourceLimits
+from data_factory.core.limits import LimitExceeded, ROWS_LIMIT_EXCEEDED, check, requires_process
+from data_factory.core.plugin_manager import PluginManager
+
+from tests.conftest import LIMITED_MODULE, SAMPLE_MODULE
+
+
+@pytest.fixture
+def manager(plugins_dir):
+    manager = PluginManager(str(plugins_dir), isolation="none")
+    manager.scan_plugins()
+    yield manager
+    manager.shutdown()
+
+
+def test_requires_process():
+    assert not requires_process(None)
+    assert not requires_process(ResourceLimits(max_rows=10, max_output_bytes=100, max_concurrency=1))
+    assert requires_process(ResourceLimits(max_cpu_seconds=1))
+    assert requires_process(ResourceLimits(max_memory_bytes=1024))
+
+
+def test_check_rows():
+    check(ResourceLimits(max_rows=2), rows=2)
+    with pytest.raises(LimitExceeded) as info:
+        check(ResourceLimits(max_rows=2), rows=3)
+    assert info.value.error_code == ROWS_LIMIT_EXCEEDED
+
+
+def test_limited_module_runs_in_subprocess(manager):
+    result = manager.execute_module(LIMITED_MODULE, {"count": 2})
+    assert result.status.value == "success"
+    assert [row["pid"] for row in result.data] != [os.getpid()] * 2
+    # 没有声明CPU时间和内存限制的模块仍在进程内执行
+    assert manager.execute_module(SAMPLE_MODULE, {"count": 1}).status.value == "success"
+
+
+def test_limited_module_batch_runs_in_subprocess(manager):
+    results = list(manager.iter_batch(LIMITED_MODULE, [{"count": 1}, {"count": 1}]))
+    assert all(result.data[0]["pid"] != os.getpid() for result in results)
+
+
+def test_limited_module_cannot_stream(manager):
+    assert manager.supports_streaming(SAMPLE_MODULE)
+    assert not manager.supports_streaming(LIMITED_MODULE)
+    with pytest.raises(ValueError):
+        manager.open_stream(LIMITED_MODULE, {"count": 1})
@@ -0,0 +1,123 @@
+"""
+性能剖析测试
+"""
+import pstats
+
+import pytest
+
+from data_factory.core.interfaces import ExecutionContext
+from data_factory.core.plugin_manager import PluginManager
+from data_factory.core.profiling import ProfileRecord, ProfileStore, Profiler, parse_mode
+
+from tests.conftest import SAMPLE_MODULE
+
+
+def make_record(index, module_id="m", request_id=None):
+    return ProfileRecord(id=str(index), module_id=module_id, mode="sample", trigger="request",
+                         created_at=float(index), duration=0.0, request_id=request_id)
+
+
+def test_store_is_bounded():
+    store = ProfileStore(capacity=3)
+    for i in range(10):
+        store.add(make_record(i))
+    assert [record.id for record in store.list()] == ["9", "8", "7"]
+    assert store.get("0") is None and store.get("9") is not None
+    store.clear()
+    assert store.list() == []
+
+
+def test_store_find_latest_and_filter():
+    store = ProfileStore(capacity=10)
+    store.add(make_record(1, "a", request_id="r"))
+    store.add(make_record(2, "b", request_id="r"))
+    store.add(make_record(3, "a"))
+    assert store.find("r").id == "2"
+    assert store.find("missing") is None
+    assert [record.id for record in store.list("a")] == ["3", "1"]
+
+
+def test_parse_mode():
+    assert parse_mode("1") == parse_mode(" TRUE ") == "cprofile"
+    assert parse_mode("sample") == "sample"
+    with pytest.raises(ValueError):
+        parse_mode("perf")
+
+
+def test_sampling_toggle():
+    profiler = Profiler()
+    context = ExecutionContext()
+    profiler.attach("m", context)
+    assert context.profile is None and context.profile_callback is None
+
+    profiler.set_rate(None, 1.0, "cprofile")
+    profiler.set_rate("m", 1.0)
+    context = ExecutionContext()
+    profiler.attach("m", context)
+    # 模块的设置优先于全局设置
+    assert context.profile == "sample" and context.profile_callback is not None
+    context = ExecutionContext()
+    profiler.attach("other", context)
+    assert context.profile == "cprofile"
+
+    profiler.set_rate("m", 0)
+    profiler.set_rate(None, 0)
+    assert profiler.rates() == []
+    context = ExecutionContext()
+    profiler.attach("m", context)
+    assert context.profile is None and context.profile_callback is None
+
+
+def test_invalid_rate():
+    profiler = Profiler()
+    with pytest.raises(ValueError):
+        profiler.set_rate(None, 1.5)
+    with pytest.raises(ValueError):
+        profiler.set_rate(None, 0.5, "perf")
+
+
+def test_request_profile_ignores_rate():
+    profiler = Profiler()
+    context = ExecutionContext(profile="cprofile", request_id="r")
+    profiler.attach("m", context)
+    context.report_profile({"mode": "cprofile", "duration": 0.1, "top": [{"function": "f"}]})
+    record = profiler.store.find("r")
+    assert record.trigger == "request" and record.module_id == "m" and record.top == [{"function": "f"}]
+
+
+@pytest.mark.parametrize("isolation", ["none", "subprocess", "pool"])
+def test_profiled_execution(plugins_dir, tmp_path, isolation):
+    profiler = Profiler(capacity=2)
+    manager = PluginManager(str(plugins_dir), isolation=isolation, pool_size=1, timeout=10, profiler=profiler)
+    manager.scan_plugins()
+    try:
+        for i in range(3):
+            context = ExecutionContext(profile="cprofile", request_id=f"r{i}")
+            assert manager.execute_module(SAMPLE_MODULE, {"count": 500}, context).status.value == "success"
+        # 只保留最近两次
+        assert [record.request_id for record in profiler.store.list()] == ["r2", "r1"]
+        record = profiler.store.find("r2")
+        assert record.mode == "cprofile" and record.formats == ["pstats"] and record.top
+        path = tmp_path / "r2.pstats"
+        path.write_bytes(record.pstats)
+        stats = pstats.Stats(str(path))
+        assert any(name == "stream" for (_, _, name) in stats.stats)
+
+        # 不剖析的执行不产生记录
+        manager.execute_module(SAMPLE_MODULE, {"count": 1}, ExecutionContext(request_id="plain"))
+        assert profiler.store.find("plain") is None
+    finally:
+        manager.shutdown()
+
+
+def test_sample_mode_collects_collapsed_stacks(plugins_dir):
+    profiler = Profiler()
+    manager = PluginManager(str(plugins_dir), isolation="none", profiler=profiler)
+    manager.scan_plugins()
+    context = ExecutionContext(profile="sample", request_id="r")
+    manager.execute_module(SAMPLE_MODULE, {"count": 1, "mode": "sleep", "seconds": 0.2}, context)
+    record = profiler.store.find("r")
+    assert record.mode == "sample" and record.formats == ["collapsed"]
+    lines = record.collapsed.splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("handle (main.py" in line for line in lines)
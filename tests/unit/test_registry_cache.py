@@ -0,0 +1,74 @@
+"""
+插件注册快照测试
+"""
+import os
+
+from data_factory.core.plugin_manager import PluginManager
+from data_factory.core.registry_cache import SNAPSHOT_FILE, RegistrySnapshot
+
+from tests.conftest import SAMPLE_MODULE
+
+
+def lazy_manager(plugins_dir):
+    manager = PluginManager(str(plugins_dir), isolation="none", lazy_discovery=True)
+    manager.scan_plugins()
+    return manager
+
+
+def test_valid_snapshot_skips_import(plugins_dir):
+    first = lazy_manager(plugins_dir)
+    assert first.get_plugin(SAMPLE_MODULE).imported
+    assert (plugins_dir / SNAPSHOT_FILE).exists()
+
+    second = lazy_manager(plugins_dir)
+    plugin = second.get_plugin(SAMPLE_MODULE)
+    assert not plugin.imported
+    assert second.get_module(SAMPLE_MODULE).module_name == "测试数据"
+    assert second.find_route("sample", "generate") == SAMPLE_MODULE
+    # 首次在进程内执行时才导入
+    assert second.execute_module(SAMPLE_MODULE, {"count": 2}).status.value == "success"
+    assert plugin.imported
+
+
+def test_touched_file_with_same_content_still_hits(plugins_dir):
+    lazy_manager(plugins_dir)
+    main_file = plugins_dir / "sample" / "main.py"
+    stat = main_file.stat()
+    os.utime(main_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not lazy_manager(plugins_dir).get_plugin(SAMPLE_MODULE).imported
+
+
+def test_changed_plugin_is_reimported(plugins_dir):
+    lazy_manager(plugins_dir)
+    main_file = plugins_dir / "sample" / "main.py"
+    main_file.write_text(main_file.read_text(encoding="utf-8").replace(
+        'module_name="测试数据"', 'module_name="新的测试数据"'
+    ), encoding="utf-8")
+
+    manager = lazy_manager(plugins_dir)
+    assert manager.get_plugin(SAMPLE_MODULE).imported
+    assert manager.get_module(SAMPLE_MODULE).module_name == "新的测试数据"
+    # 快照已经更新
+    assert not lazy_manager(plugins_dir).get_plugin(SAMPLE_MODULE).imported
+
+
+def test_same_size_edit_is_detected_by_hash(plugins_dir):
+    lazy_manager(plugins_dir)
+    main_file = plugins_dir / "sample" / "main.py"
+    stat = main_file.stat()
+    main_file.write_text(main_file.read_text(encoding="utf-8").replace(
+        'module_name="测试数据"', 'module_name="测试数组"'
+    ), encoding="utf-8")
+    assert main_file.stat().st_size == stat.st_size
+    os.utime(main_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    manager = lazy_manager(plugins_dir)
+    assert manager.get_module(SAMPLE_MODULE).module_name == "测试数组"
+
+
+def test_corrupt_snapshot_is_ignored(plugins_dir):
+    (plugins_dir / SNAPSHOT_FILE).write_text("{not json", encoding="utf-8")
+    manager = lazy_manager(plugins_dir)
+    assert manager.get_plugin(SAMPLE_MODULE).imported
+    assert RegistrySnapshot(plugins_dir / SNAPSHOT_FILE).lookup(
+        "sample", plugins_dir / "sample" / "main.py"
+    ) is not None
@@ -0,0 +1,118 @@
+"""
+插件热重载测试
+"""
+import threading
+import time
+
+import pytest
+
+from data_factory.core.plugin_manager import PluginManager
+from data_factory.core.watcher import PluginWatcher
+
+from tests.conftest import SAMPLE_MODULE
+
+
+@pytest.fixture
+def manager(plugins_dir):
+    manager = PluginManager(str(plugins_dir), isolation="none", drain_timeout=10)
+    manager.scan_plugins()
+    yield manager
+    manager.shutdown()
+
+
+def edit_sample(plugins_dir, old, new):
+    main_file = plugins_dir / "sample" / "main.py"
+    main_file.write_text(main_file.read_text(encoding="utf-8").replace(old, new), encoding="utf-8")
+
+
+def test_reload_swaps_routes(manager, plugins_dir):
+    generation = manager.get_plugin(SAMPLE_MODULE).generation
+    edit_sample(plugins_dir, 'action_name="generate"', 'action_name="generate_v2"')
+    manager.reload_plugin("sample")
+    assert manager.find_route("sample", "generate") is None
+    assert manager.find_route("sample", "generate_v2") == SAMPLE_MODULE
+    assert manager.get_plugin(SAMPLE_MODULE).generation > generation
+
+
+def test_readers_never_see_partial_state(manager, plugins_dir):
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        while not stop.is_set():
+            module_id = manager.find_route("sample", "generate")
+            modules, plugins = manager.modules, manager.loaded_plugins
+            if module_id is None or module_id not in modules or "sample" not in plugins:
+                errors.append(module_id)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for _ in range(20):
+            manager.reload_plugin("sample")
+    finally:
+        stop.set()
+        reader.join()
+    assert errors == []
+
+
+def test_inflight_requests_drain_before_teardown(manager, plugins_dir):
+    evicted = []
+    original_evict = manager.handlers.evict
+
+    def evict(key):
+        evicted.append((key, time.time()))
+        original_evict(key)
+
+    manager.handlers.evict = evict
+    old_generation = manager.get_plugin(SAMPLE_MODULE).generation
+    finished = []
+
+    def slow():
+        result = manager.execute_module(SAMPLE_MODULE, {"count": 1, "mode": "sleep", "seconds": 0.5})
+        finished.append((result, time.time()))
+
+    thread = threading.Thread(target=slow)
+    thread.start()
+    time.sleep(0.1)
+    edit_sample(plugins_dir, '"row"', '"new"')
+    manager.reload_plugin("sample")
+    # 新请求立即使用新版本，旧版本上的请求继续执行
+    assert manager.execute_module(SAMPLE_MODULE, {"count": 1}).data[0]["name"] == "new-0"
+    assert not evicted
+    thread.join()
+
+    deadline = time.time() + 5
+    while not evicted and time.time() < deadline:
+        time.sleep(0.01)
+    result, finished_at = finished[0]
+    assert result.status.value == "success" and result.data[0]["name"] == "row-0"
+    assert evicted[0][0] == (SAMPLE_MODULE, old_generation)
+    assert evicted[0][1] >= finished_at
+
+
+def test_failed_reload_keeps_old_version(manager, plugins_dir):
+    generation = manager.get_plugin(SAMPLE_MODULE).generation
+    (plugins_dir / "sample" / "main.py").write_text("def broken(:\n", encoding="utf-8")
+    with pytest.raises(SyntaxError):
+        manager.reload_plugin("sample")
+    assert manager.get_plugin(SAMPLE_MODULE).generation == generation
+    assert manager.execute_module(SAMPLE_MODULE, {"count": 1}).status.value == "success"
+
+
+def test_removed_plugin_is_unloaded(manager, plugins_dir):
+    (plugins_dir / "sample" / "main.py").unlink()
+    assert manager.reload_plugin("sample") is None
+    assert manager.get_module(SAMPLE_MODULE) is None
+    assert manager.find_route("sample", "generate") is None
+
+
+def test_watcher_reloads_after_change_settles(manager, plugins_dir):
+    watcher = PluginWatcher(manager)
+    watcher._signatures = watcher._scan()
+    edit_sample(plugins_dir, 'module_name="测试数据"', 'module_name="改过的测试数据"')
+    watcher.poll()
+    # 第一次看到变化时等待文件写完
+    assert manager.get_module(SAMPLE_MODULE).module_name == "测试数据"
+    watcher.poll()
+    assert manager.get_module(SAMPLE_MODULE).module_name == "改过的测试数据"
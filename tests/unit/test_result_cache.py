@@ -0,0 +1,107 @@
+"""
+结果缓存测试
+"""
+import time
+
+from data_factory.core.interfaces import ExecutionContext, ResultStatus
+from data_factory.core.plugin_manager import PluginManager
+from data_factory.core.result_cache import ResultCache, cache_key
+from data_factory.core.rng import SEEDED_EPOCH
+from data_factory.core.serialization import EncodedJSON
+
+from tests.conftest import SAMPLE_MODULE
+
+
+def test_cache_key_normalizes_parameter_order():
+    a = cache_key("m", "1.0", "h", {"a": 1, "b": 2}, 1, None)
+    assert a == cache_key("m", "1.0", "h", {"b": 2, "a": 1}, 1, None)
+    assert a != cache_key("m", "1.0", "h", {"a": 1, "b": 2}, 2, None)
+    assert a != cache_key("m", "1.0", "other", {"a": 1, "b": 2}, 1, None)
+
+
+def test_lru_eviction_by_size():
+    cache = ResultCache(max_bytes=10, max_entry_bytes=10)
+    cache.put("a", "m", b"1234")
+    cache.put("b", "m", b"1234")
+    assert cache.get("a") is not None  # a 变为最近使用
+    cache.put("c", "m", b"1234")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_oversized_entry_is_not_cached():
+    cache = ResultCache(max_bytes=100, max_entry_bytes=5)
+    assert cache.put("a", "m", b"123456") is False
+    assert cache.get("a") is None
+
+
+def test_ttl_expiry():
+    cache = ResultCache(default_ttl=0.05)
+    cache.put("a", "m", b"1")
+    assert cache.get("a") is not None
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_disk_cache_survives_restart_and_invalidation(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    cache.put("a", "m1", b"[1]", "ok")
+    cache.put("b", "m2", b"[2]")
+    restarted = ResultCache(directory=str(tmp_path))
+    entry = restarted.get("a")
+    assert entry.payload == b"[1]" and entry.message == "ok"
+    assert restarted.stats()["disk_hits"] == 1
+    restarted.invalidate("m1")
+    assert ResultCache(directory=str(tmp_path)).get("a") is None
+    assert ResultCache(directory=str(tmp_path)).get("b") is not None
+
+
+def test_disk_size_limit(tmp_path):
+    cache = ResultCache(directory=str(tmp_path), max_disk_bytes=8)
+    for key in "abc":
+        cache.put(key, "m", b"1234")
+    assert cache.stats()["disk_entries"] == 2
+    assert not (tmp_path / "m" / "a.bin").exists()
+
+
+def test_manager_caches_seeded_results(plugins_dir):
+    cache = ResultCache()
+    manager = PluginManager(str(plugins_dir), isolation="none", result_cache=cache)
+    manager.scan_plugins()
+    context = ExecutionContext(seed=3, reference_time=SEEDED_EPOCH)
+    first = manager.execute_module(SAMPLE_MODULE, {"count": 5}, context)
+    second = manager.execute_module(SAMPLE_MODULE, {"count": 5}, context)
+    assert second.status == ResultStatus.SUCCESS and second.data == first.data
+    assert second.data is not first.data
+    assert cache.stats()["hits"] == 1
+    encoded = manager.execute_module(SAMPLE_MODULE, {"count": 5}, context, encoded=True)
+    assert isinstance(encoded.data, EncodedJSON)
+    # 未指定种子的结果是随机的，不缓存
+    manager.execute_module(SAMPLE_MODULE, {"count": 5}, ExecutionContext())
+    assert cache.stats()["stores"] == 1
+
+
+def test_errors_are_not_cached(plugins_dir):
+    cache = ResultCache()
+    manager = PluginManager(str(plugins_dir), isolation="none", result_cache=cache)
+    manager.scan_plugins()
+    context = ExecutionContext(seed=3)
+    manager.execute_module(SAMPLE_MODULE, {"count": 1, "mode": "error"}, context)
+    assert cache.stats()["stores"] == 0
+
+
+def test_reload_invalidates_cached_results(plugins_dir):
+    cache = ResultCache()
+    manager = PluginManager(str(plugins_dir), isolation="none", result_cache=cache)
+    manager.scan_plugins()
+    context = ExecutionContext(seed=3)
+    manager.execute_module(SAMPLE_MODULE, {"count": 2}, context)
+    main_file = plugins_dir / "sample" / "main.py"
+    main_file.write_text(main_file.read_text(encoding="utf-8").replace('"row"', '"item"'),
+                         encoding="utf-8")
+    manager.reload_plugin("sample")
+    result = manager.execute_module(SAMPLE_MODULE, {"count": 2}, context)
+    assert result.data[0]["name"] == "item-0"
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,88 @@
+"""
+JSON序列化测试
+"""
+import dataclasses
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from enum import Enum
+
+import pytest
+
+from data_factory.core import serialization
+from data_factory.core.serialization import (
+    EncodedJSON, JsonSerializer, OrjsonSerializer, encode_envelope, orjson
+)
+
+requires_orjson = pytest.mark.skipif(orjson is None, reason="需要安装 orjson")
+
+
+class Level(Enum):
+    HIGH = "high"
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
+
+VALUES = [
+    {"名字": "张三", "城市": "上海", "emoji": "😀", "escape": "a\n\"b\"\\"},
+    datetime(2024, 1, 2, 3, 4, 5),
+    datetime(2024, 1, 2, 3, 4, 5, 123),
+    datetime(2024, 1, 2, tzinfo=timezone.utc),
+    datetime(2024, 1, 2, tzinfo=timezone(timedelta(hours=8))),
+    date(2024, 1, 2),
+    time(1, 2, 3),
+    {"level": Level.HIGH, "amount": Decimal("12.5"), "pair": (1, 2), "point": Point(1, 2)},
+    {1: "整数键"},
+    [1, 2.5, True, None, 2 ** 70],
+    {"nested": EncodedJSON(b'{"a":[1,2]}')},
+]
+
+
+@requires_orjson
+@pytest.mark.parametrize("value", VALUES)
+def test_orjson_matches_stdlib_bytes(value):
+    assert OrjsonSerializer().dumps(value) == JsonSerializer().dumps(value)
+
+
+@requires_orjson
+def test_orjson_loads_matches_stdlib():
+    payload = JsonSerializer().dumps(VALUES[0])
+    assert OrjsonSerializer().loads(payload) == JsonSerializer().loads(payload) == VALUES[0]
+
+
+def test_output_is_compact_utf8():
+    assert JsonSerializer().dumps({"名字": "张三", "a": [1, 2]}) == '{"名字":"张三","a":[1,2]}'.encode("utf-8")
+
+
+def test_unsupported_type():
+    with pytest.raises(TypeError):
+        JsonSerializer().dumps(object())
+
+
+@pytest.mark.parametrize("name", ["json", pytest.param("orjson", marks=requires_orjson)])
+def test_envelope_passes_encoded_data_through(name, monkeypatch):
+    monkeypatch.setattr(serialization, "_serializer", serialization.SERIALIZERS[name]())
+    # 编码好的数据原样拼接（包括空白），不解码再编码
+    data = EncodedJSON('[{"名字": "张三"}, 2]'.encode("utf-8"))
+    body = encode_envelope({"status": "success", "data": data, "message": "完成"})
+    assert body == '{"status":"success","message":"完成","data":[{"名字": "张三"}, 2]}'.encode("utf-8")
+    assert encode_envelope({"data": data}) == b'{"data":' + data.payload + b"}"
+    assert encode_envelope({"status": "success", "data": [1]}) == b'{"status":"success","data":[1]}'
+
+
+@requires_orjson
+def test_envelopes_are_byte_compatible():
+    envelope = {"status": "success", "data": [{"名字": "张三", "时间": datetime(2024, 1, 2)}],
+                "message": "成功生成 1 条数据", "error_code": None, "execution_time": 0.25}
+    assert OrjsonSerializer().dumps(envelope) == JsonSerializer().dumps(envelope)
+
+
+def test_select_serializer():
+    assert isinstance(serialization._create_serializer("json"), JsonSerializer)
+    expected = "orjson" if orjson is not None else "json"
+    assert serialization._create_serializer("auto").name == expected
+    with pytest.raises(ValueError):
+        serialization._create_serializer("pickle")
@@ -0,0 +1,152 @@
+"""
+链路追踪测试
+"""
+import json
+import os
+
+import pytest
+
+from data_factory.core import tracing
+from data_factory.core.interfaces import ExecutionContext
+from data_factory.core.plugin_manager import PluginManager
+
+from tests.conftest import SAMPLE_MODULE
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+SPAN_ID = "00f067aa0ba902b7"
+
+
+class RecordingExporter(tracing.BatchExporter):
+    """把导出的 span 保存在列表中"""
+
+    def __init__(self):
+        self.spans = []
+        super().__init__(flush_interval=0.05)
+
+    def write(self, spans):
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def exporter():
+    exporter = RecordingExporter()
+    tracing.configure(exporter)
+    yield exporter
+    tracing.shutdown()
+
+
+def test_parse_traceparent():
+    parent = tracing.parse_traceparent(f"00-{TRACE_ID}-{SPAN_ID}-01")
+    assert (parent.trace_id, parent.span_id) == (TRACE_ID, SPAN_ID)
+    assert parent.traceparent == f"00-{TRACE_ID}-{SPAN_ID}-01"
+    assert tracing.parse_traceparent(f" 00-{TRACE_ID}-{SPAN_ID}-01\n").span_id == SPAN_ID
+
+
+@pytest.mark.parametrize("value", [
+    None, "", "garbage", f"00-{TRACE_ID}-{SPAN_ID}", f"00-{TRACE_ID[:-1]}-{SPAN_ID}-01",
+    f"00-{TRACE_ID}-{SPAN_ID}0-01", f"00-{TRACE_ID}-{SPAN_ID}-00"
+])
+def test_invalid_traceparent(value):
+    assert tracing.parse_traceparent(value) is None
+
+
+def test_untraced_execution_records_nothing():
+    with tracing.span("request", root=True) as root:
+        assert root is None
+        assert tracing.current_traceparent() is None
+
+
+def test_span_parenting(exporter):
+    with tracing.span("request", root=True, kind=tracing.KIND_SERVER) as root:
+        with tracing.span("child") as child:
+            assert tracing.current_traceparent() == child.traceparent
+        with pytest.raises(RuntimeError):
+            with tracing.span("failing"):
+                raise RuntimeError("失败")
+    # 其他线程或进程传来的 traceparent
+    with tracing.span("remote", parent=root.traceparent) as remote:
+        pass
+    tracing.shutdown()
+    spans = {span.name: span for span in exporter.spans}
+    assert spans["request"].parent_id is None and spans["request"].kind == tracing.KIND_SERVER
+    assert spans["child"].parent_id == root.span_id and spans["child"].trace_id == root.trace_id
+    assert spans["failing"].status == tracing.STATUS_ERROR and "RuntimeError" in spans["failing"].message
+    assert remote.parent_id == root.span_id
+    assert all(span.end_ns >= span.start_ns for span in exporter.spans)
+
+
+def test_collect_and_emit(exporter):
+    with tracing.span("request", root=True) as root:
+        traceparent = root.traceparent
+    # 工作进程中：收集 span 不导出，作为字典传回
+    with tracing.collect() as collected, tracing.attach(traceparent):
+        with tracing.span("handle"):
+            pass
+    assert [span.name for span in collected] == ["handle"]
+    tracing.emit([span.to_dict() for span in collected])
+    tracing.shutdown()
+    handle = next(span for span in exporter.spans if span.name == "handle")
+    assert handle.parent_id == root.span_id and handle.trace_id == root.trace_id
+
+
+@pytest.mark.parametrize("isolation", ["subprocess", "pool"])
+def test_spans_cross_process_boundary(plugins_dir, exporter, isolation):
+    manager = PluginManager(str(plugins_dir), isolation=isolation, pool_size=1, timeout=10)
+    manager.scan_plugins()
+    try:
+        with tracing.span("request", root=True) as root:
+            context = ExecutionContext(trace_parent=tracing.current_traceparent())
+            assert manager.execute_module(SAMPLE_MODULE, {"count": 3}, context).status.value == "success"
+    finally:
+        manager.shutdown()
+    tracing.shutdown()
+    spans = {span.span_id: span for span in exporter.spans}
+    assert all(span.trace_id == root.trace_id for span in spans.values())
+    handle = next(span for span in spans.values() if span.name == "handle")
+    # 工作进程中的 span 沿父 span 链可以回到主进程的根 span
+    chain = [handle.name]
+    span = handle
+    while span.parent_id is not None:
+        span = spans[span.parent_id]
+        chain.append(span.name)
+    assert chain[-1] == "request" and "execute" in chain
+    assert ("pool.call" if isolation == "pool" else "isolator.communicate") in chain
+    assert any(span.name == "serialize" for span in spans.values())
+
+
+def test_file_exporter_writes_otlp_json(tmp_path):
+    path = tmp_path / "traces" / "spans.jsonl"
+    tracing.configure(tracing.FileExporter(str(path), flush_interval=0.05))
+    try:
+        with tracing.span("request", root=True, attributes={"http.method": "POST", "rows": 3,
+                                                             "ratio": 0.5, "cached": False}) as root:
+            with tracing.span("child") as child:
+                child.set_error("失败")
+    finally:
+        tracing.shutdown()
+    lines = path.read_text(encoding="utf-8").splitlines()
+    spans = []
+    for line in lines:
+        request = json.loads(line)
+        [resource_spans] = request["resourceSpans"]
+        attributes = {item["key"]: item["value"] for item in resource_spans["resource"]["attributes"]}
+        assert attributes["service.name"] == {"stringValue": tracing.SERVICE_NAME}
+        assert attributes["process.pid"] == {"intValue": str(os.getpid())}
+        [scope_spans] = resource_spans["scopeSpans"]
+        assert scope_spans["scope"] == {"name": "data_factory"}
+        spans.extend(scope_spans["spans"])
+    spans = {span["name"]: span for span in spans}
+    request, child = spans["request"], spans["child"]
+    assert request["traceId"] == root.trace_id and len(request["traceId"]) == 32
+    assert len(request["spanId"]) == 16 and "parentSpanId" not in request
+    assert child["parentSpanId"] == request["spanId"]
+    assert int(request["endTimeUnixNano"]) >= int(request["startTimeUnixNano"])
+    assert isinstance(request["startTimeUnixNano"], str)
+    assert request["attributes"] == [
+        {"key": "http.method", "value": {"stringValue": "POST"}},
+        {"key": "rows", "value": {"intValue": "3"}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}},
+        {"key": "cached", "value": {"boolValue": False}}
+    ]
+    assert request["status"] == {}
+    assert child["status"] == {"code": tracing.STATUS_ERROR, "message": "失败"}
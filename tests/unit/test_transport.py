@@ -0,0 +1,178 @@
+"""
+结果传输测试
+"""
+import os
+import threading
+
+import pytest
+
+from data_factory.core.interfaces import ExecutionContext, CancellationToken, ResultStatus
+from data_factory.core.plugin_manager import PluginManager, SimpleIsolator
+from data_factory.core.serialization import EncodedJSON
+from data_factory.core.transport import (
+    MappedJSON, discard_result_file, iter_envelope, receive_payload, result_path, spill_payload
+)
+from data_factory.core.worker_pool import WorkerPool, WorkerProcess, WorkerTimeout, WorkerCancelled
+
+from tests.conftest import SAMPLE_MODULE
+
+
+def test_small_payload_stays_inline():
+    header, payload = spill_payload({"status": "success"}, b"[1,2]", inline_limit=10)
+    assert "result_file" not in header
+    assert receive_payload(header, payload) == [1, 2]
+    assert receive_payload(header, payload, encoded=True).payload == b"[1,2]"
+
+
+def test_large_payload_is_spilled_to_assigned_path():
+    path = result_path()
+    header, payload = spill_payload({}, b'"' + b"x" * 100 + b'"', inline_limit=10, path=path)
+    assert payload == b"" and header["result_file"] == path
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert receive_payload(header, payload) == "x" * 100
+    # 映射后文件已经删除
+    assert not os.path.exists(path)
+    discard_result_file(path)
+
+
+def test_mapped_payload_streams_in_chunks():
+    header, _ = spill_payload({}, b"[" + b",".join([b"1"] * 1000) + b"]", inline_limit=10)
+    mapped = receive_payload(header, b"", encoded=True)
+    assert isinstance(mapped, MappedJSON) and len(mapped) == 2001
+    body = b"".join(iter_envelope({"status": "success"}, mapped))
+    assert body.startswith(b'{"status":"success","data":[1,1')
+    assert body.endswith(b"]}")
+
+
+def test_assigned_path_is_not_overwritten():
+    path = result_path()
+    spill_payload({}, b"12345678901", inline_limit=1, path=path)
+    try:
+        with pytest.raises(FileExistsError):
+            spill_payload({}, b"12345678901", inline_limit=1, path=path)
+    finally:
+        discard_result_file(path)
+
+
+@pytest.mark.parametrize("isolation", ["pool", "subprocess"])
+def test_isolated_large_result_round_trip(plugins_dir, isolation):
+    manager = PluginManager(str(plugins_dir), isolation=isolation, pool_size=1, result_inline_limit=1024)
+    manager.scan_plugins()
+    try:
+        result = manager.execute_module(SAMPLE_MODULE, {"count": 1, "mode": "blob", "size": 100000})
+        assert result.status == ResultStatus.SUCCESS and result.data == "x" * 100000
+        encoded = manager.execute_module(SAMPLE_MODULE, {"count": 1, "mode": "blob", "size": 100000},
+                                         encoded=True)
+        assert isinstance(encoded.data, EncodedJSON) and len(encoded.data) == 100002
+        encoded.data.close()
+    finally:
+        manager.shutdown()
+
+
+def _spill_then(error):
+    """模拟工作进程已经写入结果文件、主进程还没有读取时超时或被取消"""
+    seen = []
+
+    def call(self, request, timeout, context=None, cancel_grace=1.0):
+        with open(request["result_path"], "wb") as f:
+            f.write(b"[]")
+        seen.append(request["result_path"])
+        raise error()
+
+    return seen, call
+
+
+@pytest.mark.parametrize("error", [WorkerTimeout, WorkerCancelled])
+def test_pool_discards_result_file_when_worker_is_abandoned(plugins_dir, monkeypatch, error):
+    manager = PluginManager(str(plugins_dir), isolation="pool", pool_size=1, timeout=5)
+    manager.scan_plugins()
+    seen, call = _spill_then(error)
+    monkeypatch.setattr(WorkerProcess, "call", call)
+    context = ExecutionContext(cancel_token=CancellationToken())
+    context.cancel_token.cancel()
+    try:
+        result = manager.isolator.execute(manager.get_plugin(SAMPLE_MODULE), "SampleHandler",
+                                          {"count": 1}, context)
+        assert result.error_code in ("TIMEOUT_ERROR", "CANCELLED")
+        assert seen and not os.path.exists(seen[0])
+    finally:
+        manager.shutdown()
+
+
+def test_subprocess_discards_result_file_when_child_is_killed(plugins_dir, monkeypatch):
+    manager = PluginManager(str(plugins_dir), isolation="subprocess", timeout=5)
+    manager.scan_plugins()
+    seen = []
+
+    def run(self, plugin_info, request, context, encoded):
+        with open(request["result_path"], "wb") as f:
+            f.write(b"[]")
+        seen.append(request["result_path"])
+        raise RuntimeError("子进程被结束")
+
+    monkeypatch.setattr(SimpleIsolator, "_run", run)
+    with pytest.raises(RuntimeError):
+        manager.execute_module(SAMPLE_MODULE, {"count": 1})
+    assert seen and not os.path.exists(seen[0])
+
+
+def test_subprocess_cancel_leaves_no_result_file(plugins_dir, monkeypatch):
+    manager = PluginManager(str(plugins_dir), isolation="subprocess", timeout=5, result_inline_limit=10)
+    manager.scan_plugins()
+    paths = []
+    original = SimpleIsolator._run
+
+    def run(self, plugin_info, request, context, encoded):
+        paths.append(request["result_path"])
+        return original(self, plugin_info, request, context, encoded)
+
+    monkeypatch.setattr(SimpleIsolator, "_run", run)
+    token = CancellationToken()
+    threading.Timer(0.5, token.cancel, args=("测试取消",)).start()
+    result = manager.execute_module(SAMPLE_MODULE, {"count": 1, "mode": "sleep", "seconds": 10},
+                                    ExecutionContext(cancel_token=token))
+    assert result.error_code == "CANCELLED"
+    assert len(paths) == 1 and not os.path.exists(paths[0])
+
+
+def test_foreign_result_file_is_rejected(tmp_path):
+    victim = tmp_path / "victim.json"
+    victim.write_bytes(b"[1]")
+    header = {"result_file": str(victim)}
+    with pytest.raises(ValueError):
+        receive_payload(header, b"", result_path=result_path())
+    # 未指定分配的路径时只接受结果目录中的结果文件
+    with pytest.raises(ValueError):
+        receive_payload(header, b"")
+    assert victim.read_bytes() == b"[1]"
+
+
+def _respond_with(header):
+    def call(self, request, timeout, context=None, cancel_grace=1.0):
+        return header(request), b""
+    return call
+
+
+@pytest.mark.parametrize("case", ["foreign", "missing", "truncated"])
+def test_pool_rejects_bad_result_file(plugins_dir, monkeypatch, tmp_path, case):
+    victim = tmp_path / "victim.json"
+    victim.write_bytes(b"[1]")
+
+    def header(request):
+        if case == "foreign":
+            return {"status": "success", "result_file": str(victim)}
+        if case == "truncated":
+            with open(request["result_path"], "wb") as f:
+                f.write(b'["x", "y')
+        return {"status": "success", "result_file": request["result_path"]}
+
+    manager = PluginManager(str(plugins_dir), isolation="pool", pool_size=1, timeout=5)
+    manager.scan_plugins()
+    monkeypatch.setattr(WorkerProcess, "call", _respond_with(header))
+    try:
+        result = manager.execute_module(SAMPLE_MODULE, {"count": 1})
+        assert result.status == ResultStatus.ERROR and result.error_code == "OUTPUT_PARSE_ERROR"
+        assert manager.isolator.stats()["restarts"] == 1
+        assert victim.read_bytes() == b"[1]"
+    finally:
+        manager.shutdown()
@@ -0,0 +1,104 @@
+"""
+参数校验测试
+"""
+import pytest
+
+from data_factory.core.interfaces import (
+    Handler, Module, SelectOption, ValidationRule, Widget, WidgetType
+)
+from data_factory.core.validation import ValidationError, compile_validator
+
+
+def make_validator(*widgets):
+    return compile_validator(Module(handler_class=Handler, group_name="g", module_name="m",
+                                    widgets=list(widgets)))
+
+
+def errors_of(validator, data):
+    with pytest.raises(ValidationError) as info:
+        validator.validate(data)
+    return {error["field"]: error["message"] for error in info.value.errors}
+
+
+def test_missing_required_field_is_rejected_even_with_default():
+    validator = make_validator(Widget(
+        name="count", label="数量", widget_type=WidgetType.NUMBER, default_value="5",
+        validation=ValidationRule(required=True)
+    ))
+    assert errors_of(validator, {}) == {"count": "数量不能为空"}
+    assert errors_of(validator, {"count": ""}) == {"count": "数量不能为空"}
+
+
+def test_missing_optional_field_uses_default():
+    validator = make_validator(
+        Widget(name="count", label="数量", widget_type=WidgetType.NUMBER, default_value="5"),
+        Widget(name="name", label="名称", widget_type=WidgetType.INPUT, default_value="abc")
+    )
+    assert validator.validate({}) == {"count": 5, "name": "abc"}
+    # 明确传入的值不被默认值覆盖
+    assert validator.validate({"count": "7", "name": ""}) == {"count": 7, "name": ""}
+
+
+def test_empty_optional_field_without_default_is_dropped():
+    validator = make_validator(Widget(name="count", label="数量", widget_type=WidgetType.NUMBER))
+    assert validator.validate({"count": None}) == {}
+
+
+def test_number_coercion_and_range():
+    validator = make_validator(Widget(
+        name="age", label="年龄", widget_type=WidgetType.NUMBER,
+        validation=ValidationRule(required=True, min_value=0, max_value=150)
+    ))
+    assert validator.validate({"age": "25"}) == {"age": 25}
+    assert validator.validate({"age": 1.5}) == {"age": 1.5}
+    assert errors_of(validator, {"age": "abc"}) == {"age": "年龄必须是数字"}
+    assert errors_of(validator, {"age": 200}) == {"age": "年龄不能大于150"}
+    assert errors_of(validator, {"age": True}) == {"age": "年龄必须是数字"}
+    assert errors_of(validator, {"age": "nan"}) == {"age": "年龄必须是数字"}
+
+
+def test_text_length_and_pattern():
+    validator = make_validator(Widget(
+        name="code", label="编码", widget_type=WidgetType.INPUT,
+        validation=ValidationRule(min_length=2, max_length=4, pattern=r"^[A-Z]+$")
+    ))
+    assert validator.validate({"code": "AB"}) == {"code": "AB"}
+    assert "code" in errors_of(validator, {"code": "A"})
+    assert "code" in errors_of(validator, {"code": "ABCDE"})
+    assert errors_of(validator, {"code": "ab"}) == {"code": "编码格式不正确"}
+
+
+def test_select_and_checkbox():
+    options = [SelectOption(display_name="A", value="a"), SelectOption(display_name="B", value="b"),
+               SelectOption(display_name="C", value="c", disabled=True)]
+    validator = make_validator(
+        Widget(name="kind", label="类型", widget_type=WidgetType.SELECT, options=options),
+        Widget(name="tags", label="标签", widget_type=WidgetType.CHECKBOX, options=options),
+        Widget(name="flag", label="开关", widget_type=WidgetType.CHECKBOX)
+    )
+    assert validator.validate({"kind": "a", "tags": "a, b", "flag": "yes"}) == {
+        "kind": "a", "tags": ["a", "b"], "flag": True
+    }
+    assert set(errors_of(validator, {"kind": "c", "tags": ["x"], "flag": "maybe"})) == {
+        "kind", "tags", "flag"
+    }
+
+
+def test_all_errors_are_reported_and_extra_fields_kept():
+    validator = make_validator(
+        Widget(name="a", label="A", widget_type=WidgetType.INPUT, validation=ValidationRule(required=True)),
+        Widget(name="b", label="B", widget_type=WidgetType.NUMBER, validation=ValidationRule(required=True))
+    )
+    assert set(errors_of(validator, {})) == {"a", "b"}
+    assert validator.validate({"a": "x", "b": 1, "extra": [1]}) == {"a": "x", "b": 1, "extra": [1]}
+    assert errors_of(validator, []) == {"": "请求参数必须是JSON对象"}
+
+
+def test_paragraph_only_module_has_no_validator():
+    assert make_validator(Widget(name="p", label="说明", widget_type=WidgetType.PARAGRAPH)) is None
+
+
+def test_invalid_pattern_fails_at_compile_time():
+    with pytest.raises(ValueError):
+        make_validator(Widget(name="x", label="X", widget_type=WidgetType.INPUT,
+                              validation=ValidationRule(pattern="(")))
@@ -0,0 +1,76 @@
+"""
+单次执行子进程（python -m data_factory.core.worker）协议测试
+"""
+import subprocess
+import sys
+import time
+
+from data_factory.core.interfaces import ExecutionContext, ResultStatus
+from data_factory.core.plugin_manager import PluginManager, SimpleIsolator
+from data_factory.core.serialization import dumps, loads
+from data_factory.core.transport import discard_result_file, result_path
+
+from tests.conftest import SAMPLE_MODULE
+
+
+def run_worker(plugins_dir, data, **request):
+    """以 SimpleIsolator 的方式启动子进程执行一个请求，返回 (进程, 标准输出, 标准错误)"""
+    isolator = SimpleIsolator()
+    plugin_path = plugins_dir / "sample"
+    request = {"plugin_path": str(plugin_path), "handler_class": "SampleHandler", "data": data,
+               "context": {}, **request}
+    process = subprocess.run([sys.executable, "-m", "data_factory.core.worker"], input=dumps(request),
+                             capture_output=True, cwd=str(plugin_path), env=isolator._env, timeout=30)
+    return process, process.stdout, process.stderr
+
+
+def test_header_line_then_payload(plugins_dir):
+    process, stdout, _ = run_worker(plugins_dir, {"count": 2, "prefix": "行"})
+    assert process.returncode == 0
+    header, _, payload = stdout.partition(b"\n")
+    header = loads(header)
+    assert header["status"] == "success" and header["rows"] == 2
+    assert "data" not in header and "result_file" not in header
+    assert [row["name"] for row in loads(payload)] == ["行-0", "行-1"]
+
+
+def test_plugin_print_goes_to_stderr(plugins_dir):
+    process, stdout, stderr = run_worker(plugins_dir, {"count": 1, "mode": "print"})
+    assert process.returncode == 0
+    assert "插件输出" in stderr.decode("utf-8")
+    header, _, payload = stdout.partition(b"\n")
+    assert loads(header)["status"] == "success"
+    assert len(loads(payload)) == 1
+
+
+def test_handler_error_is_reported_in_header(plugins_dir):
+    process, stdout, _ = run_worker(plugins_dir, {"mode": "error"})
+    assert process.returncode == 0
+    header, _, payload = stdout.partition(b"\n")
+    header = loads(header)
+    assert header["error_code"] == "EXECUTION_ERROR" and header["message"] == "故意失败"
+    assert "RuntimeError" in header["traceback"]
+    assert payload == b"null"
+
+
+def test_large_payload_is_written_to_assigned_file(plugins_dir):
+    path = result_path()
+    try:
+        _, stdout, _ = run_worker(plugins_dir, {"mode": "blob", "size": 100}, inline_limit=10, result_path=path)
+        header, _, payload = stdout.partition(b"\n")
+        assert loads(header)["result_file"] == path and payload == b""
+        with open(path, "rb") as f:
+            assert loads(f.read()) == "x" * 100
+    finally:
+        discard_result_file(path)
+
+
+def test_isolator_kills_child_on_timeout(plugins_dir):
+    manager = PluginManager(str(plugins_dir), isolation="subprocess", timeout=1)
+    manager.scan_plugins()
+    started = time.time()
+    result = manager.execute_module(SAMPLE_MODULE, {"count": 1, "mode": "sleep", "seconds": 30},
+                                    ExecutionContext())
+    assert result.status == ResultStatus.ERROR
+    assert result.error_code == "TIMEOUT_ERROR"
+    assert time.time() - started < 10
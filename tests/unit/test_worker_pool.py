@@ -0,0 +1,152 @@
+"""
+工作进程池测试
+"""
+import threading
+import time
+
+import pytest
+
+from data_factory.core.interfaces import ExecutionContext, CancellationToken, ResultStatus
+from data_factory.core.plugin_manager import PluginManager
+
+from tests.conftest import SAMPLE_MODULE, SIBLING_MODULE
+
+
+@pytest.fixture
+def pool_manager(plugins_dir):
+    manager = PluginManager(str(plugins_dir), isolation="pool", pool_size=1,
+                            max_requests_per_worker=3, timeout=5)
+    manager.scan_plugins()
+    yield manager
+    manager.shutdown()
+
+
+def test_executes_in_worker(pool_manager):
+    result = pool_manager.execute_module(SAMPLE_MODULE, {"count": 3}, ExecutionContext(seed=1))
+    assert result.status == ResultStatus.SUCCESS
+    assert [r["name"] for r in result.data] == ["row-0", "row-1", "row-2"]
+    assert result.rows == 3
+
+
+def test_worker_is_reused_and_recycled(pool_manager):
+    pool = pool_manager.isolator
+    pids = []
+    for _ in range(4):
+        assert pool_manager.execute_module(SAMPLE_MODULE, {"count": 1}).status == ResultStatus.SUCCESS
+        pids.append(pool._workers[0].pid)
+    # 前两次在同一个进程中执行，第三次后达到 max_requests 被回收
+    assert pids[0] == pids[1]
+    assert pids[2] != pids[1]
+    assert pool.stats()["recycled"] == 1
+
+
+def test_handler_error_keeps_worker(pool_manager):
+    pool = pool_manager.isolator
+    pool_manager.execute_module(SAMPLE_MODULE, {"count": 1})
+    pid = pool._workers[0].pid
+    result = pool_manager.execute_module(SAMPLE_MODULE, {"count": 1, "mode": "error"})
+    assert result.status == ResultStatus.ERROR
+    assert "故意失败" in result.message
+    assert pool._workers[0].pid == pid
+    assert pool.stats()["restarts"] == 0
+
+
+def test_timeout_restarts_worker(plugins_dir):
+    manager = PluginManager(str(plugins_dir), isolation="pool", pool_size=1, timeout=1)
+    manager.scan_plugins()
+    try:
+        result = manager.execute_module(SAMPLE_MODULE, {"count": 1, "mode": "sleep", "seconds": 10})
+        assert result.error_code == "TIMEOUT_ERROR"
+        assert manager.isolator.stats()["restarts"] == 1
+        assert manager.execute_module(SAMPLE_MODULE, {"count": 2}).status == ResultStatus.SUCCESS
+    finally:
+        manager.shutdown()
+
+
+def test_cancel_stops_execution(pool_manager):
+    token = CancellationToken()
+    context = ExecutionContext(cancel_token=token)
+    threading.Timer(0.5, token.cancel, args=("客户端断开",)).start()
+    started = time.time()
+    result = pool_manager.execute_module(SAMPLE_MODULE, {"count": 1, "mode": "sleep", "seconds": 10}, context)
+    assert result.error_code == "CANCELLED"
+    assert "客户端断开" in result.message
+    assert time.time() - started < 4
+
+
+def test_progress_is_forwarded(pool_manager):
+    reports = []
+    context = ExecutionContext(progress_callback=lambda done, total: reports.append((done, total)))
+    result = pool_manager.execute_module(SAMPLE_MODULE, {"count": 250}, context)
+    assert result.status == ResultStatus.SUCCESS
+    # 工作进程按时间间隔节流进度帧，至少会收到第一帧
+    assert reports and reports[0] == (0, 250)
+
+
+def test_closed_pool_rejects(pool_manager):
+    pool_manager.isolator.close()
+    result = pool_manager.execute_module(SAMPLE_MODULE, {"count": 1})
+    assert result.error_code == "POOL_CLOSED"
+
+
+def test_progress_does_not_extend_timeout(plugins_dir):
+    manager = PluginManager(str(plugins_dir), isolation="pool", pool_size=1, timeout=1)
+    manager.scan_plugins()
+    try:
+        reports = []
+        context = ExecutionContext(progress_callback=lambda done, total: reports.append(done))
+        started = time.time()
+        result = manager.execute_module(SAMPLE_MODULE, {"count": 1, "mode": "busy", "seconds": 5}, context)
+        assert result.error_code == "TIMEOUT_ERROR"
+        assert time.time() - started < 2
+        assert reports
+    finally:
+        manager.shutdown()
+
+
+def test_cancel_grace_kills_unresponsive_handler(plugins_dir):
+    manager = PluginManager(str(plugins_dir), isolation="pool", pool_size=1, timeout=10)
+    manager.scan_plugins()
+    manager.isolator.cancel_grace = 0.5
+    try:
+        token = CancellationToken()
+        context = ExecutionContext(cancel_token=token, progress_callback=lambda done, total: None)
+        threading.Timer(0.3, token.cancel, args=("客户端断开",)).start()
+        started = time.time()
+        result = manager.execute_module(SAMPLE_MODULE, {"count": 1, "mode": "busy", "seconds": 5}, context)
+        assert result.error_code == "CANCELLED"
+        assert time.time() - started < 1.5
+        assert manager.isolator.stats()["restarts"] == 1
+    finally:
+        manager.shutdown()
+
+
+@pytest.mark.parametrize("isolation", ["none", "subprocess", "pool"])
+def test_plugin_imports_sibling_module(plugins_dir, isolation):
+    manager = PluginManager(str(plugins_dir), isolation=isolation, pool_size=1)
+    manager.scan_plugins()
+    try:
+        result = manager.execute_module(SIBLING_MODULE, {"count": 2})
+        assert result.status == ResultStatus.SUCCESS, result.message
+        assert result.data == ["sibling-0", "sibling-1"]
+    finally:
+        manager.shutdown()
+
+
+def test_restart_counters_are_consistent(plugins_dir):
+    manager = PluginManager(str(plugins_dir), isolation="pool", pool_size=4, timeout=1)
+    manager.scan_plugins()
+    try:
+        # 四个调度线程同时超时重启工作进程
+        threads = [
+            threading.Thread(target=manager.execute_module,
+                             args=(SAMPLE_MODULE, {"count": 1, "mode": "sleep", "seconds": 5}))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert manager.isolator.stats()["restarts"] == 4
+    finally:
+        manager.shutdown()